@@ -0,0 +1,80 @@
+"""Measures the cold-start import cost of each Lambda handler with `python -X importtime`,
+reports the most expensive packages and exits with an error if a handler is over budget.
+
+Run from the repository root with each handler's requirements installed:
+    python3 benchmark_cold_start.py [handler folder ...]"""
+
+import argparse
+from pathlib import Path
+import re
+import subprocess
+import sys
+
+# Handler folder: (handler module, import budget in milliseconds)
+COLD_START_BUDGETS = {
+    "rss_pipeline": ("lambda_function", 2500),
+    "send_email_pdf": ("main", 600),
+}
+TOP_PACKAGE_COUNT = 10
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_import_times(importtime_output: str) -> list[tuple[str, int, int, int]]:
+    """Returns (module, self us, cumulative us, depth) for every import line in the
+    `-X importtime` output, in the order Python printed them."""
+    imports = []
+    for line in importtime_output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+
+def get_package_costs(imports: list[tuple[str, int, int, int]]) -> dict[str, int]:
+    """Returns the total self time of the modules in each top-level package, in microseconds."""
+    package_costs = {}
+    for module, self_us, _, _ in imports:
+        package = module.split(".")[0]
+        package_costs[package] = package_costs.get(package, 0) + self_us
+    return dict(sorted(package_costs.items(), key=lambda item: item[1], reverse=True))
+
+
+def measure_handler_imports(folder: str, module: str) -> list[tuple[str, int, int, int]]:
+    """Imports the handler module in a fresh interpreter inside its folder and
+    returns the parsed import times."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=Path(__file__).parent / folder, capture_output=True, text=True,
+                            check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not import {folder}/{module}.py:\n{result.stderr[-2000:]}")
+    return parse_import_times(result.stderr)
+
+
+def report_handler(folder: str, module: str, budget_ms: int) -> bool:
+    """Prints the import cost of the handler and its most expensive packages.
+    Returns True if the handler is within its budget."""
+    imports = measure_handler_imports(folder, module)
+    total_ms = next(cumulative for name, _, cumulative, _ in imports if name == module) / 1000
+    within_budget = total_ms <= budget_ms
+    print(f"{folder}/{module}.py: {total_ms:,.0f} ms of {budget_ms:,} ms budget "
+          f"({'ok' if within_budget else 'OVER BUDGET'})")
+    for package, self_us in list(get_package_costs(imports).items())[:TOP_PACKAGE_COUNT]:
+        print(f"    {package:<24} {self_us / 1000:>8,.1f} ms")
+    return within_budget
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folders", nargs="*", default=[],
+                        help=f"handler folders to measure, all of {', '.join(COLD_START_BUDGETS)} "
+                             "by default")
+    args = parser.parse_args()
+    folders = args.folders or list(COLD_START_BUDGETS)
+    unknown_folders = [folder for folder in folders if folder not in COLD_START_BUDGETS]
+    if unknown_folders:
+        parser.error(f"no cold-start budget for {', '.join(unknown_folders)}")
+
+    results = [report_handler(folder, *COLD_START_BUDGETS[folder]) for folder in folders]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,70 @@
+"""Lets pytest run the tests of every pipeline from the repository root.
+
+Each pipeline is deployed on its own, so its modules import each other by flat names
+such as `load`, `extract` and `transform`, which several pipelines share. Before the
+tests of a pipeline are collected or run, its folder is put first on sys.path and the
+flat modules of the previous pipeline are swapped out of sys.modules."""
+
+from pathlib import Path
+import sys
+from types import ModuleType
+
+import pytest
+
+ROOT_FOLDER = Path(__file__).parent.resolve()
+PIPELINE_FOLDERS = {test_file.parent.resolve() for test_file in ROOT_FOLDER.glob("*/test_*.py")}
+
+pipeline_modules: dict[Path, dict[str, ModuleType]] = {}
+active_folder: list[Path] = []
+
+
+def get_pipeline_folder(path: Path) -> Path | None:
+    """Returns the pipeline folder a test file belongs to, None if it is not in one."""
+    folder = Path(path).parent.resolve()
+    return folder if folder in PIPELINE_FOLDERS else None
+
+
+def is_flat_module_in(module: ModuleType, folder: Path) -> bool:
+    """Returns True if the module was imported by its file name from the folder."""
+    module_file = getattr(module, "__file__", None)
+    if module_file is None:
+        return False
+    module_path = Path(module_file).resolve()
+    return module_path.parent == folder and module.__name__ == module_path.stem
+
+
+def activate_pipeline(folder: Path) -> None:
+    """Makes flat imports resolve to the modules of the pipeline folder."""
+    if active_folder and active_folder[0] == folder:
+        return
+    if active_folder:
+        previous_folder = active_folder.pop()
+        pipeline_modules[previous_folder] = {
+            name: module for name, module in list(sys.modules.items())
+            if is_flat_module_in(module, previous_folder)}
+        for name in pipeline_modules[previous_folder]:
+            del sys.modules[name]
+
+    sys.modules.update(pipeline_modules.get(folder, {}))
+    sys.path[:] = [path for path in sys.path
+                   if not path or Path(path).resolve() not in PIPELINE_FOLDERS]
+    sys.path.insert(0, str(folder))
+    active_folder.append(folder)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collectstart(collector: pytest.Collector) -> None:
+    """Activates the pipeline of a test file before it is imported."""
+    if isinstance(collector, pytest.Module):
+        folder = get_pipeline_folder(collector.path)
+        if folder is not None:
+            activate_pipeline(folder)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item: pytest.Item) -> None:
+    """Activates the pipeline of a test before its fixtures are set up, so patches by
+    module name reach the pipeline's own modules."""
+    folder = get_pipeline_folder(item.path)
+    if folder is not None:
+        activate_pipeline(folder)
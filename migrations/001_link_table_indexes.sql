@@ -0,0 +1,4 @@
+-- The unique (keyword_id, story) constraints already index the keyword side of the link tables,
+-- these index the story side for joins to stories and the untagged story anti-join.
+CREATE INDEX IF NOT EXISTS story_keyword_link_story_id_idx ON story_keyword_link (story_id);
+CREATE INDEX IF NOT EXISTS reddit_keyword_link_re_article_id_idx ON reddit_keyword_link (re_article_id);
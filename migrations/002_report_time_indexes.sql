@@ -0,0 +1,7 @@
+-- The report only reads the last 24 hours of stories and Reddit articles.
+-- The stories index carries the sentiment, title and source so the top/bottom story and
+-- source average queries are answered from the index alone.
+CREATE INDEX IF NOT EXISTS stories_pub_date_idx ON stories (pub_date)
+    INCLUDE (media_sentiment, source_id, title);
+CREATE INDEX IF NOT EXISTS reddit_article_re_created_timestamp_idx
+    ON reddit_article (re_created_timestamp);
@@ -0,0 +1,37 @@
+-- Hourly rollups kept up to date by the loaders, so the report and dashboard read a few
+-- pre-aggregated rows instead of scanning stories, reddit_article and the link tables.
+-- Run backfill_rollups.py after applying this migration to fill them from existing rows.
+CREATE TABLE IF NOT EXISTS source_sentiment_hourly(
+    source_id SMALLINT,
+    hour_start TIMESTAMP,
+    sentiment_sum FLOAT,
+    sentiment_count INT,
+    sentiment_min FLOAT,
+    sentiment_max FLOAT,
+    PRIMARY KEY (source_id, hour_start),
+    FOREIGN KEY (source_id) REFERENCES sources(source_id)
+);
+
+CREATE TABLE IF NOT EXISTS reddit_sentiment_hourly(
+    re_domain TEXT,
+    hour_start TIMESTAMP,
+    sentiment_sum FLOAT,
+    sentiment_count INT,
+    sentiment_min FLOAT,
+    sentiment_max FLOAT,
+    PRIMARY KEY (re_domain, hour_start)
+);
+
+CREATE TABLE IF NOT EXISTS keyword_hourly_counts(
+    keyword_id INT,
+    hour_start TIMESTAMP,
+    story_count INT DEFAULT 0,
+    reddit_count INT DEFAULT 0,
+    PRIMARY KEY (keyword_id, hour_start),
+    FOREIGN KEY (keyword_id) REFERENCES keywords(keyword_id)
+);
+
+CREATE INDEX IF NOT EXISTS source_sentiment_hourly_hour_start_idx
+    ON source_sentiment_hourly (hour_start);
+CREATE INDEX IF NOT EXISTS keyword_hourly_counts_hour_start_idx
+    ON keyword_hourly_counts (hour_start);
@@ -0,0 +1,4 @@
+-- The tagging loader looks keywords up by lower(keyword) so "Politics" and "politics"
+-- share one row. The index is not unique because existing rows may already differ only
+-- by case; the loader uses the oldest of those.
+CREATE INDEX IF NOT EXISTS keywords_lower_keyword_idx ON keywords (lower(keyword));
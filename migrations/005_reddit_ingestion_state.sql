@@ -0,0 +1,8 @@
+-- The newest post loaded from each subreddit, which the Reddit pipeline lists back to
+-- so only new posts are fetched.
+CREATE TABLE IF NOT EXISTS reddit_ingestion_state(
+    subreddit TEXT,
+    newest_fullname TEXT,
+    newest_created_utc DOUBLE PRECISION,
+    PRIMARY KEY (subreddit)
+);
@@ -0,0 +1,9 @@
+-- The topics found for each normalised headline, which the tagging pipeline reuses
+-- instead of asking OpenAI again for a story it has already tagged.
+CREATE TABLE IF NOT EXISTS title_topics(
+    title_hash TEXT,
+    topic_one TEXT,
+    topic_two TEXT,
+    topic_three TEXT,
+    PRIMARY KEY (title_hash)
+);
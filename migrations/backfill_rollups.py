@@ -0,0 +1,62 @@
+"""Rebuilds the hourly rollup tables from scratch from the stories, reddit_article
+and keyword link tables, in one transaction"""
+
+from os import environ
+
+from dotenv import load_dotenv
+import psycopg2
+
+BACKFILL_QUERIES = [
+    "TRUNCATE source_sentiment_hourly, reddit_sentiment_hourly, keyword_hourly_counts;",
+    """INSERT INTO source_sentiment_hourly
+       (source_id, hour_start, sentiment_sum, sentiment_count, sentiment_min, sentiment_max)
+       SELECT source_id, date_trunc('hour', pub_date), SUM(media_sentiment), COUNT(media_sentiment),
+       MIN(media_sentiment), MAX(media_sentiment)
+       FROM stories WHERE source_id IS NOT NULL AND pub_date IS NOT NULL
+       GROUP BY source_id, date_trunc('hour', pub_date);""",
+    """INSERT INTO reddit_sentiment_hourly
+       (re_domain, hour_start, sentiment_sum, sentiment_count, sentiment_min, sentiment_max)
+       SELECT re_domain, date_trunc('hour', re_created_timestamp), SUM(re_sentiment_mean),
+       COUNT(re_sentiment_mean), MIN(re_sentiment_mean), MAX(re_sentiment_mean)
+       FROM reddit_article WHERE re_domain IS NOT NULL AND re_created_timestamp IS NOT NULL
+       GROUP BY re_domain, date_trunc('hour', re_created_timestamp);""",
+    """INSERT INTO keyword_hourly_counts (keyword_id, hour_start, story_count, reddit_count)
+       SELECT keyword_id, hour_start, SUM(story_count), SUM(reddit_count) FROM (
+           SELECT story_keyword_link.keyword_id, date_trunc('hour', stories.pub_date) AS hour_start,
+           COUNT(*) AS story_count, 0 AS reddit_count
+           FROM story_keyword_link JOIN stories ON stories.story_id = story_keyword_link.story_id
+           WHERE stories.pub_date IS NOT NULL
+           GROUP BY story_keyword_link.keyword_id, date_trunc('hour', stories.pub_date)
+           UNION ALL
+           SELECT rl.keyword_id, date_trunc('hour', ra.re_created_timestamp),
+           0, COUNT(*)
+           FROM reddit_keyword_link rl JOIN reddit_article ra ON ra.re_article_id = rl.re_article_id
+           WHERE ra.re_created_timestamp IS NOT NULL
+           GROUP BY rl.keyword_id, date_trunc('hour', ra.re_created_timestamp)
+       ) AS counts
+       GROUP BY keyword_id, hour_start;"""
+]
+
+
+def backfill_rollups(conn) -> None:
+    """Empties and refills every rollup table, leaving them untouched if any step fails"""
+    try:
+        with conn.cursor() as cur:
+            for query in BACKFILL_QUERIES:
+                cur.execute(query)
+        conn.commit()
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    connection = psycopg2.connect(dbname=environ["DATABASE_NAME"],
+                                  user=environ["DATABASE_USERNAME"],
+                                  host=environ["DATABASE_ENDPOINT"],
+                                  password=environ["DATABASE_PASSWORD"],
+                                  port=environ.get("DB_PORT", 5432))
+    backfill_rollups(connection)
+    print("Rebuilt the hourly rollup tables")
+    connection.close()
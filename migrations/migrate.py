@@ -0,0 +1,107 @@
+"""Applies the numbered SQL migrations in this folder to the database, once each,
+and shows the query plans of the report queries before and after"""
+
+import argparse
+from os import environ
+from pathlib import Path
+
+from dotenv import load_dotenv
+import psycopg2
+
+MIGRATIONS_FOLDER = Path(__file__).parent
+REPORT_QUERIES = {
+    "top stories": """SELECT title FROM stories
+        WHERE pub_date BETWEEN NOW() - INTERVAL '24 HOURS' AND NOW()
+        ORDER BY media_sentiment DESC LIMIT 3;""",
+    "media averages": """SELECT source_name, AVG(media_sentiment) FROM stories
+        JOIN sources ON sources.source_id = stories.source_id
+        WHERE stories.pub_date BETWEEN NOW() - INTERVAL '24 HOURS' AND NOW()
+        GROUP BY source_name ORDER BY source_name;""",
+    "topic counts": """SELECT keywords.keyword,
+        COUNT(DISTINCT stories.story_id) + COUNT(DISTINCT ra.re_article_id) AS total_count
+        FROM keywords
+        JOIN story_keyword_link ON keywords.keyword_id = story_keyword_link.keyword_id
+        JOIN stories ON story_keyword_link.story_id = stories.story_id
+        JOIN reddit_keyword_link rl ON keywords.keyword_id = rl.keyword_id
+        JOIN reddit_article ra ON ra.re_article_id = rl.re_article_id
+        WHERE stories.pub_date >= (CURRENT_TIMESTAMP - INTERVAL '24 hours')
+        AND ra.re_created_timestamp >= (CURRENT_TIMESTAMP - INTERVAL '24 hours')
+        GROUP BY keywords.keyword ORDER BY total_count DESC LIMIT 5;"""
+}
+
+
+def get_migration_files(folder: Path = MIGRATIONS_FOLDER) -> list[Path]:
+    """Returns the migration files in version order"""
+    return sorted(folder.glob("[0-9][0-9][0-9]_*.sql"))
+
+
+def get_applied_versions(conn) -> set[str]:
+    """Returns the versions already applied, creating the table recording them if needed"""
+    with conn.cursor() as cur:
+        cur.execute("""CREATE TABLE IF NOT EXISTS schema_migrations(
+                       version TEXT PRIMARY KEY,
+                       applied_at TIMESTAMP DEFAULT NOW());""")
+        cur.execute("SELECT version FROM schema_migrations;")
+        versions = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return versions
+
+
+def apply_migrations(conn, migration_files: list[Path]) -> list[str]:
+    """Applies each migration not yet recorded in its own transaction.
+    Returns the versions that were applied"""
+    applied_versions = get_applied_versions(conn)
+    newly_applied = []
+    for migration_file in migration_files:
+        version = migration_file.stem
+        if version in applied_versions:
+            continue
+        try:
+            with conn.cursor() as cur:
+                cur.execute(migration_file.read_text())
+                cur.execute("INSERT INTO schema_migrations (version) VALUES (%s);", [version])
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+        newly_applied.append(version)
+    return newly_applied
+
+
+def explain_report_queries(conn) -> dict[str, str]:
+    """Returns the query plan of each report query"""
+    plans = {}
+    with conn.cursor() as cur:
+        for name, query in REPORT_QUERIES.items():
+            cur.execute(f"EXPLAIN {query}")
+            plans[name] = "\n".join(row[0] for row in cur.fetchall())
+    conn.rollback()
+    return plans
+
+
+def print_plans(heading: str, plans: dict[str, str]) -> None:
+    """Prints each query plan under the heading"""
+    print(f"===== {heading} =====")
+    for name, plan in plans.items():
+        print(f"--- {name} ---\n{plan}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--explain", action="store_true",
+                        help="show the report query plans before and after migrating")
+    args = parser.parse_args()
+
+    load_dotenv()
+    connection = psycopg2.connect(dbname=environ["DATABASE_NAME"],
+                                  user=environ["DATABASE_USERNAME"],
+                                  host=environ["DATABASE_ENDPOINT"],
+                                  password=environ["DATABASE_PASSWORD"],
+                                  port=environ.get("DB_PORT", 5432))
+    if args.explain:
+        print_plans("Before", explain_report_queries(connection))
+    versions = apply_migrations(connection, get_migration_files())
+    print(f"Applied {len(versions)} migrations: {', '.join(versions) or 'none'}")
+    if args.explain:
+        print_plans("After", explain_report_queries(connection))
+    connection.close()
@@ -0,0 +1,101 @@
+"""Contains the unit tests for migrate.py and backfill_rollups.py"""
+
+# pylint: skip-file
+
+from pathlib import Path
+import re
+from unittest.mock import MagicMock
+
+import psycopg2
+import pytest
+
+from migrate import get_migration_files, apply_migrations
+from backfill_rollups import backfill_rollups
+
+SETUP_FILE = Path(__file__).parent.parent / "setup.sql"
+# Tables of the schema deployed before the migrations existed
+ORIGINAL_TABLES = {"sources", "stories", "keywords", "reddit_article", "reddit_keyword_link",
+                   "story_keyword_link"}
+CREATE_TABLE = re.compile(r"CREATE TABLE (?:IF NOT EXISTS )?(\w+)\((.*?)\n\);", re.DOTALL)
+
+
+def get_created_tables(sql: str) -> dict[str, str]:
+    """Returns the definition of each table the SQL creates, ignoring whitespace"""
+    return {name: " ".join(definition.split()) for name, definition in CREATE_TABLE.findall(sql)}
+
+
+def test_migration_files_in_version_order(tmp_path):
+    """Checks only numbered SQL files are returned, in version order"""
+    for name in ["010_later.sql", "002_second.sql", "001_first.sql", "notes.sql", "003_draft.txt"]:
+        (tmp_path / name).write_text("SELECT 1;")
+
+    assert [path.name for path in get_migration_files(tmp_path)] == [
+        "001_first.sql", "002_second.sql", "010_later.sql"]
+
+
+def test_applied_migrations_skipped(tmp_path):
+    """Checks migrations already recorded are not run again and new ones are recorded"""
+    (tmp_path / "001_first.sql").write_text("CREATE INDEX first_idx ON stories (title);")
+    (tmp_path / "002_second.sql").write_text("CREATE INDEX second_idx ON stories (url);")
+    fake_conn = MagicMock()
+    fake_cur = fake_conn.cursor.return_value.__enter__.return_value
+    fake_cur.fetchall.return_value = [("001_first",)]
+
+    applied = apply_migrations(fake_conn, get_migration_files(tmp_path))
+
+    assert applied == ["002_second"]
+    executed = [call.args[0] for call in fake_cur.execute.call_args_list]
+    assert "CREATE INDEX second_idx ON stories (url);" in executed
+    assert "CREATE INDEX first_idx ON stories (title);" not in executed
+    assert fake_cur.execute.call_args.args[1] == ["002_second"]
+
+
+def test_repo_migrations_are_idempotent():
+    """Checks every statement in the shipped migrations can be run more than once"""
+    for migration_file in get_migration_files():
+        for statement in migration_file.read_text().split(";"):
+            statement = " ".join(line for line in statement.splitlines()
+                                 if not line.strip().startswith("--")).strip()
+            if statement:
+                assert "IF NOT EXISTS" in statement, migration_file.name
+
+
+def test_setup_tables_created_by_migrations():
+    """Checks every table setup.sql adds to the original schema is created, with the same
+    columns and constraints, by a migration"""
+    migrated_tables = {}
+    for migration_file in get_migration_files():
+        migrated_tables.update(get_created_tables(migration_file.read_text()))
+
+    setup_tables = get_created_tables(SETUP_FILE.read_text())
+
+    assert ORIGINAL_TABLES <= setup_tables.keys()
+    for name, definition in setup_tables.items():
+        if name not in ORIGINAL_TABLES:
+            assert migrated_tables.get(name) == definition, name
+
+
+def test_backfill_rolled_back_on_error():
+    """Checks a failed backfill leaves the rollup tables as they were"""
+    fake_conn = MagicMock()
+    fake_cur = fake_conn.cursor.return_value.__enter__.return_value
+    fake_cur.execute.side_effect = [None, psycopg2.Error()]
+
+    with pytest.raises(psycopg2.Error):
+        backfill_rollups(fake_conn)
+
+    fake_conn.rollback.assert_called_once()
+    fake_conn.commit.assert_not_called()
+
+
+def test_backfill_empties_before_refilling():
+    """Checks every rollup table is truncated before any is refilled"""
+    fake_conn = MagicMock()
+    fake_cur = fake_conn.cursor.return_value.__enter__.return_value
+
+    backfill_rollups(fake_conn)
+
+    executed = [call.args[0] for call in fake_cur.execute.call_args_list]
+    assert executed[0].startswith("TRUNCATE")
+    assert len(executed) == 4
+    fake_conn.commit.assert_called_once()
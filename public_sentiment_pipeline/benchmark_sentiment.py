@@ -0,0 +1,58 @@
+"""Compares the comments scored per second before and after sharing the VADER analyser."""
+
+import random
+import time
+
+import nltk
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from sentiment import score_many, score_text
+
+BENCHMARK_COMMENT_COUNT = 2000
+SHORT_COMMENTS = ["this", "lol", "Yes", "No", "Exactly.", "This is the way", "Good.", "[Text](link)"]
+LONG_COMMENTS = ["The government should be ashamed of how this has been handled, it is a disgrace.",
+                 "Honestly a great result for the town, the volunteers did an amazing job.",
+                 "I don't think anyone expected the prices to rise this quickly, it's worrying.",
+                 "Not sure why people are surprised, this has been coming for years."]
+
+
+def create_benchmark_comments(comment_count: int = BENCHMARK_COMMENT_COUNT) -> list[str]:
+    """Returns a list of comments with a mix of repeated short and unique long comments."""
+    random.seed(0)
+    comments = []
+    for index in range(comment_count):
+        if random.random() < 0.4:
+            comments.append(random.choice(SHORT_COMMENTS))
+        else:
+            comments.append(f"{random.choice(LONG_COMMENTS)} ({index})")
+    return comments
+
+
+def score_with_new_analyser_per_comment(comments: list[str]) -> list[float]:
+    """Scores each comment the way the pipeline used to, building an analyser every time."""
+    return [SentimentIntensityAnalyzer().polarity_scores(comment)["compound"]
+            for comment in comments]
+
+
+def time_comments_per_second(scoring_function, comments: list[str]) -> float:
+    """Returns how many comments per second the scoring function processes."""
+    start = time.perf_counter()
+    scoring_function(comments)
+    return len(comments) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    nltk.download("vader_lexicon", quiet=True)
+    benchmark_comments = create_benchmark_comments()
+
+    before = time_comments_per_second(
+        score_with_new_analyser_per_comment, benchmark_comments)
+    score_text.cache_clear()
+    after_cold = time_comments_per_second(score_many, benchmark_comments)
+    after_warm = time_comments_per_second(score_many, benchmark_comments)
+
+    print(f"Analyser per comment: {before:,.0f} comments/sec")
+    print(f"Shared analyser:      {after_cold:,.0f} comments/sec "
+          f"({after_cold / before:.0f}x)")
+    print(f"Shared analyser with warm memo: {after_warm:,.0f} comments/sec "
+          f"({after_warm / before:.0f}x)")
@@ -1,21 +1,38 @@
 """Contains the functions required to extract the titles and comments for Reddit posts."""
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 from datetime import datetime
 import re
 import os
+from threading import Lock
+import time
+from typing import Iterator
 from zipfile import ZipFile
 
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import dotenv_values
 from boto3 import client
 from pytz import timezone
 
+from ingestion_state import get_high_water_mark, get_stored_comment_counts
+
 MAX_REDDIT_PAGES = 40
 MAX_REDDIT_COMMENTS = 500
 
 MIN_PROCESSED_COMMENTS = 5
 
+MAX_LISTING_PAGES = 5
+MIN_NEW_COMMENTS_TO_REFRESH = 10
+
+MAX_FETCH_WORKERS = 8
+REQUEST_TIMEOUT = (3.05, 30)
+MAX_REQUEST_ATTEMPTS = 4
+RETRY_BACKOFF_SECONDS = 1
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RATE_LIMIT_RESERVE = 2
+
 REDDIT_URL = "https://oauth.reddit.com/r/"
 SUBREDDIT_URL = "https://oauth.reddit.com/"
 REDDIT_ACCESS_TOKEN_URL = "https://www.reddit.com/api/v1/access_token"
@@ -30,6 +47,8 @@ REDDIT_POST_COMMENTS = "comment_count"
 REDDIT_INCLUDED_COMMENTS = "included_comment_count"
 REDDIT_CREATED_UTC = "creation_timestamp"
 REDDIT_COMMENTS = "comments"
+REDDIT_FULLNAME = "fullname"
+REDDIT_CREATED_EPOCH = "created_utc"
 
 
 def get_reddit_access_token(config: dict) -> dict:
@@ -50,13 +69,15 @@ def get_reddit_access_token(config: dict) -> dict:
     return response.json()["access_token"]
 
 
-def get_subreddit_json(config: dict, reddit_access_token: str) -> dict:
-    """Returns the JSON for a subreddit endpoint."""
+def get_subreddit_json(config: dict, reddit_access_token: str, after: str | None = None) -> dict:
+    """Returns the JSON for a subreddit endpoint, starting after the given fullname if provided."""
     subreddit = config["REDDIT_TOPIC"]
     print(f"Fetching data from the {subreddit} subreddit.")
     auth_headers = {"Authorization": f"bearer {reddit_access_token}",
                     "User-Agent": "Media-Sentiment/0.1 by Media-Project"}
     parameters = {"limit": MAX_REDDIT_PAGES}
+    if after:
+        parameters["after"] = after
 
     response = requests.get(f"{REDDIT_URL}{subreddit}/new",
                             headers=auth_headers, params=parameters)
@@ -67,6 +88,58 @@ def get_subreddit_json(config: dict, reddit_access_token: str) -> dict:
     return response.json()
 
 
+def is_high_water_mark_reached(posts: list[dict], high_water_mark: dict) -> bool:
+    """Returns whether any of the posts is at or older than the high water mark."""
+    for post in posts:
+        if post["data"].get("name") == high_water_mark[REDDIT_FULLNAME]:
+            return True
+        if post["data"].get("created_utc", float("inf")) <= high_water_mark[REDDIT_CREATED_EPOCH]:
+            return True
+    return False
+
+
+def get_subreddit_listing(config: dict, reddit_access_token: str,
+                          high_water_mark: dict | None = None) -> dict:
+    """Returns the newest posts of a subreddit.
+
+    With a high water mark, older listing pages are requested using `after` until the
+    newest post from the previous run is reached, up to MAX_LISTING_PAGES."""
+    reddit_json = get_subreddit_json(config, reddit_access_token)
+    posts = list(reddit_json["data"]["children"])
+    listing_pages = 1
+    while (high_water_mark and listing_pages < MAX_LISTING_PAGES
+           and reddit_json["data"].get("after")
+           and not is_high_water_mark_reached(reddit_json["data"]["children"], high_water_mark)):
+        reddit_json = get_subreddit_json(
+            config, reddit_access_token, reddit_json["data"]["after"])
+        posts.extend(reddit_json["data"]["children"])
+        listing_pages += 1
+    return {"data": {"children": posts}}
+
+
+def remove_unchanged_pages(pages_list: list[dict], stored_comment_counts: dict[str, int],
+                           min_new_comments: int = MIN_NEW_COMMENTS_TO_REFRESH) -> list[dict]:
+    """Removes pages that do not need their comments fetched.
+
+    These are pages with too few comments to be processed and stored pages
+    whose comment count has grown by less than the threshold."""
+    changed_pages = []
+    for page in pages_list:
+        if page[REDDIT_POST_COMMENTS] < MIN_PROCESSED_COMMENTS:
+            continue
+        stored_count = stored_comment_counts.get(page[REDDIT_SUBREDDIT_URL])
+        if stored_count is not None and page[REDDIT_POST_COMMENTS] - stored_count < min_new_comments:
+            continue
+        changed_pages.append(page)
+    print(f"Skipping {len(pages_list) - len(changed_pages)} unchanged pages.")
+    return changed_pages
+
+
+def is_incremental_enabled(config: dict) -> bool:
+    """Returns whether only new or changed pages should be fetched."""
+    return str(config.get("REDDIT_INCREMENTAL", "true")).lower() in ("true", "1", "yes")
+
+
 def create_pages_list(reddit_json: dict) -> list[dict]:
     """Creates a list containing the links for each page."""
     pages_list = []
@@ -82,6 +155,8 @@ def create_pages_list(reddit_json: dict) -> list[dict]:
             page_dict[REDDIT_POST_COMMENTS] = page["data"]["num_comments"]
             page_dict[REDDIT_CREATED_UTC] = datetime.strftime(
                 datetime.fromtimestamp(page["data"]["created_utc"]), "%Y-%m-%d %H:%M:%S")
+            page_dict[REDDIT_CREATED_EPOCH] = page["data"]["created_utc"]
+            page_dict[REDDIT_FULLNAME] = page["data"].get("name")
             pages_list.append(page_dict)
         except KeyError:
             print("Missing attribute. Skipping entry.")
@@ -115,36 +190,97 @@ def upload_zip_s3(config: dict, zip_filename: str) -> None:  # pragma: no cover
         zip_filename, config["REDDIT_JSON_BUCKET_NAME"], zip_filename)
 
 
-def get_json_from_request(subreddit_url: str, reddit_access_token: str) -> dict:
-    """Returns the contents of a subreddit page GET request."""
-    auth_headers = {"Authorization": f"bearer {reddit_access_token}",
-                    "User-Agent": "Media-Sentiment/0.1 by Media-Project"}
-    parameters = {"limit": MAX_REDDIT_COMMENTS, "show": "all"}
+class RedditRateLimiter:
+    """Paces requests using the X-Ratelimit headers returned by Reddit.
 
-    response = requests.get(
-        subreddit_url, headers=auth_headers, params=parameters)
-    if response.status_code != 200:
-        raise ConnectionError(
-            f"Unexpected non-200 status code returned for the url: {subreddit_url}. " +
-            f"Code: {response.status_code}")
-    return response.json()
+    Once the remaining requests fall to the reserve, callers wait until the window resets."""
 
+    def __init__(self, reserve: int = RATE_LIMIT_RESERVE) -> None:
+        self.reserve = reserve
+        self.remaining = None
+        self.reset_at = None
+        self.lock = Lock()
 
-def read_json_as_text(json_filename: str) -> list[str]:  # pragma: no cover
-    """Returns the contents of a JSON file as a list of strings."""
-    with open(json_filename, "r") as f_obj:
-        return f_obj.readlines()
+    def wait(self) -> None:
+        """Blocks until a request can be made without exceeding the rate limit."""
+        with self.lock:
+            if self.remaining is not None and self.remaining <= self.reserve:
+                delay = self.reset_at - time.monotonic()
+                if delay > 0:
+                    print(f"Reddit rate limit reached, waiting {delay:.1f} seconds.")
+                    time.sleep(delay)
+                self.remaining = None
+            elif self.remaining is not None:
+                self.remaining -= 1
+
+    def update(self, headers: dict) -> None:
+        """Records the remaining requests and reset time from a response."""
+        try:
+            remaining = float(headers["X-Ratelimit-Remaining"])
+            reset_at = time.monotonic() + float(headers["X-Ratelimit-Reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        with self.lock:
+            self.remaining = remaining
+            self.reset_at = reset_at
+
+
+def get_retry_delay(response, attempt: int) -> float:
+    """Returns how long to wait before retrying, using Retry-After when Reddit provides it."""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, TypeError, ValueError):
+        return RETRY_BACKOFF_SECONDS * 2 ** attempt
+
+
+def create_reddit_session(pool_size: int = MAX_FETCH_WORKERS) -> requests.Session:
+    """Returns a keep-alive session able to hold a connection for each worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_json_from_request(subreddit_url: str, reddit_access_token: str,
+                          session: requests.Session | None = None,
+                          rate_limiter: RedditRateLimiter | None = None) -> dict:
+    """Returns the contents of a subreddit page GET request.
+
+    Rate limited and server error responses are retried with backoff."""
+    auth_headers = {"Authorization": f"bearer {reddit_access_token}",
+                    "User-Agent": "Media-Sentiment/0.1 by Media-Project"}
+    parameters = {"limit": MAX_REDDIT_COMMENTS, "show": "all"}
+    http = session if session is not None else requests
+
+    for attempt in range(MAX_REQUEST_ATTEMPTS):
+        if rate_limiter:
+            rate_limiter.wait()
+        response = http.get(
+            subreddit_url, headers=auth_headers, params=parameters, timeout=REQUEST_TIMEOUT)
+        if rate_limiter:
+            rate_limiter.update(response.headers)
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_REQUEST_ATTEMPTS - 1:
+            break
+        time.sleep(get_retry_delay(response, attempt))
+
+    raise ConnectionError(
+        f"Unexpected non-200 status code returned for the url: {subreddit_url}. " +
+        f"Code: {response.status_code}")
 
 
 def remove_unrecognised_formatting(comment: str) -> str:
     """Removes formatting not recognised by Vader."""
     characters_to_remove = ("\n", "\\n", "#x200B;",
-                            "\\u2013", "&gt;", "\\u2026")
+                            "\\u2013", "&gt;", "\\u2026", "\u2013", "\u2026", "\u200b")
     for text in characters_to_remove:
         comment = comment.replace(text, "")
 
     characters_to_replace = (
-        {"&amp;": "&", "\\u2018": "'", "\\u2019": "'", "\\u00a": "£", "\\u201c": "\"", "\\u201d": "\""})
+        {"&amp;": "&", "\\u2018": "'", "\\u2019": "'", "\\u00a": "£", "\\u201c": "\"", "\\u201d": "\"",
+         "\u2018": "'", "\u2019": "'", "\u201c": "\"", "\u201d": "\""})
 
     for text in characters_to_replace:
         comment = comment.replace(text, characters_to_replace[text])
@@ -166,19 +302,36 @@ def clean_reddit_comments(comment: str) -> str | bool:
     return False
 
 
-def get_comments_list(json_filename: str) -> list[str]:
-    """Returns a list of comments from a file."""
-    comment_list = []
-    json_content = read_json_as_text(json_filename)
-    for line in json_content:
-        line = line.strip()
-        find_comment = re.search(r"\"body\": \"(.+)\",", line)
-        if find_comment:
-            comment = find_comment.group(1)
-            cleaned_comment = clean_reddit_comments(comment)
-            if cleaned_comment:
-                comment_list.append(cleaned_comment)
-    return comment_list
+def iterate_comment_bodies(listing: dict | list) -> Iterator[str]:
+    """Yields the body of every comment in a Reddit listing, including nested replies."""
+    stack = [listing]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        data = node.get("data", {})
+        if node.get("kind") == "t1" and "body" in data:
+            yield data["body"]
+        if data.get("replies"):
+            stack.append(data["replies"])
+        if data.get("children"):
+            stack.extend(reversed(data["children"]))
+
+
+def iterate_cleaned_comments(page_json: dict | list) -> Iterator[str]:
+    """Yields each comment of a Reddit page in a format supported by Vader, skipping unsuitable comments."""
+    for comment in iterate_comment_bodies(page_json):
+        cleaned_comment = clean_reddit_comments(comment)
+        if cleaned_comment:
+            yield cleaned_comment
+
+
+def get_comments_list(page_json: dict | list) -> list[str]:
+    """Returns a list of comments from the JSON of a Reddit page."""
+    return list(iterate_cleaned_comments(page_json))
 
 
 def create_zip_filename() -> str:
@@ -195,42 +348,77 @@ def create_zip_folder(filename_list: list[str], zip_filename: str) -> None:  # p
             f_obj.write(file)
 
 
-def process_each_reddit_page(pages_list: list[dict], reddit_access_token: str, config: dict) -> list[dict]:
-    """Iterates through the list of Reddit pages.
-
-    Fetches the JSON, uploads to S3 and processes it.
-    """
-    print("Commencing fetch of subreddit pages.")
-    response_list = []
-    filename_list = []
-    for page in pages_list:
-        try:
-            json_filename = create_json_filename(page[REDDIT_TITLE_KEY])
-            page_json = get_json_from_request(
-                SUBREDDIT_URL+page[REDDIT_SUBREDDIT_URL], reddit_access_token)
-            save_json_to_file(page_json, json_filename)
-            filename_list.append(json_filename)
-            page[REDDIT_COMMENTS] = get_comments_list(json_filename)
-            page[REDDIT_INCLUDED_COMMENTS] = len(page[REDDIT_COMMENTS])
-            if page[REDDIT_INCLUDED_COMMENTS] >= MIN_PROCESSED_COMMENTS:
-                response_list.append(page)
-        except (ConnectionError, AttributeError) as err:
-            print(err)
-    print("Fetch of each subreddit page complete.")
+def archive_reddit_json(page_json_list: list[tuple[str, dict]], config: dict) -> None:
+    """Saves the JSON for each page, compresses the files and uploads them to S3."""
     print("Uploading zip file to S3.")
+    filename_list = []
+    for reddit_title, page_json in page_json_list:
+        json_filename = create_json_filename(reddit_title)
+        save_json_to_file(page_json, json_filename)
+        filename_list.append(json_filename)
     zip_filename = create_zip_filename()
     create_zip_folder(filename_list, zip_filename)
     upload_zip_s3(config, zip_filename)
     print("Zip file uploaded to S3.")
-    return response_list
 
 
-def run_extract() -> list[dict]:  # pragma: no cover
-    """Returns a list of dictionaries for each page in a subreddit."""
+def is_archive_enabled(config: dict) -> bool:
+    """Returns whether the JSON for each page should be archived to S3."""
+    return str(config.get("ARCHIVE_REDDIT_JSON", "true")).lower() in ("true", "1", "yes")
+
+
+def process_each_reddit_page(pages_list: list[dict], reddit_access_token: str, config: dict,
+                             max_workers: int = MAX_FETCH_WORKERS) -> list[dict]:
+    """Iterates through the list of Reddit pages.
+
+    Fetches the JSON for the pages concurrently through one session, processing each page
+    in memory as it arrives, and archives it to S3 afterwards if enabled.
+    """
+    print("Commencing fetch of subreddit pages.")
+    archive_enabled = is_archive_enabled(config)
+    rate_limiter = RedditRateLimiter()
+    processed_pages = []
+    page_json_list = []
+    with create_reddit_session(max_workers) as session, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(get_json_from_request, SUBREDDIT_URL+page[REDDIT_SUBREDDIT_URL],
+                                   reddit_access_token, session, rate_limiter): index
+                   for index, page in enumerate(pages_list)}
+        for future in as_completed(futures):
+            index = futures[future]
+            page = pages_list[index]
+            try:
+                page_json = future.result()
+                if archive_enabled:
+                    page_json_list.append((page[REDDIT_TITLE_KEY], page_json))
+                page[REDDIT_COMMENTS] = get_comments_list(page_json)
+                page[REDDIT_INCLUDED_COMMENTS] = len(page[REDDIT_COMMENTS])
+                if page[REDDIT_INCLUDED_COMMENTS] >= MIN_PROCESSED_COMMENTS:
+                    processed_pages.append((index, page))
+            except (ConnectionError, AttributeError, requests.RequestException) as err:
+                print(err)
+    print("Fetch of each subreddit page complete.")
+    if archive_enabled:
+        archive_reddit_json(page_json_list, config)
+    return [page for _, page in sorted(processed_pages, key=lambda item: item[0])]
+
+
+def run_extract(conn=None) -> list[dict]:  # pragma: no cover
+    """Returns a list of dictionaries for each page in a subreddit.
+
+    When a database connection is provided in incremental mode, only new pages and
+    pages whose comment count has grown are fetched."""
     configuration = os.environ
+    incremental = conn is not None and is_incremental_enabled(configuration)
     reddit_token = get_reddit_access_token(configuration)
-    reddit_json = get_subreddit_json(configuration, reddit_token)
+    high_water_mark = get_high_water_mark(
+        conn, configuration["REDDIT_TOPIC"]) if incremental else None
+    reddit_json = get_subreddit_listing(
+        configuration, reddit_token, high_water_mark)
     list_of_json = create_pages_list(reddit_json)
+    if incremental:
+        list_of_json = remove_unchanged_pages(list_of_json, get_stored_comment_counts(
+            conn, [page[REDDIT_SUBREDDIT_URL] for page in list_of_json]))
     return process_each_reddit_page(
         list_of_json, reddit_token, configuration)
 
@@ -0,0 +1,76 @@
+"""Contains the functions that record how far a subreddit has been ingested."""
+
+from psycopg2 import ProgrammingError
+from psycopg2.errorcodes import UNDEFINED_TABLE
+
+REDDIT_FULLNAME = "fullname"
+REDDIT_CREATED_EPOCH = "created_utc"
+
+
+def get_high_water_mark(conn, subreddit: str) -> dict | None:  # pragma: no cover
+    """Returns the fullname and created_utc of the newest post ingested from a subreddit.
+
+    Returns None, so the whole listing is fetched, until migration 005_reddit_ingestion_state
+    has created the table."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                        SELECT newest_fullname, newest_created_utc FROM reddit_ingestion_state
+                        WHERE subreddit = %s;""",
+                        (subreddit,))
+            returned = cur.fetchone()
+    except ProgrammingError as error:
+        if error.pgcode != UNDEFINED_TABLE:
+            raise
+        conn.rollback()
+        print("reddit_ingestion_state does not exist, fetching the whole listing.")
+        return None
+    if returned:
+        return {REDDIT_FULLNAME: returned[0], REDDIT_CREATED_EPOCH: returned[1]}
+    return None
+
+
+def find_newest_page(page_response_list: list[dict]) -> dict | None:
+    """Returns the most recently created page that has a fullname."""
+    pages = [page for page in page_response_list
+             if page.get(REDDIT_FULLNAME) and page.get(REDDIT_CREATED_EPOCH) is not None]
+    if not pages:
+        return None
+    return max(pages, key=lambda page: page[REDDIT_CREATED_EPOCH])
+
+
+def save_high_water_mark(conn, subreddit: str, page_response_list: list[dict]) -> None:  # pragma: no cover
+    """Stores the newest page as the high water mark, unless a newer one is already stored."""
+    newest_page = find_newest_page(page_response_list)
+    if not newest_page:
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO reddit_ingestion_state (subreddit, newest_fullname, newest_created_utc)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (subreddit) DO UPDATE
+                SET newest_fullname = EXCLUDED.newest_fullname,
+                    newest_created_utc = EXCLUDED.newest_created_utc
+                WHERE EXCLUDED.newest_created_utc > reddit_ingestion_state.newest_created_utc;""",
+                        (subreddit, newest_page[REDDIT_FULLNAME],
+                         newest_page[REDDIT_CREATED_EPOCH]))
+    except ProgrammingError as error:
+        if error.pgcode != UNDEFINED_TABLE:
+            raise
+        conn.rollback()
+        print("reddit_ingestion_state does not exist, the high water mark was not saved.")
+        return
+    conn.commit()
+
+
+def get_stored_comment_counts(conn, page_urls: list[str]) -> dict[str, int]:  # pragma: no cover
+    """Returns the comment count last stored for each page already in reddit_article."""
+    if not page_urls:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute("""
+                    SELECT re_url, re_post_comments FROM reddit_article
+                    WHERE re_url = ANY(%s);""",
+                    (list(page_urls),))
+        return dict(cur.fetchall())
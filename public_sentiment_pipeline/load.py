@@ -5,9 +5,10 @@ import time
 import os
 
 from dotenv import dotenv_values
-from psycopg2 import connect
+from psycopg2 import connect, extras, DatabaseError
 
 from transform import run_transform
+from ingestion_state import save_high_water_mark
 
 REDDIT_TITLE_KEY = "title"
 REDDIT_SUBREDDIT_URL = "subreddit_url"
@@ -23,6 +24,36 @@ REDDIT_SENTIMENT_MEAN = "mean_sentiment"
 REDDIT_SENTIMENT_ST_DEV = "st_dev_sentiment"
 REDDIT_SENTIMENT_MEDIAN = "median_sentiment"
 
+UPSERT_REDDIT_ARTICLE_QUERY = """
+    INSERT INTO reddit_article (re_domain, re_title, re_article_url, re_url,
+            re_sentiment_mean, re_sentiment_st_dev, re_sentiment_median, re_vote_score,
+            re_upvote_ratio, re_post_comments, re_processed_comments, re_created_timestamp)
+    VALUES %s
+    ON CONFLICT (re_url) DO UPDATE SET re_domain = EXCLUDED.re_domain, re_title = EXCLUDED.re_title,
+            re_article_url = EXCLUDED.re_article_url, re_sentiment_mean = EXCLUDED.re_sentiment_mean,
+            re_sentiment_st_dev = EXCLUDED.re_sentiment_st_dev,
+            re_sentiment_median = EXCLUDED.re_sentiment_median, re_vote_score = EXCLUDED.re_vote_score,
+            re_upvote_ratio = EXCLUDED.re_upvote_ratio, re_post_comments = EXCLUDED.re_post_comments,
+            re_processed_comments = EXCLUDED.re_processed_comments,
+            re_created_timestamp = EXCLUDED.re_created_timestamp
+    RETURNING (xmax = 0) AS inserted;"""
+
+REFRESH_REDDIT_SENTIMENT_QUERY = """
+    INSERT INTO reddit_sentiment_hourly (re_domain, hour_start, sentiment_sum, sentiment_count,
+            sentiment_min, sentiment_max)
+    SELECT reddit_article.re_domain, hours.hour_start, SUM(reddit_article.re_sentiment_mean),
+            COUNT(reddit_article.re_sentiment_mean), MIN(reddit_article.re_sentiment_mean),
+            MAX(reddit_article.re_sentiment_mean)
+    FROM (SELECT DISTINCT date_trunc('hour', re_created_timestamp) AS hour_start FROM reddit_article
+          WHERE re_url = ANY(%s) AND re_created_timestamp IS NOT NULL) AS hours
+    JOIN reddit_article ON reddit_article.re_created_timestamp >= hours.hour_start
+            AND reddit_article.re_created_timestamp < hours.hour_start + INTERVAL '1 hour'
+    WHERE reddit_article.re_domain IS NOT NULL
+    GROUP BY reddit_article.re_domain, hours.hour_start
+    ON CONFLICT (re_domain, hour_start) DO UPDATE SET sentiment_sum = EXCLUDED.sentiment_sum,
+            sentiment_count = EXCLUDED.sentiment_count, sentiment_min = EXCLUDED.sentiment_min,
+            sentiment_max = EXCLUDED.sentiment_max;"""
+
 
 def establish_database_connection(config: dict):  # pragma: no cover
     """Establishes a connection with the PostgreSQL RDS database."""
@@ -38,97 +69,48 @@ def establish_database_connection(config: dict):  # pragma: no cover
         sys.exit()
 
 
-def check_if_row_exists(conn, text: str) -> int:  # pragma: no cover
-    """Returns the re_article_id if a row already exists in the reddit_article table."""
-    with conn.cursor() as cur:
-        cur.execute("""
-                    SELECT * FROM reddit_article 
-                    WHERE re_url = %s;""",
-                    (text,))
-        returned = cur.fetchone()
-        if returned:
-            return returned[0]
-        return False
-
-
-def update_reddit_article_row(conn, page: dict, existing_article_id: int):  # pragma: no cover
-    """Updates the columns in reddit_article for an existing row."""
-    re_domain = page[REDDIT_ARTICLE_DOMAIN]
-    re_title = page[REDDIT_TITLE_KEY]
-    re_article_url = page[REDDIT_ARTICLE_URL]
-    re_url = page[REDDIT_SUBREDDIT_URL]
-    re_sentiment_mean = page[REDDIT_SENTIMENT_MEAN]
-    re_sentiment_st_dev = page[REDDIT_SENTIMENT_ST_DEV]
-    re_sentiment_median = page[REDDIT_SENTIMENT_MEDIAN]
-    re_vote_score = page[REDDIT_ARTICLE_SCORE]
-    re_upvote_ratio = page[REDDIT_UPVOTE_RATIO]
-    re_post_comments = page[REDDIT_POST_COMMENTS]
-    re_processed_comments = page[REDDIT_INCLUDED_COMMENTS]
-    re_created_timestamp = page[REDDIT_CREATED_UTC]
-    with conn.cursor() as cur:
-        cur.execute("""
-            UPDATE reddit_article SET re_domain = %s, re_title = %s, re_article_url = %s, re_url = %s, 
-                    re_sentiment_mean = %s, re_sentiment_st_dev = %s, re_sentiment_median = %s, re_vote_score = %s,
-                    re_upvote_ratio = %s, re_post_comments = %s, re_processed_comments = %s, re_created_timestamp = %s
-                    WHERE re_article_id = %s;""",
-                    (re_domain, re_title, re_article_url, re_url, re_sentiment_mean,
-                     re_sentiment_st_dev, re_sentiment_median, re_vote_score, re_upvote_ratio,
-                     re_post_comments, re_processed_comments, re_created_timestamp, existing_article_id))
-        conn.commit()
+def create_reddit_article_row(page: dict) -> tuple:
+    """Returns the values of a reddit_article row for a page."""
+    return (page[REDDIT_ARTICLE_DOMAIN], page[REDDIT_TITLE_KEY], page[REDDIT_ARTICLE_URL],
+            page[REDDIT_SUBREDDIT_URL], page[REDDIT_SENTIMENT_MEAN], page[REDDIT_SENTIMENT_ST_DEV],
+            page[REDDIT_SENTIMENT_MEDIAN], page[REDDIT_ARTICLE_SCORE], page[REDDIT_UPVOTE_RATIO],
+            page[REDDIT_POST_COMMENTS], page[REDDIT_INCLUDED_COMMENTS], page[REDDIT_CREATED_UTC])
 
 
-def insert_row_into_reddit_article(conn, page: dict) -> None:  # pragma: no cover
-    """Inserts a row into the reddit_article table."""
-    re_domain = page[REDDIT_ARTICLE_DOMAIN]
-    re_title = page[REDDIT_TITLE_KEY]
-    re_article_url = page[REDDIT_ARTICLE_URL]
-    re_url = page[REDDIT_SUBREDDIT_URL]
-    re_sentiment_mean = page[REDDIT_SENTIMENT_MEAN]
-    re_sentiment_st_dev = page[REDDIT_SENTIMENT_ST_DEV]
-    re_sentiment_median = page[REDDIT_SENTIMENT_MEDIAN]
-    re_vote_score = page[REDDIT_ARTICLE_SCORE]
-    re_upvote_ratio = page[REDDIT_UPVOTE_RATIO]
-    re_post_comments = page[REDDIT_POST_COMMENTS]
-    re_processed_comments = page[REDDIT_INCLUDED_COMMENTS]
-    re_created_timestamp = page[REDDIT_CREATED_UTC]
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO reddit_article (re_domain, re_title, re_article_url, re_url, 
-                    re_sentiment_mean, re_sentiment_st_dev, re_sentiment_median, re_vote_score,
-                    re_upvote_ratio, re_post_comments, re_processed_comments, re_created_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);""",
-                    (re_domain, re_title, re_article_url, re_url, re_sentiment_mean,
-                     re_sentiment_st_dev, re_sentiment_median, re_vote_score, re_upvote_ratio,
-                     re_post_comments, re_processed_comments, re_created_timestamp))
-        conn.commit()
+def load_each_row_into_database(conn, page_response_list: list[dict]) -> tuple[int, int]:
+    """Loads every page into the database with a single upsert in one transaction,
+    recomputing the hourly Reddit sentiment of each hour the pages were created in.
 
-
-def load_each_row_into_database(conn, page_response_list: list[dict]) -> None:
-    """Loads each page into the database."""
+    Returns the number of inserted and updated rows."""
     print("Commencing loading pages into database.")
-    row_count = 0
-    modified_count = 0
-    for page in page_response_list:
+    rows = {page[REDDIT_SUBREDDIT_URL]: create_reddit_article_row(page)
+            for page in page_response_list}
+    results = []
+    if rows:
         try:
-            existing_id = check_if_row_exists(conn, page[REDDIT_SUBREDDIT_URL])
-            if existing_id:
-                update_reddit_article_row(conn, page, existing_id)
-                modified_count += 1
-            else:
-                insert_row_into_reddit_article(conn, page)
-                row_count += 1
-        except ValueError as err:
-            print(err)
+            with conn.cursor() as cur:
+                results = extras.execute_values(cur, UPSERT_REDDIT_ARTICLE_QUERY, list(rows.values()),
+                                                page_size=len(rows), fetch=True)
+                cur.execute(REFRESH_REDDIT_SENTIMENT_QUERY, [list(rows)])
+            conn.commit()
+        except DatabaseError:
+            conn.rollback()
+            raise
+    row_count = sum(1 for result in results if result[0])
+    modified_count = len(results) - row_count
     print("Completed loading pages into database.")
     print(f"Successfully added {row_count} rows.")
     print(f"Successfully modified {modified_count} rows.")
+    return row_count, modified_count
 
 
 if __name__ == "__main__":  # pragma: no cover
     configuration = os.environ
-    list_of_page_dict = run_transform()
-    start = time.time()
     connection = establish_database_connection(configuration)
+    list_of_page_dict = run_transform(connection)
+    start = time.time()
     load_each_row_into_database(connection, list_of_page_dict)
+    save_high_water_mark(
+        connection, configuration["REDDIT_TOPIC"], list_of_page_dict)
     connection.close()
     print(f"Time to run load: {(time.time()-start):.2f} seconds.")
@@ -2,12 +2,17 @@
 
 # pylint: skip-file
 
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from threading import Thread
+
 import pytest
 
 
 class FakeGet:
     def __init__(self) -> None:
         self.status_code = 200
+        self.headers = {}
 
     def json(self):
         return {"success": True}
@@ -127,46 +132,97 @@ def fake_subreddit_json_missing_entries():
     }
 
 
+def create_fake_comment(body, replies=""):
+    return {"kind": "t1", "data": {"body": body, "body_html": f"&lt;p&gt;{body}&lt;/p&gt;", "replies": replies}}
+
+
+def create_fake_listing(children):
+    return {"kind": "Listing", "data": {"children": children}}
+
+
 @pytest.fixture
 def fake_json_content_1():
-    return ['                        "awarders": [],",',
-            '                        "banned_at_utc": null,',
-            '                        "banned_by": null,',
-            '                        "body": "This is the first comment.",',
-            '                        "body_html": "&lt;div class=\"md\"&gt;&lt;p&gt;This is the first comment.&lt;/p&gt;\n&lt;/div&gt;",',
-            '                        "can_gild": true,',
-            '                        "can_mod_post": false,',
-            '                        "collapsed": false,',
-            '                        "awarders": [],"',
-            '                        "banned_at_utc": null,',
-            '                        "banned_by": null,',
-            '                        "body": "This is the second comment.",',
-            '                        "body_html": "&lt;div class=\"md\"&gt;&lt;p&gt;This is the second comment.&lt;/p&gt;\n&lt;/div&gt;",',
-            '                        "can_gild": true,',
-            '                        "can_mod_post": false,',
-            '                        "collapsed": false,']
+    return [create_fake_listing([{"kind": "t3", "data": {"title": "Post", "selftext": "Not a comment"}}]),
+            create_fake_listing([create_fake_comment("This is the first comment."),
+                                 create_fake_comment("This is the second comment."),
+                                 {"kind": "more", "data": {"children": ["abc123"]}}])]
 
 
 @pytest.fixture
 def fake_json_content_2():
-    return ['                        "awarders": [],",',
-            '                        "banned_at_utc": null,',
-            '                        "banned_by": null,',
-            '                        "body": "This is the third comment.",',
-            '                        "body_html": "&lt;div class=\"md\"&gt;&lt;p&gt;This is the first comment.&lt;/p&gt;\n&lt;/div&gt;",',
-            '                        "can_gild": true,',
-            '                        "body": "[removed]",',
-            '                        "collapsed": false,',
-            '                        "body": "[deleted]",',
-            '                        "banned_at_utc": null,',
-            '                        "body": "**Removed/tempban**",',
-            '                        "body": "This is the fourth comment.",',
-            '                        "body_html": "&lt;div class=\"md\"&gt;&lt;p&gt;This is the second comment.&lt;/p&gt;\n&lt;/div&gt;",',
-            '                        "can_gild": true,',
-            '                        "body": "**Removed/warning**",',
-            '                        "collapsed": false,']
+    return [create_fake_listing([]),
+            create_fake_listing([create_fake_comment("This is the third comment.", create_fake_listing([
+                create_fake_comment("[removed]"),
+                create_fake_comment("[deleted]")])),
+                create_fake_comment("**Removed/tempban**"),
+                create_fake_comment("This is the fourth comment.", create_fake_listing([
+                    create_fake_comment("**Removed/warning**")]))])]
+
+
+@pytest.fixture
+def fake_json_content_nested():
+    return [create_fake_listing([]),
+            create_fake_listing([create_fake_comment("Top \"quoted\" comment", create_fake_listing([
+                create_fake_comment("Reply", create_fake_listing([
+                    create_fake_comment("Reply to reply")]))])),
+                create_fake_comment("Second \u2018top\u2019 comment")])]
 
 
 @pytest.fixture
 def fake_page_response_list():
     return [{"title": "a", "subreddit_url": "b", "article_url": "c", "article_domain": "d", "comments": ["a", "b"]}, {"title": "e", "subreddit_url": "f", "article_url": "g", "article_domain": "h", "comments": ["c", "d"]}]
+
+
+class StubRedditHandler(BaseHTTPRequestHandler):
+    """Serves fake comment threads with Reddit's rate limit headers.
+
+    The first request to /r/limited is answered with 429 Too Many Requests."""
+    request_counts = {}
+    remaining = 100
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        StubRedditHandler.request_counts[path] = StubRedditHandler.request_counts.get(path, 0) + 1
+        StubRedditHandler.remaining -= 1
+
+        if path == "/r/limited" and StubRedditHandler.request_counts[path] == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+
+        comments = [{"kind": "t1", "data": {"body": f"Comment {index} on {path}", "replies": ""}}
+                    for index in range(3)]
+        body = json.dumps([{"kind": "Listing", "data": {"children": []}},
+                           {"kind": "Listing", "data": {"children": comments}}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Ratelimit-Remaining", str(StubRedditHandler.remaining))
+        self.send_header("X-Ratelimit-Reset", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_reddit_server():
+    """Runs a local HTTP server imitating the Reddit API, returns its base url"""
+    StubRedditHandler.request_counts = {}
+    StubRedditHandler.remaining = 100
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubRedditHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fake_scored_page_list():
+    return [{"title": title, "subreddit_url": f"/r/uk/{title}", "article_url": "c", "article_domain": "d",
+             "score": 10, "upvote_ratio": 0.5, "comment_count": 20, "included_comment_count": 15,
+             "creation_timestamp": "2023-09-04 12:00:00", "mean_sentiment": 0.1,
+             "st_dev_sentiment": 0.2, "median_sentiment": 0.05} for title in ("a", "b", "c")]
@@ -9,8 +9,8 @@ from re import match
 
 import pytest
 
-from reddit_conftest import FakeGet, FakePost, fake_subreddit_json, fake_subreddit_json_missing_entries, fake_json_content_1, fake_json_content_2
-from extract import get_subreddit_json, get_reddit_access_token, create_pages_list, create_json_filename, get_json_from_request, get_comments_list, process_each_reddit_page, remove_unrecognised_formatting, create_zip_filename
+from reddit_conftest import FakeGet, FakePost, fake_subreddit_json, fake_subreddit_json_missing_entries, fake_json_content_1, fake_json_content_2, fake_json_content_nested, stub_reddit_server, StubRedditHandler
+from extract import RedditRateLimiter, get_subreddit_listing, remove_unchanged_pages, is_high_water_mark_reached, get_subreddit_json, get_reddit_access_token, create_pages_list, create_json_filename, get_json_from_request, get_comments_list, iterate_cleaned_comments, process_each_reddit_page, remove_unrecognised_formatting, create_zip_filename
 
 
 @patch("requests.get")
@@ -123,8 +123,9 @@ def test_json_returned_from_successful_request(fake_get):
     assert isinstance(res, dict)
 
 
+@patch("extract.time.sleep")
 @patch("requests.get")
-def test_connection_error_raised_successful_request(fake_get):
+def test_connection_error_raised_successful_request(fake_get, fake_sleep):
     """Tests a Connection error is raised if a non-200 status code is returned."""
     subreddit_url = "www.reddit.com"
     reddit_access_token = "12345"
@@ -136,36 +137,45 @@ def test_connection_error_raised_successful_request(fake_get):
         get_json_from_request(subreddit_url, reddit_access_token)
 
 
-@patch("extract.read_json_as_text")
-def test_list_of_comments_returned(fake_read_json, fake_json_content_1):
+def test_list_of_comments_returned(fake_json_content_1):
     """Tests a list of comment strings is returned by get_comments_list()."""
-    fake_read_json.return_value = fake_json_content_1
-    res = get_comments_list("file.json")
+    res = get_comments_list(fake_json_content_1)
 
     assert isinstance(res, list)
     assert isinstance(res[0], str)
 
 
-@patch("extract.read_json_as_text")
-def test_only_comments_extracted_from_json(fake_read_json, fake_json_content_1):
-    """Tests only comment lines are extracted from the JSON."""
-    fake_read_json.return_value = fake_json_content_1
-    res = get_comments_list("file.json")
+def test_only_comments_extracted_from_json(fake_json_content_1):
+    """Tests only comment bodies are extracted from the JSON."""
+    res = get_comments_list(fake_json_content_1)
 
     assert len(res) == 2
     assert res == ["This is the first comment.", "This is the second comment."]
 
 
-@patch("extract.read_json_as_text")
-def test_comment_lines_removed(fake_read_json, fake_json_content_2):
-    """Tests invalid comment lines are not returned."""
-    fake_read_json.return_value = fake_json_content_2
-    res = get_comments_list("file.json")
+def test_comment_lines_removed(fake_json_content_2):
+    """Tests invalid comments are not returned."""
+    res = get_comments_list(fake_json_content_2)
 
     assert len(res) == 2
     assert res == ["This is the third comment.", "This is the fourth comment."]
 
 
+def test_nested_replies_and_escaped_quotes_extracted(fake_json_content_nested):
+    """Tests nested replies are extracted in order and escaped quotes are kept."""
+    res = get_comments_list(fake_json_content_nested)
+
+    assert res == ["Top \"quoted\" comment", "Reply",
+                   "Reply to reply", "Second 'top' comment"]
+
+
+def test_cleaned_comments_yielded_as_generator(fake_json_content_1):
+    """Tests comments are yielded one at a time by iterate_cleaned_comments()."""
+    res = iterate_cleaned_comments(fake_json_content_1)
+
+    assert next(res) == "This is the first comment."
+
+
 def test_zip_file_name_formatted_correctly():
     """Checks the zip filename is formatted correctly."""
     res = create_zip_filename()
@@ -306,3 +316,127 @@ def test_formatting_removed_from_comments(comment, cleaned_comment):
     res = remove_unrecognised_formatting(comment)
 
     assert res == cleaned_comment
+
+
+@patch("extract.MIN_PROCESSED_COMMENTS", 2)
+@patch("extract.create_zip_folder")
+@patch("extract.get_json_from_request")
+@patch("extract.save_json_to_file")
+@patch("extract.upload_zip_s3")
+def test_process_reddit_page_does_not_touch_files_without_archive(fake_upload, fake_save, fake_get_json, fake_create_zip, fake_json_content_1):
+    """Tests no files are written by process_each_reddit_page() when archiving is disabled."""
+    pages_list = [{"title": "a", "subreddit_url": "r/a"}]
+    configuration = {"ARCHIVE_REDDIT_JSON": "false"}
+    fake_get_json.return_value = fake_json_content_1
+
+    res = process_each_reddit_page(pages_list, "12345", configuration)
+
+    assert res[0]["included_comment_count"] == 2
+    assert fake_save.call_count == 0
+    assert fake_create_zip.call_count == 0
+    assert fake_upload.call_count == 0
+
+
+def test_pages_fetched_concurrently_from_stub_server(stub_reddit_server):
+    """Tests every page is fetched and returned in order by process_each_reddit_page()."""
+    pages_list = [{"title": letter, "subreddit_url": f"r/{letter}"}
+                  for letter in "abcdef"] + [{"title": "limited", "subreddit_url": "r/limited"}]
+
+    with patch("extract.SUBREDDIT_URL", stub_reddit_server), \
+            patch("extract.MIN_PROCESSED_COMMENTS", 3), patch("extract.RETRY_BACKOFF_SECONDS", 0):
+        res = process_each_reddit_page(
+            pages_list, "12345", {"ARCHIVE_REDDIT_JSON": "false"}, max_workers=4)
+
+    assert [page["title"] for page in res] == list("abcdef") + ["limited"]
+    assert res[0]["comments"] == ["Comment 0 on /r/a",
+                                  "Comment 1 on /r/a", "Comment 2 on /r/a"]
+    assert StubRedditHandler.request_counts["/r/limited"] == 2
+
+
+def test_rate_limiter_reads_reddit_headers():
+    """Tests the remaining requests and reset time are recorded from the headers."""
+    rate_limiter = RedditRateLimiter()
+
+    rate_limiter.update({"X-Ratelimit-Remaining": "42.0",
+                        "X-Ratelimit-Reset": "30"})
+    rate_limiter.update({"Content-Type": "application/json"})
+
+    assert rate_limiter.remaining == 42
+
+
+@patch("extract.time.sleep")
+@patch("extract.time.monotonic")
+def test_rate_limiter_waits_for_reset_when_exhausted(fake_monotonic, fake_sleep):
+    """Tests requests wait for the window to reset once the reserve is reached."""
+    fake_monotonic.return_value = 100
+    rate_limiter = RedditRateLimiter(reserve=2)
+    rate_limiter.update({"X-Ratelimit-Remaining": "3",
+                        "X-Ratelimit-Reset": "12"})
+
+    rate_limiter.wait()
+    fake_sleep.assert_not_called()
+    rate_limiter.wait()
+
+    fake_sleep.assert_called_once_with(12)
+
+
+def test_pages_list_includes_fullname_and_epoch():
+    """Tests the fullname and created_utc needed for incremental runs are kept."""
+    reddit_json = {"data": {"children": [{"data": {
+        "title": "a", "permalink": "b", "url": "c", "domain": "d", "score": 1, "upvote_ratio": 0.5,
+        "num_comments": 10, "created_utc": 1693809634.0, "name": "t3_abc"}}]}}
+
+    res = create_pages_list(reddit_json)
+
+    assert res[0]["fullname"] == "t3_abc"
+    assert res[0]["created_utc"] == 1693809634.0
+
+
+@pytest.mark.parametrize("posts,reached",
+                         [([{"data": {"name": "t3_new", "created_utc": 200}}], False),
+                          ([{"data": {"name": "t3_old", "created_utc": 200}}], True),
+                          ([{"data": {"name": "t3_other", "created_utc": 100}}], True)])
+def test_high_water_mark_reached(posts, reached):
+    """Tests the high water mark is found by fullname or creation time."""
+    high_water_mark = {"fullname": "t3_old", "created_utc": 150}
+
+    assert is_high_water_mark_reached(posts, high_water_mark) == reached
+
+
+@patch("extract.get_subreddit_json")
+def test_listing_pages_until_high_water_mark(fake_subreddit_json):
+    """Tests older listing pages are requested with after until the high water mark is reached."""
+    fake_subreddit_json.side_effect = [
+        {"data": {"after": "t3_b", "children": [{"data": {"name": "t3_a", "created_utc": 300}},
+                                                {"data": {"name": "t3_b", "created_utc": 250}}]}},
+        {"data": {"after": "t3_d", "children": [{"data": {"name": "t3_c", "created_utc": 200}},
+                                                {"data": {"name": "t3_d", "created_utc": 100}}]}}]
+
+    res = get_subreddit_listing({}, "12345", {"fullname": "t3_d", "created_utc": 100})
+
+    assert len(res["data"]["children"]) == 4
+    assert fake_subreddit_json.call_count == 2
+    assert fake_subreddit_json.call_args.args[2] == "t3_b"
+
+
+@patch("extract.get_subreddit_json")
+def test_listing_single_page_without_high_water_mark(fake_subreddit_json):
+    """Tests only the newest listing page is requested on the first run."""
+    fake_subreddit_json.return_value = {"data": {"after": "t3_b", "children": []}}
+
+    get_subreddit_listing({}, "12345", None)
+
+    assert fake_subreddit_json.call_count == 1
+
+
+@patch("extract.MIN_PROCESSED_COMMENTS", 5)
+def test_unchanged_pages_removed():
+    """Tests stored pages are only kept once their comment count has grown enough."""
+    pages_list = [{"subreddit_url": "new", "comment_count": 20},
+                  {"subreddit_url": "quiet", "comment_count": 25},
+                  {"subreddit_url": "busy", "comment_count": 60},
+                  {"subreddit_url": "tiny", "comment_count": 3}]
+
+    res = remove_unchanged_pages(pages_list, {"quiet": 20, "busy": 40}, min_new_comments=10)
+
+    assert [page["subreddit_url"] for page in res] == ["new", "busy"]
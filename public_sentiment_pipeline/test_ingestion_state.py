@@ -0,0 +1,75 @@
+"""Contains the unit tests for ingestion_state.py.
+
+Unit tests are designed to be run with pytest."""
+
+# pylint: skip-file
+
+from unittest.mock import MagicMock
+
+from psycopg2 import ProgrammingError
+from psycopg2.errorcodes import UNDEFINED_TABLE
+import pytest
+
+from ingestion_state import find_newest_page, get_high_water_mark, save_high_water_mark
+
+
+class FakeUndefinedTable(ProgrammingError):
+    """The error raised when a queried table does not exist."""
+    pgcode = UNDEFINED_TABLE
+
+
+def test_newest_page_found():
+    """Tests the most recently created page is returned by find_newest_page()."""
+    pages = [{"fullname": "t3_a", "created_utc": 100},
+             {"fullname": "t3_b", "created_utc": 300},
+             {"fullname": None, "created_utc": 400}]
+
+    res = find_newest_page(pages)
+
+    assert res["fullname"] == "t3_b"
+
+
+def test_no_newest_page_for_empty_list():
+    """Tests None is returned by find_newest_page() when there are no pages."""
+    assert find_newest_page([]) is None
+
+
+def test_high_water_mark_returned_as_dictionary():
+    """Tests the stored row is returned as a dictionary by get_high_water_mark()."""
+    fake_connection = MagicMock()
+    fake_connection.cursor().__enter__().fetchone.return_value = ("t3_a", 100.0)
+
+    res = get_high_water_mark(fake_connection, "unitedkingdom")
+
+    assert res == {"fullname": "t3_a", "created_utc": 100.0}
+
+
+def test_no_high_water_mark_without_state_table():
+    """Tests None is returned by get_high_water_mark() before the state table is migrated."""
+    fake_connection = MagicMock()
+    fake_connection.cursor().__enter__().execute.side_effect = FakeUndefinedTable()
+
+    res = get_high_water_mark(fake_connection, "unitedkingdom")
+
+    assert res is None
+    fake_connection.rollback.assert_called_once()
+
+
+def test_high_water_mark_not_saved_without_state_table():
+    """Tests save_high_water_mark() rolls back instead of raising before the state table is migrated."""
+    fake_connection = MagicMock()
+    fake_connection.cursor().__enter__().execute.side_effect = FakeUndefinedTable()
+
+    save_high_water_mark(fake_connection, "unitedkingdom", [{"fullname": "t3_a", "created_utc": 100}])
+
+    fake_connection.rollback.assert_called_once()
+    fake_connection.commit.assert_not_called()
+
+
+def test_other_errors_raised_by_high_water_mark():
+    """Tests errors other than a missing state table are raised by get_high_water_mark()."""
+    fake_connection = MagicMock()
+    fake_connection.cursor().__enter__().execute.side_effect = ProgrammingError()
+
+    with pytest.raises(ProgrammingError):
+        get_high_water_mark(fake_connection, "unitedkingdom")
@@ -0,0 +1,112 @@
+"""Contains the unit tests for load.py.
+
+Unit tests are designed to be run with pytest. The upsert is also run against
+a local PostgreSQL database when TEST_DATABASE_URL is set."""
+
+# pylint: skip-file
+
+from os import environ
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+
+from reddit_conftest import fake_scored_page_list
+from load import load_each_row_into_database
+
+
+@patch("load.extras.execute_values")
+def test_all_pages_upserted_in_one_statement(fake_execute_values, fake_scored_page_list):
+    """Checks every page is sent in a single statement and committed once."""
+    fake_connection = MagicMock()
+    fake_execute_values.return_value = [(True,), (False,), (True,)]
+
+    res = load_each_row_into_database(fake_connection, fake_scored_page_list)
+
+    assert res == (2, 1)
+    assert fake_execute_values.call_count == 1
+    assert len(fake_execute_values.call_args.args[2]) == 3
+    fake_connection.commit.assert_called_once()
+
+
+@patch("load.extras.execute_values")
+def test_hourly_sentiment_refreshed_in_same_transaction(fake_execute_values, fake_scored_page_list):
+    """Checks the hourly sentiment of the loaded pages is recomputed before committing."""
+    fake_connection = MagicMock()
+    fake_cursor = fake_connection.cursor.return_value.__enter__.return_value
+    fake_execute_values.return_value = [(True,), (True,), (True,)]
+
+    load_each_row_into_database(fake_connection, fake_scored_page_list)
+
+    query, params = fake_cursor.execute.call_args.args
+    assert "reddit_sentiment_hourly" in query
+    assert params == [[page["subreddit_url"] for page in fake_scored_page_list]]
+
+
+@patch("load.extras.execute_values")
+def test_duplicate_pages_sent_once(fake_execute_values, fake_scored_page_list):
+    """Checks a page appearing twice is only sent once."""
+    fake_execute_values.return_value = [(True,)]
+
+    load_each_row_into_database(
+        MagicMock(), [fake_scored_page_list[0], fake_scored_page_list[0]])
+
+    assert len(fake_execute_values.call_args.args[2]) == 1
+
+
+@patch("load.extras.execute_values")
+def test_no_statement_for_no_pages(fake_execute_values):
+    """Checks nothing is sent to the database without pages."""
+    res = load_each_row_into_database(MagicMock(), [])
+
+    assert res == (0, 0)
+    fake_execute_values.assert_not_called()
+
+
+@patch("load.extras.execute_values")
+def test_upsert_rolled_back_on_error(fake_execute_values, fake_scored_page_list):
+    """Checks the transaction is rolled back if the upsert fails."""
+    fake_connection = MagicMock()
+    fake_execute_values.side_effect = psycopg2.DatabaseError()
+
+    with pytest.raises(psycopg2.DatabaseError):
+        load_each_row_into_database(fake_connection, fake_scored_page_list)
+
+    fake_connection.rollback.assert_called_once()
+
+
+@pytest.fixture
+def local_database():
+    """Connects to a local PostgreSQL database with an empty reddit_article table."""
+    if "TEST_DATABASE_URL" not in environ:
+        pytest.skip("TEST_DATABASE_URL is not set.")
+    conn = psycopg2.connect(environ["TEST_DATABASE_URL"])
+    with conn.cursor() as cur:
+        cur.execute("""CREATE TEMPORARY TABLE reddit_article(
+            re_article_id INT GENERATED ALWAYS AS IDENTITY, re_domain TEXT, re_title TEXT,
+            re_article_url TEXT, re_url TEXT UNIQUE, re_sentiment_mean FLOAT,
+            re_sentiment_st_dev FLOAT, re_sentiment_median FLOAT, re_vote_score INT,
+            re_upvote_ratio FLOAT, re_post_comments INT, re_processed_comments INT,
+            re_created_timestamp TIMESTAMP, PRIMARY KEY (re_article_id));""")
+        cur.execute("""CREATE TEMPORARY TABLE reddit_sentiment_hourly(
+            re_domain TEXT, hour_start TIMESTAMP, sentiment_sum FLOAT, sentiment_count INT,
+            sentiment_min FLOAT, sentiment_max FLOAT, PRIMARY KEY (re_domain, hour_start));""")
+    yield conn
+    conn.close()
+
+
+def test_upsert_against_local_database(local_database, fake_scored_page_list):
+    """Checks inserted and updated rows are counted by a real PostgreSQL database."""
+    assert load_each_row_into_database(
+        local_database, fake_scored_page_list[:2]) == (2, 0)
+
+    fake_scored_page_list[0]["comment_count"] = 50
+    assert load_each_row_into_database(
+        local_database, fake_scored_page_list) == (1, 2)
+
+    with local_database.cursor() as cur:
+        cur.execute(
+            "SELECT re_post_comments FROM reddit_article WHERE re_url = '/r/uk/a';")
+        assert cur.fetchone()[0] == 50
+        cur.execute("SELECT SUM(sentiment_count) FROM reddit_sentiment_hourly;")
+        assert cur.fetchone()[0] == len(fake_scored_page_list)
@@ -0,0 +1,125 @@
+"""Contains the unit tests for sentiment.py.
+
+Unit tests are designed to be run with pytest."""
+
+# pylint: skip-file
+
+from pathlib import Path
+import pickle
+
+import numpy as np
+import pytest
+import nltk
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from build_lexicon import write_lexicon_artifact
+from sentiment import (get_sentiment_analyser, score_text, score_many, get_lexicon_artifact_path,
+                       load_lexicon_artifact, create_analyser_from_artifact, compile_lexicon,
+                       read_text_lexicon)
+
+RSS_PIPELINE_FOLDER = Path(__file__).parent.parent / "rss_pipeline"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def download_nltk():
+    """Download the required library before running the unit tests."""
+    nltk.download("vader_lexicon")
+
+
+def test_analyser_only_created_once():
+    """Checks the same analyser is returned for repeated calls."""
+    assert get_sentiment_analyser() is get_sentiment_analyser()
+
+
+def test_score_text_matches_vader():
+    """Checks the memoised score matches the analyser score."""
+    text = "I am happy, joyful, excited."
+
+    res = score_text(text)
+
+    assert res == get_sentiment_analyser().polarity_scores(text)["compound"]
+
+
+def test_repeated_text_scored_once():
+    """Checks repeated strings are served from the memo."""
+    score_text.cache_clear()
+
+    score_many(["lol", "this", "lol", "lol", "this"])
+
+    assert score_text.cache_info().misses == 2
+    assert score_text.cache_info().hits == 3
+
+
+def test_score_many_returns_float_array():
+    """Checks an array with a score for each string is returned from score_many()."""
+    res = score_many(["good", "bad", ""])
+
+    assert isinstance(res, np.ndarray)
+    assert res.dtype == np.float64
+    assert len(res) == 3
+    assert res[0] > 0 > res[1]
+    assert res[2] == 0
+
+
+def test_score_many_empty_list():
+    """Checks an empty array is returned for no strings."""
+    assert len(score_many([])) == 0
+
+
+def test_lexicon_artifact_path_replaces_suffix():
+    """Checks the artifact of a lexicon file is written next to it."""
+    assert str(get_lexicon_artifact_path("lexicons/vader_lexicon.txt")) == "lexicons/vader_lexicon.pickle"
+
+
+def test_artifact_analyser_matches_text_analyser(tmp_path):
+    """Checks an analyser loaded from the artifact scores text the same as NLTK's analyser."""
+    text_analyser = SentimentIntensityAnalyzer()
+    artifact_path = tmp_path / "vader_lexicon.pickle"
+    write_lexicon_artifact(compile_lexicon(text_analyser.lexicon), artifact_path)
+
+    artifact_analyser = create_analyser_from_artifact(load_lexicon_artifact(artifact_path))
+
+    for text in ["I am not happy at all!", "This is kind of good", "The best day ever :)", ""]:
+        assert artifact_analyser.polarity_scores(text) == text_analyser.polarity_scores(text)
+
+
+def test_load_lexicon_artifact_rejects_other_versions(tmp_path):
+    """Checks an artifact built by another version of build_lexicon.py is not used."""
+    artifact_path = tmp_path / "vader_lexicon.pickle"
+    with open(artifact_path, "wb") as artifact_file:
+        pickle.dump({"version": 0, "lexicon": {}}, artifact_file)
+
+    with pytest.raises(ValueError):
+        load_lexicon_artifact(artifact_path)
+
+
+def test_analyser_loaded_from_artifact_when_built(tmp_path):
+    """Checks the artifact is used instead of the text lexicon once it has been built."""
+    write_lexicon_artifact(compile_lexicon({"splendid": 3.0}), tmp_path / "lexicon.pickle")
+
+    res = get_sentiment_analyser(str(tmp_path / "lexicon.txt"))
+
+    assert res.lexicon == {"splendid": 3.0}
+
+
+def test_text_lexicon_read_without_artifact(tmp_path):
+    """Checks a text lexicon is read directly when its artifact has not been built."""
+    (tmp_path / "lexicon.txt").write_text("splendid\t3.0\t0.5\t[3, 3]\n\nawful\t-3.1\t0.3\t[-3]\n")
+
+    res = get_sentiment_analyser(str(tmp_path / "lexicon.txt"))
+
+    assert res.lexicon == {"splendid": 3.0, "awful": -3.1}
+    assert res.polarity_scores("splendid")["compound"] > 0 > res.polarity_scores("awful")["compound"]
+
+
+def test_read_text_lexicon_matches_nltk_lexicon():
+    """Checks the lexicon bundled with NLTK is read with the analyser's own scores."""
+    assert read_text_lexicon() == SentimentIntensityAnalyzer().lexicon
+
+
+@pytest.mark.parametrize("file_name", ["sentiment.py", "build_lexicon.py"])
+def test_copy_matches_rss_pipeline(file_name):
+    """Checks the module is identical to its copy in the RSS pipeline, so both images
+    build and accept the same lexicon artifact."""
+    assert (Path(__file__).parent / file_name).read_bytes() == \
+        (RSS_PIPELINE_FOLDER / file_name).read_bytes()
@@ -4,13 +4,16 @@ Unit tests are designed to be run with pytest."""
 
 # pylint: skip-file
 
+from copy import deepcopy
+import statistics
 from unittest.mock import patch
 
+import numpy as np
 import pytest
 import nltk
 
 from reddit_conftest import fake_page_response_list
-from transform import calculate_sentiment_score, calculate_sentiment_for_each_comment, calculate_sentiment_statistics, add_sentiment_to_page_dict
+from transform import calculate_sentiment_score, calculate_sentiment_for_each_comment, calculate_sentiment_statistics, add_sentiment_to_page_dict, create_comment_chunks, calculate_page_statistics, calculate_sentiment_distribution
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -79,3 +82,73 @@ def test_sentiment_scores_added_to_dictionary(fake_statistics, fake_page_respons
     assert isinstance(res, list)
     assert res == [{"title": "a", "subreddit_url": "b", "article_url": "c", "article_domain": "d", "comments": ["a", "b"], "mean_sentiment": 1, "st_dev_sentiment": 0, "median_sentiment": 1}, {
         "title": "e", "subreddit_url": "f", "article_url": "g", "article_domain": "h", "comments": ["c", "d"], "mean_sentiment": 1, "st_dev_sentiment": 0, "median_sentiment": 1}]
+
+
+def test_comment_chunks_split_by_length():
+    """Checks long comments produce smaller chunks than short comments."""
+    comments = ["a" * 9] * 10 + ["b" * 99] * 4
+
+    res = create_comment_chunks(comments, character_target=100)
+
+    assert [len(chunk) for chunk in res] == [10, 1, 1, 1, 1]
+    assert sum(res, []) == comments
+
+
+def test_parallel_sentiment_matches_serial():
+    """Checks the parallel path gives the same statistics as scoring serially."""
+    pages = [{"comments": ["I love this", "terrible news", "lol"] * 20},
+             {"comments": ["What a great day", "this"] * 15},
+             {"comments": []}]
+    serial = add_sentiment_to_page_dict(deepcopy(pages), max_workers=1)
+
+    with patch("transform.MIN_PARALLEL_COMMENTS", 1), patch("transform.CHUNK_CHARACTER_TARGET", 50):
+        parallel = add_sentiment_to_page_dict(deepcopy(pages), max_workers=2)
+
+    assert parallel == serial
+    assert parallel[2]["mean_sentiment"] is None
+
+
+@patch("transform.calculate_sentiment_in_parallel")
+def test_small_inputs_scored_serially(fake_parallel, fake_page_response_list):
+    """Checks small inputs do not start a process pool."""
+    add_sentiment_to_page_dict(fake_page_response_list, max_workers=4)
+
+    fake_parallel.assert_not_called()
+
+
+def test_batched_statistics_match_each_page():
+    """Checks the batched statistics match the statistics module for every page."""
+    pages = [[0.5, -0.2, 0.9, 0.1], [], [-1.0], [0.3, 0.3, -0.7]]
+    scores = np.array([score for page in pages for score in page])
+    offsets = np.cumsum([0] + [len(page) for page in pages])
+
+    res = calculate_page_statistics(scores, offsets)
+
+    for index, page in enumerate(pages):
+        if not page:
+            assert np.isnan(res["mean"][index])
+            assert np.isnan(res["median"][index])
+            continue
+        assert res["mean"][index] == pytest.approx(statistics.mean(page))
+        assert res["st_dev"][index] == pytest.approx(statistics.pstdev(page))
+        assert res["median"][index] == pytest.approx(statistics.median(page))
+        assert res["lower_percentile"][index] == pytest.approx(
+            np.percentile(page, 25))
+        assert res["upper_percentile"][index] == pytest.approx(
+            np.percentile(page, 75))
+
+
+def test_sentiment_distribution_shares():
+    """Checks the positive, negative and neutral shares of the comments."""
+    res = calculate_sentiment_distribution([0.6, 0.04, -0.5, -0.01, 0.05])
+
+    assert res["positive_share"] == pytest.approx(0.4)
+    assert res["negative_share"] == pytest.approx(0.2)
+    assert res["neutral_share"] == pytest.approx(0.4)
+
+
+def test_sentiment_distribution_empty():
+    """Checks None is returned for every statistic when there are no scores."""
+    res = calculate_sentiment_distribution([])
+
+    assert all(value is None for value in res.values())
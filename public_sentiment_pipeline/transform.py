@@ -1,75 +1,195 @@
 """Calculates the sentiment scores from the comments on a Reddit page."""
 
-import statistics
+from concurrent.futures import ProcessPoolExecutor
+import os
 import time
 
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+import numpy as np
 
 from extract import run_extract, save_json_to_file
+from sentiment import get_sentiment_analyser, score_text, score_many
 
 REDDIT_COMMENTS = "comments"
 REDDIT_SENTIMENT_MEAN = "mean_sentiment"
 REDDIT_SENTIMENT_ST_DEV = "st_dev_sentiment"
 REDDIT_SENTIMENT_MEDIAN = "median_sentiment"
 
+SENTIMENT_WORKERS = int(os.environ.get("SENTIMENT_WORKERS", os.cpu_count() or 1))
+MIN_PARALLEL_COMMENTS = 2000
+CHUNK_CHARACTER_TARGET = 50000
+
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+LOWER_PERCENTILE = 0.25
+UPPER_PERCENTILE = 0.75
+
+STATISTIC_MEAN = "mean"
+STATISTIC_ST_DEV = "st_dev"
+STATISTIC_MEDIAN = "median"
+STATISTIC_POSITIVE_SHARE = "positive_share"
+STATISTIC_NEGATIVE_SHARE = "negative_share"
+STATISTIC_NEUTRAL_SHARE = "neutral_share"
+STATISTIC_LOWER_PERCENTILE = "lower_percentile"
+STATISTIC_UPPER_PERCENTILE = "upper_percentile"
+
 
 def calculate_sentiment_score(text: str) -> float:
     """Calculates the (compound) sentiment score from a string."""
-    vader = SentimentIntensityAnalyzer()
-    sentiment_score = vader.polarity_scores(text)["compound"]
-
-    return sentiment_score
+    return score_text(text)
 
 
 def calculate_sentiment_for_each_comment(comments: list[str]) -> list[float]:
     """Returns a list with the sentiment score for each comment."""
-    scores = []
-    for comment in comments:
-        scores.append(calculate_sentiment_score(comment))
-    return scores
+    return score_many(comments).tolist()
+
+
+def calculate_percentiles(sorted_scores: np.ndarray, starts: np.ndarray, counts: np.ndarray,
+                          percentile: float) -> np.ndarray:
+    """Interpolates a percentile for each page from scores sorted within each page."""
+    if len(sorted_scores) == 0:
+        return np.full(len(counts), np.nan)
+    position = percentile * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    last_index = len(sorted_scores) - 1
+    lower_scores = sorted_scores[np.minimum(starts + lower, last_index)]
+    upper_scores = sorted_scores[np.minimum(starts + upper, last_index)]
+    percentiles = lower_scores + (upper_scores - lower_scores) * (position - lower)
+    return np.where(counts > 0, percentiles, np.nan)
+
+
+def calculate_page_statistics(scores: np.ndarray, page_offsets: np.ndarray) -> dict[str, np.ndarray]:
+    """Calculates the sentiment statistics of every page at once.
+
+    The scores for page i are scores[page_offsets[i]:page_offsets[i + 1]].
+    Pages without any scores have NaN for every statistic."""
+    scores = np.asarray(scores, dtype=np.float64)
+    page_offsets = np.asarray(page_offsets, dtype=np.int64)
+    counts = np.diff(page_offsets)
+    page_ids = np.repeat(np.arange(len(counts)), counts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.bincount(page_ids, weights=scores,
+                            minlength=len(counts)) / counts
+        deviations = scores - means[page_ids]
+        st_devs = np.sqrt(np.bincount(page_ids, weights=deviations ** 2,
+                                      minlength=len(counts)) / counts)
+        positive_shares = np.bincount(page_ids, weights=scores >= POSITIVE_THRESHOLD,
+                                      minlength=len(counts)) / counts
+        negative_shares = np.bincount(page_ids, weights=scores <= NEGATIVE_THRESHOLD,
+                                      minlength=len(counts)) / counts
+
+    sorted_scores = scores[np.lexsort((scores, page_ids))]
+    starts = page_offsets[:-1]
+    return {STATISTIC_MEAN: means,
+            STATISTIC_ST_DEV: st_devs,
+            STATISTIC_MEDIAN: calculate_percentiles(sorted_scores, starts, counts, 0.5),
+            STATISTIC_POSITIVE_SHARE: positive_shares,
+            STATISTIC_NEGATIVE_SHARE: negative_shares,
+            STATISTIC_NEUTRAL_SHARE: 1 - positive_shares - negative_shares,
+            STATISTIC_LOWER_PERCENTILE: calculate_percentiles(sorted_scores, starts, counts,
+                                                              LOWER_PERCENTILE),
+            STATISTIC_UPPER_PERCENTILE: calculate_percentiles(sorted_scores, starts, counts,
+                                                              UPPER_PERCENTILE)}
+
+
+def get_page_statistics(page_statistics: dict[str, np.ndarray], index: int) -> dict[str, float | None]:
+    """Returns the statistics for one page, with None in place of NaN."""
+    return {name: None if np.isnan(values[index]) else float(values[index])
+            for name, values in page_statistics.items()}
+
+
+def calculate_sentiment_distribution(scores: list[float]) -> dict[str, float | None]:
+    """Calculates the statistics and distribution features of a list of sentiment scores."""
+    return get_page_statistics(calculate_page_statistics(scores, [0, len(scores)]), 0)
+
+
+def calculate_statistics_from_scores(scores: list[float]) -> tuple[float]:
+    """Calculates the mean, standard deviation and median of a list of sentiment scores."""
+    distribution = calculate_sentiment_distribution(scores)
+    return (distribution[STATISTIC_MEAN], distribution[STATISTIC_ST_DEV],
+            distribution[STATISTIC_MEDIAN])
 
 
 def calculate_sentiment_statistics(comments: list[str]) -> tuple[float]:
     """Calculates the sentiment scores from a list of comments."""
     scores = calculate_sentiment_for_each_comment(comments)
-    if len(scores) > 0:
-        mean_sentiment = statistics.mean(scores)
-        st_dev_sentiment = statistics.pstdev(scores)
-        median_sentiment = statistics.median(scores)
-    else:
-        mean_sentiment = None
-        st_dev_sentiment = None
-        median_sentiment = None
-    return mean_sentiment, st_dev_sentiment, median_sentiment
+    return calculate_statistics_from_scores(scores)
 
 
-def add_sentiment_to_page_dict(page_response_list: list[dict]) -> list[dict]:
-    """Adds the sentiment values to the dictionary for each page."""
-    for page in page_response_list:
-        mean_sentiment, st_dev_sentiment, median_sentiment = calculate_sentiment_statistics(
-            page[REDDIT_COMMENTS])
+def create_comment_chunks(comments: list[str],
+                          character_target: int = CHUNK_CHARACTER_TARGET) -> list[list[str]]:
+    """Splits the comments into chunks of roughly the same total length.
+
+    Scoring time grows with comment length, so long comments make smaller chunks."""
+    chunks = []
+    chunk = []
+    chunk_characters = 0
+    for comment in comments:
+        chunk.append(comment)
+        chunk_characters += len(comment) + 1
+        if chunk_characters >= character_target:
+            chunks.append(chunk)
+            chunk = []
+            chunk_characters = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def calculate_sentiment_in_parallel(comment_lists: list[list[str]], max_workers: int) -> np.ndarray:
+    """Scores every list of comments across a pool of processes.
+
+    Each worker loads the analyser once, the scores are returned as one array in the original order."""
+    all_comments = [comment for comments in comment_lists for comment in comments]
+    chunks = create_comment_chunks(all_comments, CHUNK_CHARACTER_TARGET)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=get_sentiment_analyser) as executor:
+        return np.array([score for chunk_scores in executor.map(
+            calculate_sentiment_for_each_comment, chunks) for score in chunk_scores],
+            dtype=np.float64)
+
+
+def add_sentiment_to_page_dict(page_response_list: list[dict],
+                               max_workers: int = SENTIMENT_WORKERS) -> list[dict]:
+    """Adds the sentiment values to the dictionary for each page.
+
+    Pages are scored across several processes when there are enough comments to make it worthwhile."""
+    comment_lists = [page[REDDIT_COMMENTS] for page in page_response_list]
+    page_offsets = np.cumsum([0] + [len(comments) for comments in comment_lists])
+
+    if max_workers > 1 and page_offsets[-1] >= MIN_PARALLEL_COMMENTS:
+        print(f"Scoring {page_offsets[-1]} comments across {max_workers} processes.")
+        scores = calculate_sentiment_in_parallel(comment_lists, max_workers)
+        all_statistics = calculate_page_statistics(scores, page_offsets)
+        page_statistics = []
+        for index in range(len(page_response_list)):
+            distribution = get_page_statistics(all_statistics, index)
+            page_statistics.append((distribution[STATISTIC_MEAN], distribution[STATISTIC_ST_DEV],
+                                    distribution[STATISTIC_MEDIAN]))
+    else:
+        page_statistics = [calculate_sentiment_statistics(comments)
+                           for comments in comment_lists]
+
+    for page, (mean_sentiment, st_dev_sentiment, median_sentiment) in zip(page_response_list,
+                                                                          page_statistics):
         page[REDDIT_SENTIMENT_MEAN] = mean_sentiment
         page[REDDIT_SENTIMENT_ST_DEV] = st_dev_sentiment
         page[REDDIT_SENTIMENT_MEDIAN] = median_sentiment
     return page_response_list
 
 
-def run_transform() -> list[dict]:  # pragma: no cover
+def run_transform(conn=None) -> list[dict]:  # pragma: no cover
     """Returns a list of dictionaries for each Reddit page with sentiment scores."""
     start = time.time()
-    list_of_page_dict = run_extract()
+    list_of_page_dict = run_extract(conn)
     print(f"Time to run extract: {(time.time()-start):.2f} seconds.")
     start = time.time()
-    nltk.download("vader_lexicon")
     list_of_page_dict = add_sentiment_to_page_dict(list_of_page_dict)
     print(f"Time to run transform: {(time.time()-start):.2f} seconds.")
     return list_of_page_dict
 
 
 if __name__ == "__main__":  # pragma: no cover
-    nltk.download("vader_lexicon")
-
     list_of_page_dict = run_extract()
 
     list_of_page_dict = add_sentiment_to_page_dict(list_of_page_dict)
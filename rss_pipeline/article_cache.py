@@ -0,0 +1,108 @@
+"""Caches the extracted text and sentiment score of article pages on disk, keyed by URL"""
+
+from os import environ
+import sqlite3
+import time
+
+DEFAULT_ARTICLE_CACHE_PATH = "/tmp/article_cache.sqlite"
+MAX_CACHED_ARTICLES = 5000
+CACHE_MAX_AGE_SECONDS = 6 * 60 * 60
+
+URL = 'url'
+BODY_TEXT = 'body_text'
+ETAG = 'etag'
+LAST_MODIFIED = 'last_modified'
+SENTIMENT = 'sentiment_score'
+FETCHED_AT = 'fetched_at'
+
+
+def open_article_cache(cache_path: str | None = None) -> sqlite3.Connection:
+    """Opens the article cache, creating the table if it does not exist yet"""
+    cache_path = cache_path or environ.get(
+        "ARTICLE_CACHE_PATH", DEFAULT_ARTICLE_CACHE_PATH)
+    cache = sqlite3.connect(cache_path)
+    cache.row_factory = sqlite3.Row
+    cache.execute("""CREATE TABLE IF NOT EXISTS article_cache (
+                     url TEXT PRIMARY KEY,
+                     body_text TEXT,
+                     etag TEXT,
+                     last_modified TEXT,
+                     sentiment_score REAL,
+                     fetched_at REAL,
+                     last_accessed REAL);""")
+    cache.execute("""CREATE INDEX IF NOT EXISTS article_cache_last_accessed
+                     ON article_cache (last_accessed);""")
+    cache.commit()
+    return cache
+
+
+def get_cached_articles(cache: sqlite3.Connection, urls: list[str]) -> dict[str, dict]:
+    """Returns the cached entries for the given URLs, keyed by URL"""
+    cached_articles = {}
+    for url in urls:
+        row = cache.execute(
+            "SELECT * FROM article_cache WHERE url = ?;", [url]).fetchone()
+        if row:
+            cached_articles[url] = dict(row)
+    return cached_articles
+
+
+def get_cached_article(cache: sqlite3.Connection, url: str) -> dict | None:
+    """Returns the cached entry for the URL if there is one"""
+    return get_cached_articles(cache, [url]).get(url)
+
+
+def is_cached_article_fresh(cached_article: dict | None, max_age: float = CACHE_MAX_AGE_SECONDS) -> bool:
+    """Checks whether a cached entry is recent enough to be used without revalidating it"""
+    if not cached_article:
+        return False
+    return time.time() - cached_article[FETCHED_AT] < max_age
+
+
+def get_conditional_headers(cached_article: dict | None) -> dict:
+    """Returns the headers for a conditional GET revalidating the cached entry"""
+    headers = {}
+    if cached_article and cached_article[ETAG]:
+        headers["If-None-Match"] = cached_article[ETAG]
+    if cached_article and cached_article[LAST_MODIFIED]:
+        headers["If-Modified-Since"] = cached_article[LAST_MODIFIED]
+    return headers
+
+
+def store_cached_article(cache: sqlite3.Connection, url: str, body_text: str, sentiment_score: float,
+                         etag: str | None = None, last_modified: str | None = None) -> None:
+    """Inserts or replaces the cached entry for the URL"""
+    now = time.time()
+    cache.execute("""INSERT OR REPLACE INTO article_cache
+                     (url, body_text, etag, last_modified, sentiment_score, fetched_at, last_accessed)
+                     VALUES (?, ?, ?, ?, ?, ?, ?);""",
+                  [url, body_text, etag, last_modified, sentiment_score, now, now])
+
+
+def touch_cached_article(cache: sqlite3.Connection, url: str, revalidated: bool = False) -> None:
+    """Marks the cached entry as recently used, and as fresh again if it was revalidated"""
+    now = time.time()
+    if revalidated:
+        cache.execute("""UPDATE article_cache SET last_accessed = ?, fetched_at = ?
+                         WHERE url = ?;""", [now, now, url])
+    else:
+        cache.execute("""UPDATE article_cache SET last_accessed = ?
+                         WHERE url = ?;""", [now, url])
+
+
+def evict_least_recently_used(cache: sqlite3.Connection, max_entries: int = MAX_CACHED_ARTICLES) -> int:
+    """Deletes the least recently used entries above the size limit, returns how many were deleted"""
+    deleted = cache.execute("""DELETE FROM article_cache WHERE url IN (
+                               SELECT url FROM article_cache
+                               ORDER BY last_accessed DESC LIMIT -1 OFFSET ?);""",
+                            [max_entries]).rowcount
+    cache.commit()
+    return deleted
+
+
+def close_article_cache(cache: sqlite3.Connection, max_entries: int = MAX_CACHED_ARTICLES) -> None:
+    """Trims the cache to its size limit, saves all changes and closes it"""
+    deleted = evict_least_recently_used(cache, max_entries)
+    if deleted:
+        print(f"Evicted {deleted} articles from the article cache")
+    cache.close()
@@ -0,0 +1,52 @@
+"""Compiles a VADER lexicon and NLTK's booster, negation and idiom tables into a pickle
+that sentiment.py loads instead of parsing the text lexicon.
+
+Run as a build step, before the pipeline starts:
+    python3 build_lexicon.py [lexicon file]
+
+The lexicon bundled with NLTK is compiled, downloading it if needed, when no file is given."""
+
+# rss_pipeline/build_lexicon.py and public_sentiment_pipeline/build_lexicon.py are identical
+# copies, as each pipeline is built as its own Docker image. test_sentiment.py in
+# public_sentiment_pipeline checks the two copies match.
+
+import argparse
+from pathlib import Path
+import pickle
+import time
+
+import nltk
+
+from sentiment import (compile_lexicon, create_analyser_from_artifact, get_lexicon_artifact_path,
+                       load_lexicon_artifact, read_text_lexicon)
+
+
+def write_lexicon_artifact(artifact: dict, artifact_path: Path) -> None:
+    """Saves the artifact with the fastest pickle protocol."""
+    with open(artifact_path, "wb") as artifact_file:
+        pickle.dump(artifact, artifact_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def time_analyser_loads(lexicon_file: str | None, artifact_path: Path) -> tuple[float, float]:
+    """Returns the seconds taken to read the text lexicon and to build an analyser from
+    the artifact."""
+    start = time.perf_counter()
+    read_text_lexicon(lexicon_file)
+    text_done = time.perf_counter()
+    create_analyser_from_artifact(load_lexicon_artifact(artifact_path))
+    return text_done - start, time.perf_counter() - text_done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("lexicon_file", nargs="?", default=None)
+    args = parser.parse_args()
+
+    if args.lexicon_file is None:
+        nltk.download("vader_lexicon", quiet=True)
+    output_path = get_lexicon_artifact_path(args.lexicon_file)
+    write_lexicon_artifact(compile_lexicon(read_text_lexicon(args.lexicon_file)), output_path)
+    text_seconds, artifact_seconds = time_analyser_loads(args.lexicon_file, output_path)
+    print(f"Wrote {output_path} ({output_path.stat().st_size:,} bytes). Loading the analyser "
+          f"takes {artifact_seconds * 1000:.1f} ms instead of {text_seconds * 1000:.1f} ms")
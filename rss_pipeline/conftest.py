@@ -1,5 +1,8 @@
-"""Fixtures for testing the load script"""
+"""Fixtures for testing the RSS pipeline scripts"""
 
+from datetime import datetime
+
+import pandas as pd
 import pytest
 
 
@@ -13,3 +16,15 @@ def fake_valid_source_url():
 def fake_invalid_source_url():
     """Returns a fake url with an invalid source"""
     return 'https://www.theguardian.co.uk'
+
+
+@pytest.fixture
+def fake_articles_df():
+    """Returns a dataframe of transformed articles with a duplicate and an unknown source"""
+    return pd.DataFrame({
+        'title': ['One', 'Two', 'Three', 'Two again'],
+        'description': ['A', 'B', 'C', 'B'],
+        'url': ['https://www.bbc.co.uk/news/1', 'https://www.dailymail.co.uk/news/2',
+                'https://www.theguardian.com/news/3', 'https://www.dailymail.co.uk/news/2'],
+        'pubdate': [datetime(2023, 9, 4)] * 4,
+        'sentiment_score': [0.5, -0.5, 0.1, -0.4]})
@@ -0,0 +1,87 @@
+"""This script downloads the full article pages linked from the RSS feeds concurrently"""
+
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
+
+from article_cache import get_cached_articles, is_cached_article_fresh, get_conditional_headers
+
+MAX_FETCH_WORKERS = 8
+MAX_HOST_POOLS = 4
+REQUEST_TIMEOUT = (3.05, 10)
+MAX_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+REQUEST_HEADERS = {"User-Agent": "Media-Sentiment/0.1 by Media-Project"}
+
+
+def create_http_session(pool_size: int = MAX_FETCH_WORKERS) -> requests.Session:
+    """Returns a keep-alive session with a connection pool per host and retries"""
+    retries = Retry(total=MAX_RETRIES,
+                    backoff_factor=RETRY_BACKOFF_FACTOR,
+                    status_forcelist=RETRY_STATUS_CODES,
+                    allowed_methods=["GET"],
+                    raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=MAX_HOST_POOLS,
+                          pool_maxsize=pool_size, max_retries=retries)
+
+    session = requests.Session()
+    session.headers.update(REQUEST_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_article_page(session: requests.Session, url: str,
+                       headers: dict | None = None) -> requests.Response | None:
+    """Downloads a single article page, returning None if the request fails"""
+    try:
+        return session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    except RequestException as request_exc:
+        print(f"Failed to download article {url}: {str(request_exc)}")
+    return None
+
+
+def fetch_article_pages(urls: list[str], session: requests.Session | None = None,
+                        max_workers: int = MAX_FETCH_WORKERS,
+                        cache: sqlite3.Connection | None = None) -> dict[str, requests.Response]:
+    """Downloads every article page concurrently using a bounded pool of workers.
+
+    Articles found fresh in the cache are not requested and the other cached
+    articles are revalidated with a conditional GET.
+    Returns a dictionary mapping each URL to its response, failed requests are left out.
+    """
+    unique_urls = list(dict.fromkeys(url for url in urls if url))
+
+    request_headers = {}
+    if cache is not None:
+        cached_articles = get_cached_articles(cache, unique_urls)
+        unique_urls = [url for url in unique_urls
+                       if not is_cached_article_fresh(cached_articles.get(url))]
+        request_headers = {url: get_conditional_headers(cached_articles.get(url))
+                           for url in unique_urls}
+        print(f"{len(cached_articles)} article pages found in the cache")
+
+    if not unique_urls:
+        return {}
+
+    owns_session = session is None
+    if owns_session:
+        session = create_http_session(max_workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = executor.map(
+                lambda url: fetch_article_page(session, url, request_headers.get(url)), unique_urls)
+            article_pages = {url: response for url, response in zip(unique_urls, responses)
+                             if response is not None}
+    finally:
+        if owns_session:
+            session.close()
+
+    print(f"Downloaded {len(article_pages)} of {len(unique_urls)} article pages")
+    return article_pages
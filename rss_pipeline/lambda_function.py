@@ -1,13 +1,23 @@
 """This script is the Lambda function for the full RSS pipeline"""
+from __future__ import annotations
+
 import time
+from datetime import timedelta
+from typing import TYPE_CHECKING
 
 import pandas as pd
-from dotenv import load_dotenv
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
 
 from extract_rss import download_bbc_uk_news_xml, download_daily_mail_uk_news_xml
-from transform_rss import transform_bbc_xml_file, transform_daily_mail_xml_file
-from load import db_connection, insert_articles_into_rds
+from transform_rss import (extract_info_from_bbc_articles, extract_info_from_daily_mail_articles,
+                           transform_bbc_articles, transform_daily_mail_articles,
+                           convert_pubdate_to_timestamp, remove_known_articles)
+from fetch_articles import fetch_article_pages
+from article_cache import open_article_cache, close_article_cache
+from load import insert_articles_into_rds, get_known_story_urls
+from warm_resources import WarmResources
+
+if TYPE_CHECKING:
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
 
 
 BBC_UK_NEWS_RSS_LINK = "http://feeds.bbci.co.uk/news/uk/rss.xml"
@@ -16,6 +26,12 @@ DAILY_MAIL_UK_NEWS_RSS_LINK = "https://www.dailymail.co.uk/home/index.rss"
 BBC_UK_NEWS_XML_FILE_NAME = "bbc_uk_news.xml"
 DAILY_MAIL_UK_NEWS_XML_FILE_NAME = "daily_mail_uk_news.xml"
 
+# Margin for stories whose publication date was changed in the feed after they were loaded
+KNOWN_STORY_WINDOW_MARGIN = timedelta(days=1)
+
+# Reused by every invocation that runs in the same container
+WARM_RESOURCES = WarmResources()
+
 
 def extract_xml_files_from_rss():
     """Downloads the XML files from the RSS feed"""
@@ -25,33 +41,68 @@ def extract_xml_files_from_rss():
         DAILY_MAIL_UK_NEWS_RSS_LINK, DAILY_MAIL_UK_NEWS_XML_FILE_NAME)
 
 
-def transform_xml_files(sentiment_analyser: SentimentIntensityAnalyzer) -> list[pd.DataFrame]:
+def get_known_urls_for_feeds(conn, articles_df_list: list[pd.DataFrame]) -> set[str]:
+    """Returns the urls of the stories already loaded within the publication window of the feeds"""
+    pubdates = [convert_pubdate_to_timestamp(pubdate)
+                for articles_df in articles_df_list for pubdate in articles_df['pubdate']]
+    if not pubdates:
+        return set()
+    return get_known_story_urls(conn, min(pubdates) - KNOWN_STORY_WINDOW_MARGIN)
+
+
+def transform_xml_files(sentiment_analyser: SentimentIntensityAnalyzer,
+                        conn=None) -> tuple[list[pd.DataFrame], dict[str, int]]:
     """
     Transforms the XML files, obtaining information and then
-    converting it to a dataframe
+    converting it to a dataframe. Stories already loaded onto the
+    RDS are skipped, the number skipped per feed is also returned
     """
-    bbc_articles_df = transform_bbc_xml_file(
-        BBC_UK_NEWS_XML_FILE_NAME, sentiment_analyser)
-    daily_mail_articles_df = transform_daily_mail_xml_file(
-        DAILY_MAIL_UK_NEWS_XML_FILE_NAME, sentiment_analyser)
-
-    return [bbc_articles_df, daily_mail_articles_df]
+    bbc_articles_df = extract_info_from_bbc_articles(
+        f"/tmp/{BBC_UK_NEWS_XML_FILE_NAME}")
+    daily_mail_articles_df = extract_info_from_daily_mail_articles(
+        f"/tmp/{DAILY_MAIL_UK_NEWS_XML_FILE_NAME}")
+
+    skipped_counts = {"bbc": 0, "daily_mail": 0}
+    if conn is not None:
+        known_urls = get_known_urls_for_feeds(
+            conn, [bbc_articles_df, daily_mail_articles_df])
+        bbc_articles_df, skipped_counts["bbc"] = remove_known_articles(
+            bbc_articles_df, known_urls)
+        daily_mail_articles_df, skipped_counts["daily_mail"] = remove_known_articles(
+            daily_mail_articles_df, known_urls)
+        print(f"Skipped {skipped_counts['bbc']} BBC and "
+              f"{skipped_counts['daily_mail']} Daily Mail stories that were already loaded")
+
+    article_cache = open_article_cache()
+    try:
+        article_pages = fetch_article_pages(
+            list(bbc_articles_df['url']) + list(daily_mail_articles_df['url']), cache=article_cache)
+
+        bbc_articles_df = transform_bbc_articles(
+            bbc_articles_df, sentiment_analyser, article_pages, article_cache)
+        daily_mail_articles_df = transform_daily_mail_articles(
+            daily_mail_articles_df, sentiment_analyser, article_pages, article_cache)
+    finally:
+        close_article_cache(article_cache)
+
+    return [bbc_articles_df, daily_mail_articles_df], skipped_counts
 
 
 def handler(event, context):
     start_time = time.time()
 
-    load_dotenv()
-    conn = db_connection()
-
-    vader = SentimentIntensityAnalyzer(lexicon_file="vader_lexicon.txt")
+    conn, vader = WARM_RESOURCES.prepare()
 
     extract_xml_files_from_rss()
-    news_df_list = transform_xml_files(vader)
+    news_df_list, skipped_counts = transform_xml_files(vader, conn)
 
-    for news_df in news_df_list:
-        insert_articles_into_rds(conn, news_df)
+    load_counts = insert_articles_into_rds(
+        conn, pd.concat(news_df_list, ignore_index=True))
 
     print("The RSS pipeline took", time.time() - start_time, "to run")
 
-    return [{"Pipeline State": "Success"}]
+    return [{"Pipeline State": "Success",
+             "Skipped Stories": sum(skipped_counts.values()),
+             "Inserted Stories": load_counts["inserted"],
+             "Updated Stories": load_counts["updated"],
+             "Setup Seconds": round(WARM_RESOURCES.setup_seconds["total"], 3)}]
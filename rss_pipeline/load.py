@@ -1,6 +1,7 @@
 """Extracts data from RSS news articles to populate the media-sentiment relational database (RDS)"""
 
 from os import environ
+from datetime import datetime
 
 from dotenv import load_dotenv
 import pandas as pd
@@ -13,6 +14,32 @@ URL = 'url'
 PUBDATE = 'pubdate'
 SENTIMENT = 'sentiment_score'
 
+INSERTED = 'inserted'
+UPDATED = 'updated'
+SKIPPED = 'skipped'
+
+INSERT_STORIES_QUERY = """INSERT INTO stories
+    (source_id, title, description, url, pub_date, media_sentiment)
+    VALUES %s
+    ON CONFLICT (url) DO UPDATE SET title = EXCLUDED.title, description = EXCLUDED.description,
+    media_sentiment = EXCLUDED.media_sentiment
+    WHERE (stories.title, stories.description, stories.media_sentiment)
+    IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.description, EXCLUDED.media_sentiment)
+    RETURNING (xmax = 0) AS inserted;"""
+REFRESH_SOURCE_SENTIMENT_QUERY = """INSERT INTO source_sentiment_hourly
+    (source_id, hour_start, sentiment_sum, sentiment_count, sentiment_min, sentiment_max)
+    SELECT stories.source_id, hours.hour_start, SUM(stories.media_sentiment),
+    COUNT(stories.media_sentiment), MIN(stories.media_sentiment), MAX(stories.media_sentiment)
+    FROM (SELECT DISTINCT date_trunc('hour', pub_date) AS hour_start FROM stories
+          WHERE url = ANY(%s) AND pub_date IS NOT NULL) AS hours
+    JOIN stories ON stories.pub_date >= hours.hour_start
+    AND stories.pub_date < hours.hour_start + INTERVAL '1 hour'
+    WHERE stories.source_id IS NOT NULL
+    GROUP BY stories.source_id, hours.hour_start
+    ON CONFLICT (source_id, hour_start) DO UPDATE SET sentiment_sum = EXCLUDED.sentiment_sum,
+    sentiment_count = EXCLUDED.sentiment_count, sentiment_min = EXCLUDED.sentiment_min,
+    sentiment_max = EXCLUDED.sentiment_max;"""
+
 
 def db_connection() -> psycopg2.extensions.connection | None:
     """Establish connection with the media-sentiment RDS"""
@@ -57,31 +84,67 @@ def get_source_id(conn: psycopg2.extensions.connection, url: str) -> int | None:
     return None
 
 
-def insert_articles_into_rds(conn: psycopg2.extensions.connection, dataframe: pd.DataFrame) -> None:
-    """Iterates through each article in the dataframe to be inserted into the RDS"""
-    for row in dataframe.iterrows():
-        article = row[1]
-        source_id = get_source_id(conn, article.get(URL))
+def get_known_story_urls(conn: psycopg2.extensions.connection, since: datetime) -> set[str]:
+    """Queries RDS for the urls of the stories published since the provided time"""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT url FROM stories WHERE pub_date >= (%s);", [since])
+        return {story['url'] for story in cur.fetchall()}
+
+
+def get_source_ids(conn: psycopg2.extensions.connection) -> dict[str, int]:
+    """Queries RDS once for the source_id of every source, keyed by source name"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT source_id, source_name FROM sources;")
+        return {source['source_name']: source['source_id'] for source in cur.fetchall()}
+
+
+def create_story_rows(dataframe: pd.DataFrame, source_ids: dict[str, int]) -> list[tuple]:
+    """Returns a row of values for each article with a known source,
+    keeping only the last article for each url
+    """
+    story_rows = {}
+    for article in dataframe.to_dict('records'):
+        source_id = source_ids.get(extract_source_from_url(article[URL]))
         if source_id:
-            populate_stories_table(conn, source_id, article)
+            story_rows[article[URL]] = (source_id, article[TITLE], article[DESCRIPTION],
+                                        article[URL], article[PUBDATE], article[SENTIMENT])
+    return list(story_rows.values())
 
 
-def populate_stories_table(conn: psycopg2.extensions.connection, source_id: int, article: dict) -> None:
-    """Inserts data into the stories table of the RDS"""
-    try:
-        with conn.cursor() as cur:
-            values = (source_id, article[TITLE], article[DESCRIPTION],
-                      article[URL], article[PUBDATE], article[SENTIMENT])
-            cur.execute(
-                "INSERT INTO stories "
-                "(source_id, title, description, url, pub_date, media_sentiment) "
-                "VALUES (%s,%s,%s,%s,%s,%s)", values)
-            conn.commit()
+def insert_articles_into_rds(conn: psycopg2.extensions.connection, dataframe: pd.DataFrame,
+                             source_ids: dict[str, int] | None = None) -> dict[str, int]:
+    """Inserts every article in the dataframe into the RDS in a single transaction.
+
+    Existing stories are updated if their title, description or sentiment changed,
+    and the hourly source sentiment of each hour the articles were published in is recomputed.
+    Returns how many stories were inserted, updated and skipped.
+    """
+    if source_ids is None:
+        source_ids = get_source_ids(conn)
 
-    except psycopg2.errors.UniqueViolation:
-        # placeholder but we can discuss how to address dupes (maybe replace original?)
-        print('Duplicate data found:', article.get(URL))
-        conn.rollback()
+    story_rows = create_story_rows(dataframe, source_ids)
+    results = []
+    if story_rows:
+        try:
+            with conn.cursor() as cur:
+                results = extras.execute_values(cur, INSERT_STORIES_QUERY, story_rows,
+                                                page_size=len(story_rows), fetch=True)
+                if results:
+                    cur.execute(REFRESH_SOURCE_SENTIMENT_QUERY,
+                                [[story_row[3] for story_row in story_rows]])
+            conn.commit()
+        except psycopg2.DatabaseError:
+            conn.rollback()
+            raise
+
+    inserted = sum(1 for result in results if result['inserted'])
+    load_counts = {INSERTED: inserted,
+                   UPDATED: len(results) - inserted,
+                   SKIPPED: len(dataframe) - len(results)}
+    print(f"Inserted {load_counts[INSERTED]}, updated {load_counts[UPDATED]} "
+          f"and skipped {load_counts[SKIPPED]} stories")
+    return load_counts
 
 
 if __name__ == "__main__":
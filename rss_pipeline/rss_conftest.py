@@ -0,0 +1,54 @@
+"""Fake article server for the tests of the RSS pipeline scripts, imported by the tests that use it"""
+
+# pylint: skip-file
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+
+class StubArticleHandler(BaseHTTPRequestHandler):
+    """Serves fake article pages, failing the first request to /flaky and
+    answering conditional requests to /etag with 304 Not Modified"""
+    request_counts = {}
+
+    def do_GET(self):
+        self.request_counts[self.path] = self.request_counts.get(
+            self.path, 0) + 1
+
+        if self.path == '/flaky' and self.request_counts[self.path] == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path == '/etag' and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        if self.path == '/missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = f'<html><body><p>Article at {self.path}</p></body></html>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_article_server():
+    """Runs a local HTTP server serving fake article pages, returns its base url"""
+    StubArticleHandler.request_counts = {}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubArticleHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,109 @@
+"""Scores the sentiment of text with a VADER analyser that is loaded once per process."""
+
+# rss_pipeline/sentiment.py and public_sentiment_pipeline/sentiment.py are identical
+# copies, as each pipeline is built as its own Docker image. test_sentiment.py in
+# public_sentiment_pipeline checks the two copies match.
+
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+import pickle
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+MAX_MEMOISED_TEXTS = 50000
+LEXICON_ARTIFACT_VERSION = 1
+LEXICON_ARTIFACT_SUFFIX = ".pickle"
+NLTK_LEXICON_ARTIFACT = Path(__file__).with_name("nltk_vader_lexicon.pickle")
+
+
+def get_lexicon_artifact_path(lexicon_file: str | None = None) -> Path:
+    """Returns where build_lexicon.py writes the compiled form of a lexicon file.
+
+    The artifact for the lexicon bundled with NLTK is kept next to this module."""
+    if lexicon_file is None:
+        return NLTK_LEXICON_ARTIFACT
+    return Path(lexicon_file).with_suffix(LEXICON_ARTIFACT_SUFFIX)
+
+
+def load_lexicon_artifact(artifact_path: Path) -> dict:
+    """Returns the lexicon, booster, negation and idiom tables saved by build_lexicon.py"""
+    with open(artifact_path, "rb") as artifact_file:
+        artifact = pickle.load(artifact_file)
+    if artifact.get("version") != LEXICON_ARTIFACT_VERSION:
+        raise ValueError(f"{artifact_path} was built by another version of build_lexicon.py, "
+                         "rebuild it with python3 build_lexicon.py")
+    return artifact
+
+
+def read_text_lexicon(lexicon_file: str | None = None) -> dict[str, float]:
+    """Returns the word scores of a text lexicon, read the same way as NLTK reads them.
+
+    The file is opened directly, as NLTK only loads files from its own data directories.
+    The lexicon bundled with NLTK is read if no file is provided."""
+    if lexicon_file is None:
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer  # pylint: disable=import-outside-toplevel
+        return SentimentIntensityAnalyzer().lexicon
+    lexicon = {}
+    with open(lexicon_file, encoding="utf-8") as text_lexicon:
+        for line in text_lexicon:
+            if line.strip():
+                word, measure = line.strip().split("\t")[0:2]
+                lexicon[word] = float(measure)
+    return lexicon
+
+
+def compile_lexicon(lexicon: dict[str, float]) -> dict:
+    """Returns the artifact for a lexicon, holding the tables the analyser needs."""
+    from nltk.sentiment.vader import VaderConstants  # pylint: disable=import-outside-toplevel
+    return {"version": LEXICON_ARTIFACT_VERSION,
+            "lexicon": lexicon,
+            "booster": VaderConstants.BOOSTER_DICT,
+            "negations": VaderConstants.NEGATE,
+            "idioms": VaderConstants.SPECIAL_CASE_IDIOMS}
+
+
+def create_analyser_from_artifact(artifact: dict) -> SentimentIntensityAnalyzer:
+    """Returns an analyser using the tables of a lexicon artifact, without reading the
+    text lexicon or looking for NLTK's data."""
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants  # pylint: disable=import-outside-toplevel
+    constants = VaderConstants()
+    constants.BOOSTER_DICT = artifact["booster"]
+    constants.NEGATE = artifact["negations"]
+    constants.SPECIAL_CASE_IDIOMS = artifact["idioms"]
+
+    sentiment_analyser = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    sentiment_analyser.lexicon_file = None
+    sentiment_analyser.lexicon = artifact["lexicon"]
+    sentiment_analyser.constants = constants
+    return sentiment_analyser
+
+
+@lru_cache(maxsize=None)
+def get_sentiment_analyser(lexicon_file: str | None = None) -> SentimentIntensityAnalyzer:
+    """Returns the analyser for a lexicon file, only reading the lexicon the first time.
+
+    The lexicon bundled with NLTK is used if no file is provided. The compiled artifact of
+    the lexicon is loaded if it has been built, otherwise the text lexicon is parsed. NLTK
+    is only imported when the first analyser is created."""
+    artifact_path = get_lexicon_artifact_path(lexicon_file)
+    if artifact_path.exists():
+        return create_analyser_from_artifact(load_lexicon_artifact(artifact_path))
+    return create_analyser_from_artifact(compile_lexicon(read_text_lexicon(lexicon_file)))
+
+
+@lru_cache(maxsize=MAX_MEMOISED_TEXTS)
+def score_text(text: str, lexicon_file: str | None = None) -> float:
+    """Returns the (compound) sentiment score of a string, remembering repeated strings."""
+    return get_sentiment_analyser(lexicon_file).polarity_scores(text)["compound"]
+
+
+def score_many(texts: list[str], lexicon_file: str | None = None) -> np.ndarray:
+    """Returns an array with the (compound) sentiment score of each string."""
+    return np.fromiter((score_text(text, lexicon_file) for text in texts),
+                       dtype=np.float64, count=len(texts))
@@ -0,0 +1,69 @@
+"""Contains unit tests for article_cache.py to be run with pytest"""
+# pylint: skip-file
+
+from unittest.mock import patch
+
+from article_cache import (open_article_cache, get_cached_article, get_cached_articles,
+                           store_cached_article, touch_cached_article, is_cached_article_fresh,
+                           get_conditional_headers, evict_least_recently_used)
+
+
+def test_stored_article_is_returned_by_url(tmp_path):
+    cache = open_article_cache(str(tmp_path / "cache.sqlite"))
+    store_cached_article(cache, "URL", "Body", 0.5, '"v1"', "Mon, 04 Sep 2023")
+
+    cached_article = get_cached_article(cache, "URL")
+
+    assert cached_article["body_text"] == "Body"
+    assert cached_article["sentiment_score"] == 0.5
+    assert cached_article["etag"] == '"v1"'
+    assert get_cached_article(cache, "OTHER") is None
+
+
+def test_cache_persists_between_connections(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    cache = open_article_cache(cache_path)
+    store_cached_article(cache, "URL", "Body", 0.5)
+    cache.commit()
+    cache.close()
+
+    cache = open_article_cache(cache_path)
+
+    assert get_cached_articles(cache, ["URL", "OTHER"]).keys() == {"URL"}
+
+
+def test_cache_path_read_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("ARTICLE_CACHE_PATH", str(tmp_path / "env.sqlite"))
+    open_article_cache().close()
+    assert (tmp_path / "env.sqlite").exists()
+
+
+def test_conditional_headers_use_cached_validators():
+    cached_article = {"etag": '"v1"', "last_modified": "Mon, 04 Sep 2023"}
+    assert get_conditional_headers(cached_article) == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Mon, 04 Sep 2023"}
+    assert get_conditional_headers(None) == {}
+
+
+@patch("article_cache.time.time")
+def test_cached_article_freshness(fake_time):
+    fake_time.return_value = 1000
+    assert is_cached_article_fresh({"fetched_at": 990}, max_age=60)
+    assert not is_cached_article_fresh({"fetched_at": 900}, max_age=60)
+    assert not is_cached_article_fresh(None)
+
+
+@patch("article_cache.time.time")
+def test_least_recently_used_articles_evicted(fake_time, tmp_path):
+    cache = open_article_cache(str(tmp_path / "cache.sqlite"))
+    for index in range(5):
+        fake_time.return_value = index
+        store_cached_article(cache, f"URL{index}", "Body", 0.0)
+    fake_time.return_value = 10
+    touch_cached_article(cache, "URL0")
+
+    deleted = evict_least_recently_used(cache, max_entries=3)
+
+    assert deleted == 2
+    assert get_cached_articles(cache, [f"URL{index}" for index in range(5)]).keys() == {
+        "URL0", "URL3", "URL4"}
@@ -0,0 +1,69 @@
+"""Contains the unit tests for build_lexicon.py.
+
+Unit tests are designed to be run with pytest."""
+
+# pylint: skip-file
+
+from pathlib import Path
+
+from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+from build_lexicon import write_lexicon_artifact
+from sentiment import (read_text_lexicon, compile_lexicon, load_lexicon_artifact,
+                       create_analyser_from_artifact, get_sentiment_analyser)
+
+VADER_LEXICON_PATH = Path(__file__).with_name("vader_lexicon.txt")
+
+
+def create_text_analyser() -> SentimentIntensityAnalyzer:
+    """Returns an analyser with the pipeline's lexicon parsed by NLTK's own parser."""
+    text_analyser = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    text_analyser.lexicon_file = VADER_LEXICON_PATH.read_text(encoding="utf-8").strip()
+    text_analyser.lexicon = text_analyser.make_lex_dict()
+    text_analyser.constants = VaderConstants()
+    return text_analyser
+
+
+def test_read_text_lexicon_matches_nltk():
+    """Checks the pipeline's lexicon is read with the same scores as NLTK reads it."""
+    res = read_text_lexicon(str(VADER_LEXICON_PATH))
+
+    assert len(res) > 7000
+    assert res == create_text_analyser().lexicon
+
+
+def test_compile_lexicon_keeps_constant_tables():
+    """Checks the booster, negation and idiom tables are stored with the lexicon."""
+    res = compile_lexicon({"good": 1.9})
+
+    assert res["lexicon"] == {"good": 1.9}
+    assert res["booster"] == VaderConstants.BOOSTER_DICT
+    assert res["negations"] == VaderConstants.NEGATE
+    assert res["idioms"] == VaderConstants.SPECIAL_CASE_IDIOMS
+
+
+def test_artifact_analyser_matches_text_lexicon(tmp_path):
+    """Checks headlines are scored the same from the artifact as from the text lexicon."""
+    text_analyser = create_text_analyser()
+    artifact_path = tmp_path / "vader_lexicon.pickle"
+    write_lexicon_artifact(compile_lexicon(read_text_lexicon(str(VADER_LEXICON_PATH))), artifact_path)
+
+    artifact_analyser = create_analyser_from_artifact(load_lexicon_artifact(artifact_path))
+
+    for headline in ["Police praise 'extremely brave' passers-by",
+                     "Storm causes no major damage", "Prices rise sharply AGAIN!!"]:
+        assert artifact_analyser.polarity_scores(headline) == text_analyser.polarity_scores(headline)
+
+
+def test_analyser_read_from_text_lexicon_without_artifact(tmp_path):
+    """Checks the text lexicon is read directly when no artifact has been built, as NLTK
+    refuses to load lexicon files outside its data directories"""
+    lexicon_path = tmp_path / "vader_lexicon.txt"
+    lexicon_path.write_text(VADER_LEXICON_PATH.read_text(encoding="utf-8"), encoding="utf-8")
+
+    sentiment_analyser = get_sentiment_analyser(str(lexicon_path))
+
+    assert not (tmp_path / "vader_lexicon.pickle").exists()
+    assert sentiment_analyser.lexicon == create_text_analyser().lexicon
+    assert sentiment_analyser.polarity_scores("Storm causes no major damage") == \
+        create_text_analyser().polarity_scores("Storm causes no major damage")
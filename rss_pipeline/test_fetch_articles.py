@@ -0,0 +1,80 @@
+"""Contains unit tests for fetch_articles.py to be run with pytest"""
+# pylint: skip-file
+
+from unittest.mock import patch
+
+from requests.exceptions import RequestException
+
+from rss_conftest import StubArticleHandler, stub_article_server
+from article_cache import open_article_cache, store_cached_article
+from fetch_articles import create_http_session, fetch_article_page, fetch_article_pages
+
+
+def test_fetch_article_pages_returns_response_for_each_url(stub_article_server):
+    urls = [f"{stub_article_server}/article-{index}" for index in range(10)]
+
+    article_pages = fetch_article_pages(urls, max_workers=4)
+
+    assert set(article_pages.keys()) == set(urls)
+    assert all(response.status_code == 200
+               for response in article_pages.values())
+    assert b"Article at /article-3" in article_pages[urls[3]].content
+
+
+def test_fetch_article_pages_requests_duplicate_urls_once(stub_article_server):
+    url = f"{stub_article_server}/duplicate"
+
+    article_pages = fetch_article_pages([url, url, None, url])
+
+    assert list(article_pages.keys()) == [url]
+    assert StubArticleHandler.request_counts["/duplicate"] == 1
+
+
+@patch("fetch_articles.RETRY_BACKOFF_FACTOR", 0)
+def test_fetch_article_pages_retries_server_errors(stub_article_server):
+    url = f"{stub_article_server}/flaky"
+
+    article_pages = fetch_article_pages([url])
+
+    assert article_pages[url].status_code == 200
+    assert StubArticleHandler.request_counts["/flaky"] == 2
+
+
+def test_fetch_article_pages_keeps_non_200_responses(stub_article_server):
+    url = f"{stub_article_server}/missing"
+
+    article_pages = fetch_article_pages([url])
+
+    assert article_pages[url].status_code == 404
+
+
+def test_fetch_article_page_returns_none_when_unreachable():
+    with create_http_session() as session:
+        with patch.object(session, "get", side_effect=RequestException()):
+            assert fetch_article_page(session, "http://127.0.0.1:1/") is None
+
+
+def test_fetch_article_pages_returns_empty_dict_for_no_urls():
+    assert fetch_article_pages([]) == {}
+
+
+def test_fetch_article_pages_revalidates_cached_articles(stub_article_server, tmp_path):
+    url = f"{stub_article_server}/etag"
+    cache = open_article_cache(str(tmp_path / "cache.sqlite"))
+    store_cached_article(cache, url, "Body", 0.5, '"v1"')
+
+    with patch("fetch_articles.is_cached_article_fresh", return_value=False):
+        article_pages = fetch_article_pages([url], cache=cache)
+
+    assert article_pages[url].status_code == 304
+
+
+def test_fetch_article_pages_skips_fresh_cached_articles(stub_article_server, tmp_path):
+    url = f"{stub_article_server}/cached"
+    cache = open_article_cache(str(tmp_path / "cache.sqlite"))
+    store_cached_article(cache, url, "Body", 0.5)
+
+    article_pages = fetch_article_pages([url], cache=cache)
+
+    assert article_pages == {}
+    assert "/cached" not in StubArticleHandler.request_counts
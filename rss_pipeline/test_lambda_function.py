@@ -0,0 +1,16 @@
+"""Contains unit tests for lambda_function.py to be run with pytest"""
+# pylint: skip-file
+
+from pathlib import Path
+import subprocess
+import sys
+
+
+def test_heavy_packages_not_imported_with_handler():
+    """Checks NLTK and BeautifulSoup are only imported once articles are scored or parsed"""
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, lambda_function; print(sorted({'nltk', 'bs4'} & set(sys.modules)))"],
+        cwd=Path(__file__).parent, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
@@ -1,8 +1,13 @@
 """Contains unit tests for load.py to be run with pytest"""
 # pylint: skip-file
 
+from datetime import datetime
 from unittest.mock import MagicMock, patch
-from load import extract_source_from_url, get_source_id
+
+import psycopg2
+import pytest
+from load import (extract_source_from_url, get_source_id, get_known_story_urls,
+                  get_source_ids, create_story_rows, insert_articles_into_rds)
 
 
 def test_extract_source_from_url_returns_valid_source_for_bbc():
@@ -46,3 +51,88 @@ def test_get_source_id_returns_None_if_source_not_found(fake_invalid_source_url)
     fake_fetch.return_value = None
     result = get_source_id(fake_connection, fake_invalid_source_url)
     assert result == None
+
+
+def test_get_known_story_urls_returns_set_of_urls():
+    fake_connection = MagicMock()
+    fake_fetch = fake_connection.cursor().__enter__().fetchall
+    fake_fetch.return_value = [{'url': 'URL1'}, {'url': 'URL2'}]
+    result = get_known_story_urls(fake_connection, datetime(2023, 9, 4))
+    assert result == {'URL1', 'URL2'}
+    fake_connection.cursor().__enter__().execute.assert_called_once_with(
+        "SELECT url FROM stories WHERE pub_date >= (%s);", [datetime(2023, 9, 4)])
+
+
+def test_get_source_ids_returns_map_of_source_names():
+    fake_connection = MagicMock()
+    fake_fetch = fake_connection.cursor().__enter__().fetchall
+    fake_fetch.return_value = [{'source_id': 1, 'source_name': 'bbc'},
+                               {'source_id': 2, 'source_name': 'dailymail'}]
+    assert get_source_ids(fake_connection) == {'bbc': 1, 'dailymail': 2}
+
+
+def test_create_story_rows_skips_unknown_sources_and_duplicates(fake_articles_df):
+    rows = create_story_rows(fake_articles_df, {'bbc': 1, 'dailymail': 2})
+    assert len(rows) == 2
+    assert rows[0][:4] == (1, 'One', 'A', 'https://www.bbc.co.uk/news/1')
+    assert rows[1][1] == 'Two again'
+
+
+@patch("load.extras.execute_values")
+def test_insert_articles_into_rds_runs_single_statement(fake_execute_values, fake_articles_df):
+    fake_connection = MagicMock()
+    fake_execute_values.return_value = [{'inserted': True}]
+
+    result = insert_articles_into_rds(fake_connection, fake_articles_df,
+                                      {'bbc': 1, 'dailymail': 2})
+
+    assert result == {'inserted': 1, 'updated': 0, 'skipped': 3}
+    assert fake_execute_values.call_count == 1
+    assert fake_execute_values.call_args.kwargs['page_size'] == 2
+    fake_connection.commit.assert_called_once()
+
+
+@patch("load.extras.execute_values")
+def test_insert_articles_into_rds_refreshes_source_sentiment(fake_execute_values, fake_articles_df):
+    fake_connection = MagicMock()
+    fake_cursor = fake_connection.cursor().__enter__()
+    fake_execute_values.return_value = [{'inserted': True}]
+
+    insert_articles_into_rds(fake_connection, fake_articles_df, {'bbc': 1, 'dailymail': 2})
+
+    query, params = fake_cursor.execute.call_args.args
+    assert 'source_sentiment_hourly' in query
+    assert params == [['https://www.bbc.co.uk/news/1', 'https://www.dailymail.co.uk/news/2']]
+
+
+@patch("load.extras.execute_values")
+def test_insert_articles_into_rds_skips_refresh_when_unchanged(fake_execute_values, fake_articles_df):
+    fake_connection = MagicMock()
+    fake_execute_values.return_value = []
+
+    insert_articles_into_rds(fake_connection, fake_articles_df, {'bbc': 1, 'dailymail': 2})
+
+    fake_connection.cursor().__enter__().execute.assert_not_called()
+
+
+@patch("load.extras.execute_values")
+def test_insert_articles_into_rds_counts_updates(fake_execute_values, fake_articles_df):
+    fake_connection = MagicMock()
+    fake_execute_values.return_value = [{'inserted': True}, {'inserted': False}]
+
+    result = insert_articles_into_rds(fake_connection, fake_articles_df,
+                                      {'bbc': 1, 'dailymail': 2})
+
+    assert result == {'inserted': 1, 'updated': 1, 'skipped': 2}
+
+
+@patch("load.extras.execute_values")
+def test_insert_articles_into_rds_rolls_back_on_error(fake_execute_values, fake_articles_df):
+    fake_connection = MagicMock()
+    fake_execute_values.side_effect = psycopg2.DatabaseError()
+
+    with pytest.raises(psycopg2.DatabaseError):
+        insert_articles_into_rds(fake_connection, fake_articles_df, {'bbc': 1})
+
+    fake_connection.rollback.assert_called_once()
+    fake_connection.commit.assert_not_called()
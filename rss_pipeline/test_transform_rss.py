@@ -3,14 +3,22 @@ import pandas as pd
 from datetime import datetime
 import xml.etree.ElementTree as ET
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from unittest.mock import mock_open, patch
+from unittest.mock import MagicMock, mock_open, patch
 from transform_rss import (
     extract_info_from_bbc_articles,
     extract_info_from_daily_mail_articles,
     convert_pubdate_to_timestamp,
     remove_headline_tags,
     get_sentiment_score,
+    parse_bbc_article_text,
+    parse_daily_mail_article_text,
+    get_bbc_full_article_text,
+    get_daily_mail_full_article_text,
+    get_article_text_sentiment,
+    remove_known_articles,
+    transform_bbc_articles,
 )
+from article_cache import open_article_cache, store_cached_article, get_cached_article
 
 
 def test_extract_info_from_bbc_articles():
@@ -108,3 +116,78 @@ def test_get_sentiment_score():
     vader = SentimentIntensityAnalyzer()
     score = get_sentiment_score(text, vader)
     assert isinstance(score, float)
+
+
+def test_parse_bbc_article_text_keeps_paragraphs():
+    paragraphs = "".join(
+        f'<p class="Paragraph">Line {index}</p>' for index in range(6))
+    html = f"<html><body>{paragraphs}</body></html>".encode()
+    assert parse_bbc_article_text(html) == "Line 0 Line 1"
+
+
+def test_parse_daily_mail_article_text_reads_article_body():
+    html = b'<html><body><div itemprop="articleBody">Body text</div></body></html>'
+    assert parse_daily_mail_article_text(html) == "Body text"
+
+
+def test_get_bbc_full_article_text_reads_downloaded_pages():
+    fake_response = MagicMock(status_code=200,
+                              content=b'<p class="Paragraph">Only line</p>')
+    text = get_bbc_full_article_text("URL", {"URL": fake_response})
+    assert text == "Only line"
+
+
+def test_get_daily_mail_full_article_text_empty_for_failed_download():
+    assert get_daily_mail_full_article_text("URL", {}) == ""
+    fake_response = MagicMock(status_code=404, content=b"")
+    assert get_daily_mail_full_article_text(
+        "URL", {"URL": fake_response}) == ""
+
+
+def test_get_article_text_sentiment_reuses_cached_score_when_not_modified(tmp_path):
+    cache = open_article_cache(str(tmp_path / "cache.sqlite"))
+    store_cached_article(cache, "URL", "Body", 0.42)
+    fake_get_text = MagicMock()
+
+    score = get_article_text_sentiment("URL", {"URL": MagicMock(status_code=304)},
+                                       fake_get_text, MagicMock(), cache)
+
+    assert score == 0.42
+    fake_get_text.assert_not_called()
+
+
+def test_get_article_text_sentiment_caches_new_articles(tmp_path):
+    cache = open_article_cache(str(tmp_path / "cache.sqlite"))
+    fake_response = MagicMock(status_code=200, headers={"ETag": '"v2"'})
+    fake_analyser = MagicMock()
+    fake_analyser.polarity_scores.return_value = {"compound": -0.3}
+
+    score = get_article_text_sentiment("URL", {"URL": fake_response},
+                                       lambda url, pages: "Body", fake_analyser, cache)
+
+    cached_article = get_cached_article(cache, "URL")
+    assert score == -0.3
+    assert cached_article["body_text"] == "Body"
+    assert cached_article["sentiment_score"] == -0.3
+    assert cached_article["etag"] == '"v2"'
+
+
+def test_remove_known_articles_skips_loaded_urls():
+    articles_df = pd.DataFrame({"url": ["URL1", "URL2", "URL3"],
+                                "title": ["One", "Two", "Three"]})
+
+    remaining_df, skipped = remove_known_articles(articles_df, {"URL2", "URL4"})
+
+    assert skipped == 1
+    assert list(remaining_df["url"]) == ["URL1", "URL3"]
+    assert list(remaining_df.index) == [0, 1]
+
+
+def test_transform_bbc_articles_handles_all_articles_skipped():
+    articles_df = pd.DataFrame(
+        {"title": [], "description": [], "url": [], "pubdate": []})
+
+    transformed_df = transform_bbc_articles(articles_df, None, {})
+
+    assert transformed_df.empty
+    assert "sentiment_score" in transformed_df.columns
@@ -0,0 +1,66 @@
+"""Contains unit tests for warm_resources.py to be run with pytest"""
+# pylint: skip-file
+
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+
+from warm_resources import WarmResources
+
+
+def create_fake_connection() -> MagicMock:
+    """Returns an open fake connection"""
+    fake_connection = MagicMock()
+    fake_connection.closed = 0
+    return fake_connection
+
+
+@patch("warm_resources.get_sentiment_analyser")
+@patch("warm_resources.load_dotenv")
+def test_resources_created_once_across_invocations(fake_load_dotenv, fake_get_analyser):
+    fake_connect = MagicMock(side_effect=create_fake_connection)
+    resources = WarmResources(connect=fake_connect)
+
+    first = resources.prepare()
+    second = resources.prepare()
+
+    assert first == second
+    fake_connect.assert_called_once()
+    fake_get_analyser.assert_called_once_with("vader_lexicon.txt")
+    fake_load_dotenv.assert_called_once()
+    assert set(resources.setup_seconds) == {"environment", "connection",
+                                            "sentiment_analyser", "total"}
+
+
+def test_closed_connection_replaced():
+    fake_connect = MagicMock(side_effect=create_fake_connection)
+    resources = WarmResources(connect=fake_connect)
+    first = resources.get_connection()
+    first.closed = 1
+
+    second = resources.get_connection()
+
+    assert second is not first
+    assert fake_connect.call_count == 2
+
+
+def test_stale_connection_replaced():
+    fake_connect = MagicMock(side_effect=create_fake_connection)
+    resources = WarmResources(connect=fake_connect)
+    first = resources.get_connection()
+    first.cursor().__enter__().execute.side_effect = psycopg2.OperationalError()
+
+    second = resources.get_connection()
+
+    assert second is not first
+    first.close.assert_called_once()
+
+
+def test_healthy_connection_reused_with_transaction_ended():
+    fake_connect = MagicMock(side_effect=create_fake_connection)
+    resources = WarmResources(connect=fake_connect)
+    first = resources.get_connection()
+
+    assert resources.get_connection() is first
+    first.cursor().__enter__().execute.assert_called_with("SELECT 1;")
+    first.rollback.assert_called()
@@ -2,20 +2,29 @@
 This script converts the XML to dataframes and cleans them 
 as well as applying sentiment analysis
 """
+from __future__ import annotations
+
 import re
 from datetime import datetime
+import sqlite3
+from typing import Callable, TYPE_CHECKING
 import xml.etree.ElementTree as ET
-import requests
 import pandas as pd
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor
+
+from fetch_articles import fetch_article_pages
+from sentiment import get_sentiment_analyser
+from article_cache import get_cached_article, store_cached_article, touch_cached_article
+
+if TYPE_CHECKING:
+    import requests
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
 
 
 BBC_UK_NEWS_XML_FILE_NAME = "bbc_uk_news.xml"
 DAILY_MAIL_UK_NEWS_XML_FILE_NAME = "daily_mail_uk_news.xml"
 
+VADER_LEXICON_FILE = "vader_lexicon.txt"
+
 BBC_UK_NEWS_CSV_FILENAME = "bbc_uk_news.csv"
 DAILY_MAIL_UK_NEWS_CSV_FILENAME = "daily_mail_uk_news.csv"
 
@@ -78,6 +87,7 @@ def convert_pubdate_to_timestamp(pubdate: str) -> datetime:
 
 def remove_headline_tags(headline: str) -> str:
     """Removes unnecessary tags from the headline"""
+    # Copied to HEADLINE_TAGS in tagging_pipeline/topic_cache.py, keep the two lists the same
     headline_tags = [
         "BREAKING", "EXCLUSIVE",
         "UPDATE", "LIVE",
@@ -101,10 +111,29 @@ def remove_headline_tags(headline: str) -> str:
     return updated_headline
 
 
-def get_bbc_full_article_text(url: str) -> str:
-    """Uses BeautifulSoup to extract the full article from the URL"""
-    html = requests.get(url)
-    bsobj = BeautifulSoup(html.content, "lxml")
+def remove_known_articles(articles_df: pd.DataFrame, known_urls: set[str]) -> tuple[pd.DataFrame, int]:
+    """Removes the articles whose URL has already been loaded,
+    returns the remaining articles and how many were removed
+    """
+    is_known = articles_df['url'].isin(known_urls)
+    return articles_df[~is_known].reset_index(drop=True), int(is_known.sum())
+
+
+def get_article_page_content(url: str, article_pages: dict[str, requests.Response] | None) -> bytes | None:
+    """Returns the downloaded HTML for the URL, fetching it if no pages were downloaded beforehand"""
+    if article_pages is None:
+        article_pages = fetch_article_pages([url], max_workers=1)
+
+    response = article_pages.get(url)
+    if response is None or response.status_code != 200:
+        return None
+    return response.content
+
+
+def parse_bbc_article_text(html: bytes) -> str:
+    """Uses BeautifulSoup to extract the full article from the page HTML"""
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+    bsobj = BeautifulSoup(html, "lxml")
 
     # Average number of trailing tags that should be removed
     # from the BBC article (for processing)
@@ -131,11 +160,10 @@ def get_bbc_full_article_text(url: str) -> str:
     return ""
 
 
-def get_daily_mail_full_article_text(url: str) -> str:
-    """Uses BeautifulSoup to extract the full article from the URL"""
-    response = requests.get(url)
-
-    html = BeautifulSoup(response.text, 'html.parser')
+def parse_daily_mail_article_text(html: bytes) -> str:
+    """Uses BeautifulSoup to extract the full article from the page HTML"""
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+    html = BeautifulSoup(html, 'html.parser')
 
     # Find the tag with the article body
     article_body = html.find('div', itemprop='articleBody')
@@ -146,6 +174,22 @@ def get_daily_mail_full_article_text(url: str) -> str:
     return ""
 
 
+def get_bbc_full_article_text(url: str, article_pages: dict[str, requests.Response] | None = None) -> str:
+    """Extracts the full article text for the URL from the downloaded article pages"""
+    html = get_article_page_content(url, article_pages)
+    if html is None:
+        return ""
+    return parse_bbc_article_text(html)
+
+
+def get_daily_mail_full_article_text(url: str, article_pages: dict[str, requests.Response] | None = None) -> str:
+    """Extracts the full article text for the URL from the downloaded article pages"""
+    html = get_article_page_content(url, article_pages)
+    if html is None:
+        return ""
+    return parse_daily_mail_article_text(html)
+
+
 def get_sentiment_score(article_text: str, sentiment_analyser: SentimentIntensityAnalyzer) -> float:
     """Returns the sentiment score using VADER"""
     sentiment_score = sentiment_analyser.polarity_scores(article_text)[
@@ -154,10 +198,35 @@ def get_sentiment_score(article_text: str, sentiment_analyser: SentimentIntensit
     return sentiment_score
 
 
-def transform_bbc_xml_file(bbc_xml_file: str, sentiment_analyser: SentimentIntensityAnalyzer) -> pd.DataFrame:
-    """Converts the BBC XML file to a dataframe and cleans it"""
-    bbc_articles_df = extract_info_from_bbc_articles(f"/tmp/{bbc_xml_file}")
+def get_article_text_sentiment(url: str, article_pages: dict[str, requests.Response] | None,
+                               get_full_article_text: Callable, sentiment_analyser: SentimentIntensityAnalyzer,
+                               cache: sqlite3.Connection | None = None) -> float:
+    """Returns the sentiment score of the full article text.
+
+    Articles that were not downloaded again, or were unchanged since they were
+    cached, reuse the cached score instead of being parsed and scored again.
+    """
+    cached_article = get_cached_article(cache, url) if cache else None
+    response = article_pages.get(url) if article_pages is not None else None
+
+    if cached_article and (response is None or response.status_code == 304):
+        touch_cached_article(cache, url, revalidated=response is not None)
+        return cached_article['sentiment_score']
+
+    article_text = get_full_article_text(url, article_pages)
+    sentiment_score = get_sentiment_score(article_text, sentiment_analyser)
+
+    if cache and response is not None and response.status_code == 200:
+        store_cached_article(cache, url, article_text, sentiment_score,
+                             response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    return sentiment_score
+
 
+def transform_bbc_articles(bbc_articles_df: pd.DataFrame, sentiment_analyser: SentimentIntensityAnalyzer,
+                           article_pages: dict[str, requests.Response] | None = None,
+                           cache: sqlite3.Connection | None = None) -> pd.DataFrame:
+    """Cleans the BBC articles dataframe and scores it using the downloaded article pages"""
     bbc_articles_df['pubdate'] = bbc_articles_df['pubdate'].apply(
         convert_pubdate_to_timestamp)
     bbc_articles_df['title'] = bbc_articles_df['title'].apply(
@@ -165,24 +234,20 @@ def transform_bbc_xml_file(bbc_xml_file: str, sentiment_analyser: SentimentInten
 
     print("Calculating the sentiment score for all of the BBC articles...")
 
-    # bbc_articles_df['sentiment_score'] = bbc_articles_df.apply(lambda row: get_sentiment_score(
-    #     row['title'] + ' ' + row['description'] + ' ' +
-    #     get_bbc_full_article_text(row['url']), sentiment_analyser), axis=1)
-
     bbc_articles_df['sentiment_score'] = bbc_articles_df.apply(lambda row: (0.7 * get_sentiment_score((row['title'] +
                                                                                                        ' ' + row['description']), sentiment_analyser)) +
-                                                               (0.3 * get_sentiment_score(get_bbc_full_article_text(row['url']), sentiment_analyser)), axis=1)
+                                                               (0.3 * get_article_text_sentiment(row['url'], article_pages, get_bbc_full_article_text,
+                                                                                                 sentiment_analyser, cache)), axis=1, result_type='reduce')
 
     print("BBC News XML file has been fully processed")
 
     return bbc_articles_df
 
 
-def transform_daily_mail_xml_file(daily_mail_xml_file: str, sentiment_analyser: SentimentIntensityAnalyzer) -> pd.DataFrame:
-    """Converts the Daily Mail XML file to a dataframe and cleans it"""
-    daily_mail_articles_df = extract_info_from_daily_mail_articles(
-        f"/tmp/{daily_mail_xml_file}")
-
+def transform_daily_mail_articles(daily_mail_articles_df: pd.DataFrame, sentiment_analyser: SentimentIntensityAnalyzer,
+                                  article_pages: dict[str, requests.Response] | None = None,
+                                  cache: sqlite3.Connection | None = None) -> pd.DataFrame:
+    """Cleans the Daily Mail articles dataframe and scores it using the downloaded article pages"""
     daily_mail_articles_df['pubdate'] = daily_mail_articles_df['pubdate'].apply(
         convert_pubdate_to_timestamp)
     daily_mail_articles_df['title'] = daily_mail_articles_df['title'].apply(
@@ -190,35 +255,49 @@ def transform_daily_mail_xml_file(daily_mail_xml_file: str, sentiment_analyser:
 
     print("Calculating the sentiment score for all of the Daily Mail articles...")
 
-    # daily_mail_articles_df['sentiment_score'] = daily_mail_articles_df.apply(lambda row: get_sentiment_score(
-    #     row['title'] + ' ' + row['description'] + ' ' +
-    #     get_daily_mail_full_article_text(row['url']), sentiment_analyser), axis=1)
-
     daily_mail_articles_df['sentiment_score'] = daily_mail_articles_df.apply(lambda row: (0.7 * get_sentiment_score((row['title'] +
                                                                                                                      ' ' + row['description']), sentiment_analyser)) +
-                                                                             (0.3 * get_sentiment_score(get_daily_mail_full_article_text(row['url']), sentiment_analyser)), axis=1)
+                                                                             (0.3 * get_article_text_sentiment(row['url'], article_pages, get_daily_mail_full_article_text,
+                                                                                                               sentiment_analyser, cache)), axis=1, result_type='reduce')
 
     print("Daily Mail News XML file has been fully processed")
 
     return daily_mail_articles_df
 
 
-if __name__ == "__main__":
+def transform_bbc_xml_file(bbc_xml_file: str, sentiment_analyser: SentimentIntensityAnalyzer) -> pd.DataFrame:
+    """Converts the BBC XML file to a dataframe and cleans it"""
+    bbc_articles_df = extract_info_from_bbc_articles(f"/tmp/{bbc_xml_file}")
+    article_pages = fetch_article_pages(list(bbc_articles_df['url']))
+
+    return transform_bbc_articles(bbc_articles_df, sentiment_analyser, article_pages)
+
+
+def transform_daily_mail_xml_file(daily_mail_xml_file: str, sentiment_analyser: SentimentIntensityAnalyzer) -> pd.DataFrame:
+    """Converts the Daily Mail XML file to a dataframe and cleans it"""
+    daily_mail_articles_df = extract_info_from_daily_mail_articles(
+        f"/tmp/{daily_mail_xml_file}")
+    article_pages = fetch_article_pages(list(daily_mail_articles_df['url']))
+
+    return transform_daily_mail_articles(daily_mail_articles_df, sentiment_analyser, article_pages)
 
-    nltk.download('vader_lexicon')
 
-    vader = SentimentIntensityAnalyzer(lexicon_file="vader_lexicon.txt")
+if __name__ == "__main__":
+    vader = get_sentiment_analyser(VADER_LEXICON_FILE)
+
+    bbc_articles_df = extract_info_from_bbc_articles(
+        f"/tmp/{BBC_UK_NEWS_XML_FILE_NAME}")
+    daily_mail_articles_df = extract_info_from_daily_mail_articles(
+        f"/tmp/{DAILY_MAIL_UK_NEWS_XML_FILE_NAME}")
 
-    # Multithreading to make the tasks run faster
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        future_bbc = executor.submit(
-            transform_bbc_xml_file, BBC_UK_NEWS_XML_FILE_NAME, vader)
-        future_daily_mail = executor.submit(
-            transform_daily_mail_xml_file, DAILY_MAIL_UK_NEWS_XML_FILE_NAME, vader)
+    # Downloads the article pages from both feeds concurrently
+    article_pages = fetch_article_pages(
+        list(bbc_articles_df['url']) + list(daily_mail_articles_df['url']))
 
-        # Wait for both tasks to complete
-        bbc_articles_df = future_bbc.result()
-        daily_mail_articles_df = future_daily_mail.result()
+    bbc_articles_df = transform_bbc_articles(
+        bbc_articles_df, vader, article_pages)
+    daily_mail_articles_df = transform_daily_mail_articles(
+        daily_mail_articles_df, vader, article_pages)
 
     daily_mail_articles_df.to_csv(DAILY_MAIL_UK_NEWS_CSV_FILENAME)
     bbc_articles_df.to_csv(BBC_UK_NEWS_CSV_FILENAME)
@@ -0,0 +1,81 @@
+"""Keeps the database connection and VADER analyser of the Lambda container between
+invocations, so warm invocations skip connecting and loading the lexicon"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, TYPE_CHECKING
+
+from dotenv import load_dotenv
+import psycopg2
+
+from load import db_connection
+from sentiment import get_sentiment_analyser
+
+if TYPE_CHECKING:
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+VADER_LEXICON_FILE = "vader_lexicon.txt"
+
+
+class WarmResources:
+    """Creates the connection and analyser the first time they are needed and reuses them,
+    recording how long each invocation spent setting them up"""
+
+    def __init__(self, connect: Callable[[], psycopg2.extensions.connection] = db_connection,
+                 lexicon_file: str = VADER_LEXICON_FILE):
+        self._connect = connect
+        self._lexicon_file = lexicon_file
+        self._conn = None
+        self._sentiment_analyser = None
+        self._environment_loaded = False
+        self.setup_seconds = {}
+
+    def is_connection_healthy(self) -> bool:
+        """Returns True if the kept connection is open and answers a query"""
+        if self._conn is None or self._conn.closed:
+            return False
+        try:
+            self._conn.rollback()
+            with self._conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            self._conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def get_connection(self) -> psycopg2.extensions.connection:
+        """Returns the kept connection, reconnecting if it is missing or has gone stale"""
+        if not self.is_connection_healthy():
+            if self._conn is not None and not self._conn.closed:
+                self._conn.close()
+            self._conn = self._connect()
+        return self._conn
+
+    def get_sentiment_analyser(self) -> SentimentIntensityAnalyzer:
+        """Returns the analyser, only reading the lexicon the first time"""
+        if self._sentiment_analyser is None:
+            self._sentiment_analyser = get_sentiment_analyser(self._lexicon_file)
+        return self._sentiment_analyser
+
+    def prepare(self) -> tuple[psycopg2.extensions.connection, SentimentIntensityAnalyzer]:
+        """Returns the connection and analyser for an invocation, recording the seconds
+        spent loading the environment, connecting and loading the analyser"""
+        start = time.perf_counter()
+        if not self._environment_loaded:
+            load_dotenv()
+            self._environment_loaded = True
+        environment_done = time.perf_counter()
+        conn = self.get_connection()
+        connection_done = time.perf_counter()
+        sentiment_analyser = self.get_sentiment_analyser()
+        analyser_done = time.perf_counter()
+
+        self.setup_seconds = {"environment": environment_done - start,
+                              "connection": connection_done - environment_done,
+                              "sentiment_analyser": analyser_done - connection_done,
+                              "total": analyser_done - start}
+        print(f"Setup took {self.setup_seconds['total']:.3f} seconds "
+              f"(connection {self.setup_seconds['connection']:.3f}, "
+              f"analyser {self.setup_seconds['sentiment_analyser']:.3f})")
+        return conn, sentiment_analyser
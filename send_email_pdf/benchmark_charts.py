@@ -0,0 +1,72 @@
+"""Compares the import time, render time and peak memory of the SVG charts with the
+Plotly and Kaleido charts they replaced. Each path runs in a fresh interpreter."""
+
+import json
+import subprocess
+import sys
+
+BENCHMARK_REPEATS = 20
+TOPIC_COUNTS = [("Crime", 4), ("Finance", 5), ("War", 7), ("Monarchy", 8), ("Politics", 12)]
+
+SVG_CHARTS_CODE = """
+import json, resource, time
+start = time.perf_counter()
+from svg_charts import create_gauge_svg, create_horizontal_bar_svg
+import_seconds = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range({repeats}):
+    create_gauge_svg(0.12, "BBC Sentiment", "#199988")
+    create_gauge_svg(-0.3, "Daily Mail Sentiment", "#e15759")
+    create_horizontal_bar_svg({topic_counts})
+render_seconds = (time.perf_counter() - start) / {repeats}
+print(json.dumps({{"import": import_seconds, "render": render_seconds,
+                  "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+PLOTLY_CODE = """
+import json, resource, time
+start = time.perf_counter()
+import plotly.graph_objects as go
+import_seconds = time.perf_counter() - start
+def gauge(value, title, color):
+    return go.Figure(data=[go.Indicator(mode="gauge+number+delta", value=value,
+        gauge={{"axis": {{"range": [-1, 1]}}, "bar": {{"color": color}}}}, title={{"text": title}})])
+def bars(data):
+    return go.Figure(data=[go.Bar(x=[v for _, v in data], y=[k for k, _ in data], orientation="h")])
+start = time.perf_counter()
+for _ in range({repeats}):
+    gauge(0.12, "BBC Sentiment", "#199988").to_image(format="svg")
+    gauge(-0.3, "Daily Mail Sentiment", "#e15759").to_image(format="svg")
+    bars({topic_counts}).to_image(format="svg")
+render_seconds = (time.perf_counter() - start) / {repeats}
+rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+          resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+print(json.dumps({{"import": import_seconds, "render": render_seconds, "rss": rss}}))
+"""
+
+
+def run_benchmark(code: str) -> dict | None:
+    """Runs the benchmark code in a new interpreter, returning its measurements
+    or None if it could not run, for example because Plotly is not installed."""
+    result = subprocess.run([sys.executable, "-c", code.format(repeats=BENCHMARK_REPEATS,
+                                                              topic_counts=TOPIC_COUNTS)],
+                            capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1])
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_measurements(name: str, measurements: dict | None) -> None:
+    """Prints the import time, render time of the three report charts and peak RSS."""
+    if measurements is None:
+        print(f"{name}: not available")
+        return
+    print(f"{name}: import {measurements['import'] * 1000:,.1f} ms, "
+          f"render {measurements['render'] * 1000:,.2f} ms, "
+          f"peak RSS {measurements['rss'] / 1024:,.1f} MB")
+
+
+if __name__ == "__main__":
+    print_measurements("SVG charts", run_benchmark(SVG_CHARTS_CODE))
+    print_measurements("Plotly and Kaleido", run_benchmark(PLOTLY_CODE))
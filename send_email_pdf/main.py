@@ -2,98 +2,167 @@
 then uploads the pdf to an s3 bucket and sends an email of the pdf."""
 
 
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Template
+from typing import Callable
 import sys
 from os import environ
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 from datetime import datetime, timedelta
 import re
+from time import perf_counter
 
 from dotenv import load_dotenv
 from psycopg2.extensions import connection
 from psycopg2 import connect, Error
-import pandas as pd
-import plotly.graph_objects as go
-from xhtml2pdf import pisa
-from boto3 import client
+
+from svg_charts import create_gauge_svg, create_horizontal_bar_svg
 
 
 PDF_FILE_NAME = "Media-Sentiment.pdf"
 PDF_FILE_PATH = "/tmp/Media-Sentiment.pdf"
 GREEN = "#199988"
 RED = "#e15759"
+BBC_PLOT_PATH = "/tmp/bbc_plot.svg"
+DAILY_MAIL_PLOT_PATH = "/tmp/daily_mail_plot.svg"
+MOST_POPULAR_PLOT_PATH = "/tmp/most_popular_plot.svg"
+# Kept between warm invocations of the Lambda
+WARM_RESOURCES = {}
+
+REPORT_TEMPLATE = Template(f'''
+<html>
+<head>
+<style>
+    /* Define the CSS styles for your dashboard here */
 
+    html {{ -webkit-print-color-adjust: exact; }}
 
-def get_top_stories(conn: connection) -> pd.DataFrame:   # pragma: no cover
-    "Function that joins all SQL tables."
-    query = """SELECT title from stories WHERE stories.pub_date BETWEEN NOW() - INTERVAL '24 HOURS'
-    AND NOW() ORDER BY media_sentiment DESC LIMIT 3;"""
-    with conn.cursor() as cur:
-        cur.execute(query)
-        tuples_list = cur.fetchall()
-    columns_list = ["title"]
-    top_df = pd.DataFrame(tuples_list, columns=columns_list)
-    return top_df
+    body{{
+    background-color: #292929;
+    font-family: Rockwell;
+    }}
+    
+    .widget {{
+        background-color: #fff;
+        padding: 2px;
+        border-radius: 2px;
+    }}
 
+    /* Add more styles as needed */
+</style>
+</head>
+<body style="background: #292929;">
 
-def get_bottom_stories(conn: connection) -> pd.DataFrame:   # pragma: no cover
-    "Function that joins all SQL tables."
-    query = """SELECT title from stories WHERE stories.pub_date BETWEEN NOW() - INTERVAL '24 HOURS'
-    AND NOW() ORDER BY media_sentiment ASC LIMIT 3;"""
-    with conn.cursor() as cur:
-        cur.execute(query)
-        tuples_list = cur.fetchall()
-    columns_list = ["title"]
-    bottom_df = pd.DataFrame(tuples_list, columns=columns_list)
-    return bottom_df
-
-
-def get_media_averages(conn: connection) -> pd.DataFrame:   # pragma: no cover
-    "Function that gets the averages of media sentiment for different media outlets"
-    query = """SELECT source_name, AVG(media_sentiment)
-FROM stories
-JOIN sources ON sources.source_id = stories.source_id
-WHERE stories.pub_date BETWEEN NOW() - INTERVAL '24 HOURS' AND NOW()
-GROUP BY source_name ORDER BY source_name;"""
-    with conn.cursor() as cur:
-        cur.execute(query)
-        tuples_list = cur.fetchall()
-    stories_df = pd.DataFrame(tuples_list, columns=[
-        "source_name", "average_media_sentiment"])
-    return stories_df
+<div class="title-container">
+    <img src="media-sentiment-report-header.png" alt="Media Sentiment Report" class=title-container/>
+</div>
+
+<table border="0" style="width:100%;text-align:center">
+<tr>
+<td><img style="width: 260px; height: 160px" src = "{BBC_PLOT_PATH}" alt="BBC"/></td>
+<td><img style="width: 260px; height: 160px" src = "{DAILY_MAIL_PLOT_PATH}" alt="Daily Mail"/></td>
+</tr>
+</table>
+
+<h1 style='text-align:center;color:#fff;padding-top:10px;'>Most Popular Topics</h1>
+
+<div class="widget">
+    <img style="width:600px;height: 300px;text-align:center" src = "{MOST_POPULAR_PLOT_PATH}" alt="Most Popular"/>
+</div>
+
+<h1 style='text-align:center;color:#88C180;padding-top:10px;'>Highest Sentiment Stories</h1>
+
+<div class="widget">
+    $top_titles
+</div>
+
+<h1 style='text-align:center;color:#EA898B;padding-top:10px;'>Lowest Sentiment Stories</h1>
+
+<div class="widget">
+    $bottom_titles
+</div>
+
+<!-- Add more widgets as needed -->
+</body>
+</html>
+''')
 
 
-def get_topic_counts(conn: connection) -> pd.DataFrame:   # pragma: no cover
-    "Function that gets the count of topics discussed in last 24 hours"
-    query = """WITH top_keywords AS (
+REPORT_QUERY = """WITH recent_stories AS (
+    SELECT
+        title,
+        media_sentiment,
+        ROW_NUMBER() OVER (ORDER BY media_sentiment DESC) AS top_rank,
+        ROW_NUMBER() OVER (ORDER BY media_sentiment ASC) AS bottom_rank
+    FROM stories
+    WHERE stories.pub_date BETWEEN NOW() - INTERVAL '24 HOURS' AND NOW()
+),
+top_keywords AS (
     SELECT
         keywords.keyword,
-        (
-            COUNT(DISTINCT stories.story_id) + COUNT(DISTINCT ra.re_article_id)
-        ) AS total_count
+        SUM(keyword_hourly_counts.story_count) + SUM(keyword_hourly_counts.reddit_count) AS total_count
     FROM
-        keywords
-    JOIN story_keyword_link ON keywords.keyword_id = story_keyword_link.keyword_id
-    JOIN stories ON story_keyword_link.story_id = stories.story_id
-    JOIN reddit_keyword_link rl ON keywords.keyword_id = rl.keyword_id
-    JOIN reddit_article ra ON ra.re_article_id = rl.re_article_id
+        keyword_hourly_counts
+    JOIN keywords ON keywords.keyword_id = keyword_hourly_counts.keyword_id
     WHERE
-        stories.pub_date >= (CURRENT_TIMESTAMP - INTERVAL '24 hours')
-        AND ra.re_created_timestamp >= (CURRENT_TIMESTAMP - INTERVAL '24 hours')
+        keyword_hourly_counts.hour_start >= DATE_TRUNC('hour', NOW()) - INTERVAL '23 HOURS'
     GROUP BY
         keywords.keyword
+    HAVING
+        SUM(keyword_hourly_counts.story_count) > 0 AND SUM(keyword_hourly_counts.reddit_count) > 0
     ORDER BY
         total_count DESC
     LIMIT 5
 )
-SELECT *
-FROM top_keywords ORDER BY total_count ASC;"""
+SELECT 'average', source_name, SUM(sentiment_sum) / NULLIF(SUM(sentiment_count), 0), NULL::BIGINT
+FROM source_sentiment_hourly
+JOIN sources ON sources.source_id = source_sentiment_hourly.source_id
+WHERE source_sentiment_hourly.hour_start >= DATE_TRUNC('hour', NOW()) - INTERVAL '23 HOURS'
+GROUP BY source_name
+UNION ALL
+SELECT 'top', title, media_sentiment, top_rank FROM recent_stories WHERE top_rank <= 3
+UNION ALL
+SELECT 'bottom', title, media_sentiment, bottom_rank FROM recent_stories WHERE bottom_rank <= 3
+UNION ALL
+SELECT 'topic', keyword, total_count, NULL::BIGINT FROM top_keywords;"""
+
+
+@dataclass(frozen=True)
+class ReportSnapshot:
+    """The data shown in one report."""
+    source_averages: dict[str, float]
+    top_titles: list[str]
+    bottom_titles: list[str]
+    topic_counts: list[tuple[str, int]]
+
+
+def create_report_snapshot(rows: list[tuple]) -> ReportSnapshot:
+    """Sorts the (section, label, value, rank) rows of the report query into a snapshot.
+    Averages are ordered by source name, stories by rank and topics by ascending count."""
+    sections = {"average": [], "top": [], "bottom": [], "topic": []}
+    for section, label, value, rank in rows:
+        sections[section].append((rank, label, value))
+    return ReportSnapshot(
+        source_averages={label: value for _, label, value in sorted(sections["average"],
+                                                                     key=lambda row: row[1])},
+        top_titles=[label for _, label, _ in sorted(sections["top"])],
+        bottom_titles=[label for _, label, _ in sorted(sections["bottom"])],
+        topic_counts=[(label, int(value)) for _, label, value in sorted(sections["topic"],
+                                                                          key=lambda row: row[2])])
+
+
+def get_report_snapshot(conn: connection) -> ReportSnapshot:   # pragma: no cover
+    """Reads the source averages, top and bottom stories and most popular topics
+    of the last 24 hours in one query. Averages and topics come from the hourly
+    rollup tables, covering the current hour and the 23 before it."""
     with conn.cursor() as cur:
-        cur.execute(query)
-        tuples_list = cur.fetchall()
-    topics_df = pd.DataFrame(tuples_list, columns=[
-        "keyword", "total_count"])
-    return topics_df
+        cur.execute(REPORT_QUERY)
+        rows = cur.fetchall()
+    # Ends the read so NOW() moves on when the connection is reused
+    conn.rollback()
+    return create_report_snapshot(rows)
 
 
 def get_db_connection():   # pragma: no cover
@@ -112,6 +181,24 @@ def get_db_connection():   # pragma: no cover
         sys.exit()
 
 
+def get_warm_db_connection():   # pragma: no cover
+    """Returns the connection opened by an earlier invocation if it is still open,
+    otherwise opens a new one."""
+    conn = WARM_RESOURCES.get("db_connection")
+    if conn is None or conn.closed:
+        conn = WARM_RESOURCES["db_connection"] = get_db_connection()
+    return conn
+
+
+@lru_cache(maxsize=None)
+def get_aws_client(service: str):   # pragma: no cover
+    """Returns a client for the AWS service, created once per container.
+    boto3 is only imported when the first client is needed."""
+    from boto3 import client  # pylint: disable=import-outside-toplevel
+    return client(service, aws_access_key_id=environ.get("ACCESS_KEY"),
+                  aws_secret_access_key=environ.get("SECRET_KEY"))
+
+
 def get_titles(titles) -> str:
     """Function that takes out all the title names from the top stories
     and returns them as a HTML ready string.
@@ -123,28 +210,9 @@ def get_titles(titles) -> str:
     return title_str
 
 
-def create_gauge_figure(data, source: str, filename: str, line_color: str) -> None:  # pragma: no cover
-    """Creates a formatted gauge figure saved as a .svg file."""
-    layout = go.Layout(
-        margin=go.layout.Margin(
-            l=0,  # left margin
-            r=0,  # right margin
-            b=0,  # bottom margin
-            t=50,  # top margin
-        )
-    )
-    gauge_fig = go.Figure(layout=layout, data=[go.Indicator(
-        mode="gauge+number+delta",
-        value=data,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        gauge={'axis': {'range': [-1, 1], 'tickfont': {"family": "Arial", "size": 24}},
-               'bar': {'color': line_color,
-                       'line': {"color": "white",
-                                "width": 3}},
-               'bgcolor': "white"},
-        title={'text': f"{source} Sentiment", "font": {"family": "Arial", "size": 40}})])
-    gauge_fig.update_layout(font={"family": "Arial"})
-    gauge_fig.write_image(filename)
+def create_gauge_figure(data, source: str, line_color: str) -> str:
+    """Returns a gauge of the source's sentiment score as an SVG document."""
+    return create_gauge_svg(data, f"{source} Sentiment", line_color)
 
 
 def choose_line_color(score: float) -> str:
@@ -155,112 +223,37 @@ def choose_line_color(score: float) -> str:
         return RED
 
 
-def create_most_popular_topics_bar_chart(data, file_name: str) -> None:    # pragma: no cover
-    """Creates a formatted horizontal bar chart saved as a .svg file."""
-    layout = go.Layout(
-        margin=go.layout.Margin(
-            l=0,  # left margin
-            r=0,  # right margin
-            b=0,  # bottom margin
-            t=0,  # top margin
-        )
-    )
-    y_list = list(data["keyword"])
-    x_list = list(data["total_count"])
-    horizontal_fig = go.Figure(layout=layout, data=[go.Bar(
-        x=x_list,
-        y=y_list,
-        orientation='h')])
-    horizontal_fig.update_layout(font={"family": "Arial", "size": 16})
-    horizontal_fig.write_image(file_name)
-
-
-def create_report(top: pd.DataFrame, bottom: pd.DataFrame, media_average_data: pd.DataFrame,
-                  count_of_topics: pd.DataFrame) -> str:  # pragma: no cover
-    """Creates the HTML template for the report, including all visualizations as
-    images within the HTML wrapper.
-    """
-
-    top_5_titles = top.head(3)["title"]
+def create_most_popular_topics_bar_chart(data: list[tuple[str, int]]) -> str:
+    """Returns a horizontal bar chart of the topic counts as an SVG document."""
+    return create_horizontal_bar_svg(data)
 
-    lowest_5_titles = bottom.tail(3)["title"]
 
-    stories_sources_average = media_average_data["average_media_sentiment"]
+def save_figure(file_name: str, create_figure: Callable[..., str], *args) -> float:
+    """Creates a figure and saves it as a .svg file, returning the seconds it took."""
+    start = perf_counter()
+    svg = create_figure(*args)
+    with open(file_name, "w", encoding="utf-8") as svg_file:
+        svg_file.write(svg)
+    render_time = perf_counter() - start
+    print(f"Rendered {file_name} in {render_time:.4f} seconds.")
+    return render_time
 
-    bbc_sentiment_score = stories_sources_average.iloc[0]
-    daily_mail_sentiment_score = stories_sources_average.iloc[1]
 
-    bbc_line_color = choose_line_color(bbc_sentiment_score)
-    daily_mail_line_color = choose_line_color(daily_mail_sentiment_score)
-
-    create_gauge_figure(
-        bbc_sentiment_score, "BBC", "/tmp/bbc_plot.svg", bbc_line_color)
-
-    create_gauge_figure(
-        daily_mail_sentiment_score, "Daily Mail", "/tmp/daily_mail_plot.svg", daily_mail_line_color)
-
-    create_most_popular_topics_bar_chart(
-        count_of_topics, "/tmp/most_popular_plot.svg")
-
-    template = f'''
-<html>
-<head>
-<style>
-    /* Define the CSS styles for your dashboard here */
-
-    html {{ -webkit-print-color-adjust: exact; }}
-
-    body{{
-    background-color: #292929;
-    font-family: Rockwell;
-    }}
-    
-    .widget {{
-        background-color: #fff;
-        padding: 2px;
-        border-radius: 2px;
-    }}
-
-    /* Add more styles as needed */
-</style>
-</head>
-<body style="background: #292929;">
-
-<div class="title-container">
-    <img src="media-sentiment-report-header.png" alt="Media Sentiment Report" class=title-container/>
-</div>
-
-<table border="0" style="width:100%;text-align:center">
-<tr>
-<td><img style="width: 260px; height: 160px" src = "/tmp/bbc_plot.svg" alt="BBC"/></td>
-<td><img style="width: 260px; height: 160px" src = "/tmp/daily_mail_plot.svg" alt="Daily Mail"/></td>
-</tr>
-</table>
-
-<h1 style='text-align:center;color:#fff;padding-top:10px;'>Most Popular Topics</h1>
-
-<div class="widget">
-    <img style="width:600px;height: 300px;text-align:center" src = "/tmp/most_popular_plot.svg" alt="Most Popular"/>
-</div>
-
-<h1 style='text-align:center;color:#88C180;padding-top:10px;'>Highest Sentiment Stories</h1>
-
-<div class="widget">
-    {get_titles(top_5_titles)}
-</div>
-
-<h1 style='text-align:center;color:#EA898B;padding-top:10px;'>Lowest Sentiment Stories</h1>
-
-<div class="widget">
-    {get_titles(lowest_5_titles)}
-</div>
+def create_report(snapshot: ReportSnapshot) -> str:  # pragma: no cover
+    """Creates the HTML template for the report, including all visualizations as
+    images within the HTML wrapper.
+    """
+    bbc_sentiment_score = snapshot.source_averages["bbc"]
+    daily_mail_sentiment_score = snapshot.source_averages["dailymail"]
 
-<!-- Add more widgets as needed -->
-</body>
-</html>
-'''
+    save_figure(BBC_PLOT_PATH, create_gauge_figure,
+                bbc_sentiment_score, "BBC", choose_line_color(bbc_sentiment_score))
+    save_figure(DAILY_MAIL_PLOT_PATH, create_gauge_figure,
+                daily_mail_sentiment_score, "Daily Mail", choose_line_color(daily_mail_sentiment_score))
+    save_figure(MOST_POPULAR_PLOT_PATH, create_most_popular_topics_bar_chart, snapshot.topic_counts)
 
-    return template
+    return REPORT_TEMPLATE.substitute(top_titles=get_titles(snapshot.top_titles),
+                                      bottom_titles=get_titles(snapshot.bottom_titles))
 
 
 def convert_html_to_pdf(html_template: str) -> bool:   # pragma: no cover
@@ -269,6 +262,7 @@ def convert_html_to_pdf(html_template: str) -> bool:   # pragma: no cover
     if not isinstance(html_template, str):
         raise ValueError("The HTML template should be provided as a string")
 
+    from xhtml2pdf import pisa  # pylint: disable=import-outside-toplevel
     with open(PDF_FILE_PATH, "w+b") as pdf:
         pisa_status = pisa.CreatePDF(html_template, dest=pdf)
 
@@ -286,8 +280,7 @@ def create_filename_for_s3_pdf() -> str:
 def upload_to_s3() -> None:   # pragma: no cover
     """Function that uploads the created pdf to an S3 bucket."""
     print("Establishing connection to AWS.")
-    s3_client = client("s3", aws_access_key_id=environ.get("ACCESS_KEY"),
-                       aws_secret_access_key=environ.get("SECRET_KEY"))
+    s3_client = get_aws_client("s3")
     print("Connection established.")
     file_name_with_date_and_time = create_filename_for_s3_pdf()
     print("Uploading .pdf file.")
@@ -322,8 +315,7 @@ def send_email(email_message: MIMEMultipart) -> None:  # pragma: no cover
     print("Sending email.")
     if not isinstance(email_message, MIMEMultipart):
         raise TypeError("Email message not supplied as expected.")
-    ses_client = client("ses", aws_access_key_id=environ.get("ACCESS_KEY"),
-                        aws_secret_access_key=environ.get("SECRET_KEY"))
+    ses_client = get_aws_client("ses")
     ses_client.send_raw_email(Source=environ.get("EMAIL_SENDER"),
                               Destinations=[environ.get("EMAIL_RECIPIENT")],
                               RawMessage={"Data": email_message.as_string()})
@@ -334,19 +326,12 @@ def handler(event, context):  # pragma: no cover
     """Lambda handler function."""
 
     load_dotenv()
-    db_conn = get_db_connection()
+    db_conn = get_warm_db_connection()
 
-    media_averages = get_media_averages(db_conn)
+    report_snapshot = get_report_snapshot(db_conn)
     print("joined_stories_works")
 
-    topic_counts = get_topic_counts(db_conn)
-
-    top_stories = get_top_stories(db_conn)
-
-    bottom_stories = get_bottom_stories(db_conn)
-
-    report_template = create_report(
-        top_stories, bottom_stories, media_averages, topic_counts)
+    report_template = create_report(report_snapshot)
     print("report_template_works")
 
     convert_html_to_pdf(report_template)
@@ -0,0 +1,134 @@
+"""Draws the report's gauge and horizontal bar charts as plain SVG, laid out like the
+Plotly charts they replace, without a plotting library or headless browser."""
+
+from functools import lru_cache
+from math import cos, floor, log10, pi, sin
+from xml.sax.saxutils import escape
+
+CHART_WIDTH = 700
+CHART_HEIGHT = 500
+FONT_FAMILY = "Arial"
+TEXT_COLOR = "#2a3f5f"
+GAUGE_CENTRE = (350, 440)
+GAUGE_OUTER_RADIUS = 290
+GAUGE_INNER_RADIUS = 160
+GAUGE_BAR_OUTER_RADIUS = 262
+GAUGE_BAR_INNER_RADIUS = 188
+GAUGE_RANGE = (-1, 1)
+GAUGE_TICKS = [-1, -0.5, 0, 0.5, 1]
+BAR_COLOR = "#636efa"
+PLOT_BACKGROUND = "#E5ECF6"
+GRID_COLOR = "white"
+BAR_FONT_SIZE = 16
+CHARACTER_WIDTH = 0.55
+BAR_GAP = 0.2
+TARGET_TICK_COUNT = 5
+
+
+def get_gauge_point(value: float, radius: float) -> tuple[float, float]:
+    """Returns the point at the radius on the gauge's semicircle for the value."""
+    low, high = GAUGE_RANGE
+    angle = pi * (1 - (value - low) / (high - low))
+    return (GAUGE_CENTRE[0] + radius * cos(angle), GAUGE_CENTRE[1] - radius * sin(angle))
+
+
+def create_arc_path(start: float, end: float, outer_radius: float, inner_radius: float) -> str:
+    """Returns the path of the band between the radii from the start to the end value."""
+    outer_start = get_gauge_point(start, outer_radius)
+    outer_end = get_gauge_point(end, outer_radius)
+    inner_end = get_gauge_point(end, inner_radius)
+    inner_start = get_gauge_point(start, inner_radius)
+    return (f"M {outer_start[0]:.2f} {outer_start[1]:.2f} "
+            f"A {outer_radius} {outer_radius} 0 0 1 {outer_end[0]:.2f} {outer_end[1]:.2f} "
+            f"L {inner_end[0]:.2f} {inner_end[1]:.2f} "
+            f"A {inner_radius} {inner_radius} 0 0 0 {inner_start[0]:.2f} {inner_start[1]:.2f} Z")
+
+
+def format_number(value: float) -> str:
+    """Returns the value with up to three significant figures and no trailing zeros."""
+    return f"{value:.3g}"
+
+
+def create_text(x: float, y: float, text: str, size: int, anchor: str = "middle") -> str:
+    """Returns an SVG text element in the chart font."""
+    return (f'<text x="{x:.2f}" y="{y:.2f}" font-family="{FONT_FAMILY}" font-size="{size}" '
+            f'fill="{TEXT_COLOR}" text-anchor="{anchor}">{escape(text)}</text>')
+
+
+def wrap_svg(elements: list[str]) -> str:
+    """Returns the elements in an SVG document the size of a chart."""
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{CHART_WIDTH}" height="{CHART_HEIGHT}" '
+            f'viewBox="0 0 {CHART_WIDTH} {CHART_HEIGHT}">'
+            f'<rect width="{CHART_WIDTH}" height="{CHART_HEIGHT}" fill="white"/>'
+            + "".join(elements) + "</svg>")
+
+
+@lru_cache(maxsize=None)
+def create_gauge_frame(title: str) -> str:
+    """Returns the parts of a gauge that do not depend on its value, built once per title."""
+    elements = [create_text(CHART_WIDTH / 2, 50, title, 40),
+                f'<path d="{create_arc_path(*GAUGE_RANGE, GAUGE_OUTER_RADIUS, GAUGE_INNER_RADIUS)}" '
+                f'fill="white" stroke="#444" stroke-width="1"/>']
+    for tick in GAUGE_TICKS:
+        tick_start = get_gauge_point(tick, GAUGE_OUTER_RADIUS)
+        tick_end = get_gauge_point(tick, GAUGE_OUTER_RADIUS + 8)
+        label = get_gauge_point(tick, GAUGE_OUTER_RADIUS + 30)
+        elements.append(f'<line x1="{tick_start[0]:.2f}" y1="{tick_start[1]:.2f}" '
+                        f'x2="{tick_end[0]:.2f}" y2="{tick_end[1]:.2f}" stroke="#444" stroke-width="1"/>')
+        elements.append(create_text(label[0], label[1] + 8, format_number(tick), 24))
+    return "".join(elements)
+
+
+def create_gauge_svg(value: float, title: str, bar_color: str) -> str:
+    """Returns a semicircular gauge from -1 to 1 filled up to the value."""
+    low, high = GAUGE_RANGE
+    bar_end = min(max(value, low), high)
+    elements = [create_gauge_frame(title)]
+    if bar_end > low:
+        elements.append(
+            f'<path d="{create_arc_path(low, bar_end, GAUGE_BAR_OUTER_RADIUS, GAUGE_BAR_INNER_RADIUS)}" '
+            f'fill="{bar_color}" stroke="white" stroke-width="3"/>')
+    elements.append(create_text(GAUGE_CENTRE[0], GAUGE_CENTRE[1] - 10, format_number(value), 80))
+    return wrap_svg(elements)
+
+
+def get_axis_ticks(maximum: float) -> list[float]:
+    """Returns evenly spaced round ticks from zero covering the maximum."""
+    if maximum <= 0:
+        return [0]
+    rough_step = maximum / TARGET_TICK_COUNT
+    magnitude = 10 ** floor(log10(rough_step))
+    step = next(multiple * magnitude for multiple in (1, 2, 5, 10)
+                if multiple * magnitude >= rough_step)
+    tick_count = int(maximum // step) + 1
+    return [step * index for index in range(tick_count + (maximum % step > 0))]
+
+
+def create_horizontal_bar_svg(data: list[tuple[str, int]]) -> str:
+    """Returns a horizontal bar chart of the (label, value) pairs, with the first pair
+    at the bottom, as Plotly draws categories."""
+    label_width = max((len(label) for label, _ in data), default=0) * BAR_FONT_SIZE * CHARACTER_WIDTH
+    plot_left = label_width + 10
+    plot_bottom = CHART_HEIGHT - BAR_FONT_SIZE - 12
+    plot_width = CHART_WIDTH - plot_left - 10
+    plot_height = plot_bottom - 10
+    ticks = get_axis_ticks(max((value for _, value in data), default=0))
+    scale = plot_width / ticks[-1] if ticks[-1] else 0
+
+    elements = [f'<rect x="{plot_left:.2f}" y="10" width="{plot_width:.2f}" '
+                f'height="{plot_height:.2f}" fill="{PLOT_BACKGROUND}"/>']
+    for tick in ticks:
+        x = plot_left + tick * scale
+        elements.append(f'<line x1="{x:.2f}" y1="10" x2="{x:.2f}" y2="{plot_bottom:.2f}" '
+                        f'stroke="{GRID_COLOR}" stroke-width="1"/>')
+        elements.append(create_text(x, CHART_HEIGHT - 8, format_number(tick), BAR_FONT_SIZE))
+
+    band_height = plot_height / len(data) if data else 0
+    for index, (label, value) in enumerate(data):
+        band_top = plot_bottom - (index + 1) * band_height
+        elements.append(f'<rect x="{plot_left:.2f}" y="{band_top + band_height * BAR_GAP / 2:.2f}" '
+                        f'width="{value * scale:.2f}" height="{band_height * (1 - BAR_GAP):.2f}" '
+                        f'fill="{BAR_COLOR}"/>')
+        elements.append(create_text(plot_left - 6, band_top + band_height / 2 + BAR_FONT_SIZE / 3,
+                                    label, BAR_FONT_SIZE, anchor="end"))
+    return wrap_svg(elements)
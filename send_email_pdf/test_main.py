@@ -4,10 +4,13 @@ Unit tests are designed to be run with pytest."""
 
 from unittest.mock import patch
 import re
+from pathlib import Path
+import subprocess
+import sys
 
 import pytest
 
-from main import convert_html_to_pdf, create_email_message, send_email, choose_line_color, get_titles, create_filename_for_s3_pdf
+from main import convert_html_to_pdf, create_email_message, send_email, choose_line_color, get_titles, create_filename_for_s3_pdf, create_report_snapshot, ReportSnapshot, REPORT_TEMPLATE
 
 
 def test_ensure_html_is_string():
@@ -79,3 +82,44 @@ def test_s3_filename_contains_correctly_formatted_datetime():
 
     assert re.match(r"\d{4}_\d{2}_\d{2}-\d{2}_\d{2}_\d{2}_unittest\.pdf", res)
     assert res.endswith("_unittest.pdf")
+
+
+def test_report_rows_sorted_into_snapshot():
+    """Checks each section of the report query rows is ordered in the snapshot."""
+    rows = [("topic", "Crime", 4, None), ("bottom", "Worst", -0.9, 1),
+            ("average", "dailymail", -0.2, None), ("top", "Second", 0.8, 2),
+            ("topic", "Politics", 9, None), ("average", "bbc", 0.1, None),
+            ("top", "Best", 0.9, 1), ("bottom", "Bad", -0.5, 2)]
+
+    res = create_report_snapshot(rows)
+
+    assert res == ReportSnapshot(source_averages={"bbc": 0.1, "dailymail": -0.2},
+                                 top_titles=["Best", "Second"],
+                                 bottom_titles=["Worst", "Bad"],
+                                 topic_counts=[("Crime", 4), ("Politics", 9)])
+    assert list(res.source_averages) == ["bbc", "dailymail"]
+
+
+def test_empty_report_rows_give_empty_snapshot():
+    """Checks no rows give an empty snapshot rather than an error."""
+    assert create_report_snapshot([]) == ReportSnapshot({}, [], [], [])
+
+
+def test_report_template_filled_with_titles():
+    """Checks the cached report template only needs the story titles filled in."""
+    res = REPORT_TEMPLATE.substitute(top_titles=get_titles(["Best $ story"]),
+                                     bottom_titles=get_titles(["Worst"]))
+
+    assert "<b>Best $ story</b>" in res
+    assert "<b>Worst</b>" in res
+    assert 'src = "/tmp/bbc_plot.svg"' in res
+
+
+def test_pdf_and_aws_packages_not_imported_with_handler():
+    """Checks xhtml2pdf and boto3 are only imported once the pdf is made or sent."""
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, main; print(sorted({'xhtml2pdf', 'boto3'} & set(sys.modules)))"],
+        cwd=Path(__file__).parent, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
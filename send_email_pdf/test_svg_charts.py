@@ -0,0 +1,68 @@
+"""Contains the unit tests for svg_charts.py.
+
+Unit tests are designed to be run with pytest."""
+
+from xml.etree import ElementTree
+
+import pytest
+
+from svg_charts import (create_gauge_svg, create_horizontal_bar_svg, get_axis_ticks,
+                        get_gauge_point, GAUGE_CENTRE)
+
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+
+
+def get_texts(svg: str) -> list[str]:
+    """Returns the text of every text element in the SVG document."""
+    return [text.text for text in ElementTree.fromstring(svg).iter(f"{SVG_NAMESPACE}text")]
+
+
+def test_gauge_is_well_formed_svg():
+    """Checks the gauge parses as an SVG document showing its title and value."""
+    svg = create_gauge_svg(0.25, "BBC Sentiment", "#199988")
+
+    root = ElementTree.fromstring(svg)
+
+    assert root.tag == f"{SVG_NAMESPACE}svg"
+    assert "BBC Sentiment" in get_texts(svg)
+    assert "0.25" in get_texts(svg)
+    assert 'fill="#199988"' in svg
+
+
+def test_gauge_bar_left_out_at_minimum():
+    """Checks no bar is drawn when the value is at the bottom of the range."""
+    assert 'fill="#e15759"' not in create_gauge_svg(-1, "Daily Mail Sentiment", "#e15759")
+
+
+@pytest.mark.parametrize("value,point", [(-1, (GAUGE_CENTRE[0] - 100, GAUGE_CENTRE[1])),
+                                         (0, (GAUGE_CENTRE[0], GAUGE_CENTRE[1] - 100)),
+                                         (1, (GAUGE_CENTRE[0] + 100, GAUGE_CENTRE[1]))])
+def test_gauge_points_follow_semicircle(value, point):
+    """Checks -1, 0 and 1 fall on the left, top and right of the gauge."""
+    assert get_gauge_point(value, 100) == pytest.approx(point)
+
+
+@pytest.mark.parametrize("maximum,ticks", [(9, [0, 2, 4, 6, 8, 10]),
+                                           (10, [0, 2, 4, 6, 8, 10]),
+                                           (37, [0, 10, 20, 30, 40]),
+                                           (0, [0])])
+def test_axis_ticks_cover_maximum(maximum, ticks):
+    """Checks the axis ticks are round numbers from zero to at least the maximum."""
+    assert get_axis_ticks(maximum) == ticks
+
+
+def test_bar_chart_draws_first_pair_at_bottom():
+    """Checks each pair gets a bar, with the first pair drawn lowest as in Plotly."""
+    svg = create_horizontal_bar_svg([("Crime", 4), ("Politics & Law", 9)])
+    bars = [rect for rect in ElementTree.fromstring(svg).iter(f"{SVG_NAMESPACE}rect")
+            if rect.get("fill") == "#636efa"]
+
+    assert len(bars) == 2
+    assert float(bars[0].get("y")) > float(bars[1].get("y"))
+    assert float(bars[0].get("width")) < float(bars[1].get("width"))
+    assert "Politics & Law" in get_texts(svg)
+
+
+def test_bar_chart_without_topics():
+    """Checks an empty chart is still a valid SVG document."""
+    assert ElementTree.fromstring(create_horizontal_bar_svg([])).tag == f"{SVG_NAMESPACE}svg"
@@ -4,6 +4,11 @@ DROP TABLE IF EXISTS story_keyword_link CASCADE;
 DROP TABLE IF EXISTS reddit_keyword_link CASCADE;
 DROP TABLE IF EXISTS keywords CASCADE;
 DROP TABLE IF EXISTS stories CASCADE;
+DROP TABLE IF EXISTS reddit_ingestion_state CASCADE;
+DROP TABLE IF EXISTS title_topics CASCADE;
+DROP TABLE IF EXISTS source_sentiment_hourly CASCADE;
+DROP TABLE IF EXISTS reddit_sentiment_hourly CASCADE;
+DROP TABLE IF EXISTS keyword_hourly_counts CASCADE;
 
 CREATE TABLE sources(
     source_id INT GENERATED ALWAYS AS IDENTITY,
@@ -46,6 +51,21 @@ CREATE TABLE reddit_article(
     PRIMARY KEY (re_article_id)
 );
 
+CREATE TABLE reddit_ingestion_state(
+    subreddit TEXT,
+    newest_fullname TEXT,
+    newest_created_utc DOUBLE PRECISION,
+    PRIMARY KEY (subreddit)
+);
+
+CREATE TABLE title_topics(
+    title_hash TEXT,
+    topic_one TEXT,
+    topic_two TEXT,
+    topic_three TEXT,
+    PRIMARY KEY (title_hash)
+);
+
 CREATE TABLE reddit_keyword_link(
     re_link_id INT GENERATED ALWAYS AS IDENTITY,
     keyword_id INT,
@@ -53,7 +73,7 @@ CREATE TABLE reddit_keyword_link(
     PRIMARY KEY (re_link_id),
     FOREIGN KEY (keyword_id) REFERENCES keywords(keyword_id),
     FOREIGN KEY (re_article_id) REFERENCES reddit_article(re_article_id),
-    ADD CONSTRAINT re_unique_id_pairs UNIQUE (keyword_id, re_article_id)
+    CONSTRAINT re_unique_id_pairs UNIQUE (keyword_id, re_article_id)
 );
 
 CREATE TABLE story_keyword_link(
@@ -63,9 +83,47 @@ CREATE TABLE story_keyword_link(
     PRIMARY KEY (link_id),
     FOREIGN KEY (keyword_id) REFERENCES keywords(keyword_id),
     FOREIGN KEY (story_id) REFERENCES stories(story_id),
-    ADD CONSTRAINT unique_id_pairs UNIQUE (keyword_id, story_id)
+    CONSTRAINT unique_id_pairs UNIQUE (keyword_id, story_id)
+);
+
+CREATE TABLE source_sentiment_hourly(
+    source_id SMALLINT,
+    hour_start TIMESTAMP,
+    sentiment_sum FLOAT,
+    sentiment_count INT,
+    sentiment_min FLOAT,
+    sentiment_max FLOAT,
+    PRIMARY KEY (source_id, hour_start),
+    FOREIGN KEY (source_id) REFERENCES sources(source_id)
 );
 
+CREATE TABLE reddit_sentiment_hourly(
+    re_domain TEXT,
+    hour_start TIMESTAMP,
+    sentiment_sum FLOAT,
+    sentiment_count INT,
+    sentiment_min FLOAT,
+    sentiment_max FLOAT,
+    PRIMARY KEY (re_domain, hour_start)
+);
+
+CREATE TABLE keyword_hourly_counts(
+    keyword_id INT,
+    hour_start TIMESTAMP,
+    story_count INT DEFAULT 0,
+    reddit_count INT DEFAULT 0,
+    PRIMARY KEY (keyword_id, hour_start),
+    FOREIGN KEY (keyword_id) REFERENCES keywords(keyword_id)
+);
+
+CREATE INDEX story_keyword_link_story_id_idx ON story_keyword_link (story_id);
+CREATE INDEX reddit_keyword_link_re_article_id_idx ON reddit_keyword_link (re_article_id);
+CREATE INDEX stories_pub_date_idx ON stories (pub_date) INCLUDE (media_sentiment, source_id, title);
+CREATE INDEX reddit_article_re_created_timestamp_idx ON reddit_article (re_created_timestamp);
+CREATE INDEX source_sentiment_hourly_hour_start_idx ON source_sentiment_hourly (hour_start);
+CREATE INDEX keyword_hourly_counts_hour_start_idx ON keyword_hourly_counts (hour_start);
+CREATE INDEX keywords_lower_keyword_idx ON keywords (lower(keyword));
+
 INSERT INTO sources (source_name) VALUES ('bbc');
 INSERT INTO sources (source_name) VALUES ('dailymail');
 
@@ -0,0 +1,60 @@
+"""Compares the stories parsed per second by the old regex and eval parser and the JSON parser."""
+
+import json
+import random
+import re
+import time
+
+from transform import parse_story_topics
+
+BENCHMARK_STORY_COUNT = 1000
+TOPICS = ["Politics", "Crime", "Law", "Football", "War", "Finance", "Climate", "Monarchy",
+          "Health", "Education", "Scandal", "Government", "Accident", "Shopping", "Weather"]
+
+
+def create_benchmark_topics(story_count: int = BENCHMARK_STORY_COUNT) -> dict[int, list[str]]:
+    """Returns three random topics for each of the story ids."""
+    random.seed(0)
+    return {story_id: random.sample(TOPICS, 3) for story_id in range(1, story_count + 1)}
+
+
+def make_response(content: str) -> dict:
+    """Returns a chat completions response with the given message content."""
+    return {'choices': [{'message': {'content': content}}]}
+
+
+def parse_with_regex_and_eval(response_list: dict) -> list[dict]:
+    """Parses the response the way the pipeline used to, with a regex and eval per story."""
+    valid_stories = []
+    all_stories_data = response_list['choices'][0]['message']['content']
+    for story in re.findall(r'\{(.*?)\}', all_stories_data):
+        try:
+            topic_split = story.split(':')
+            valid_stories.append({int(topic_split[0]): eval(topic_split[1])})
+        except:
+            continue
+    return valid_stories
+
+
+def time_stories_per_second(parsing_function, response: dict) -> float:
+    """Returns how many stories per second the parsing function processes."""
+    repeats = 20
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parsing_function(response)
+    return repeats * BENCHMARK_STORY_COUNT / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    benchmark_topics = create_benchmark_topics()
+    story_ids = list(benchmark_topics)
+    old_response = make_response(str([{story_id: topics}
+                                       for story_id, topics in benchmark_topics.items()]))
+    json_response = make_response(json.dumps(benchmark_topics))
+
+    before = time_stories_per_second(parse_with_regex_and_eval, old_response)
+    after = time_stories_per_second(lambda response: parse_story_topics(response, story_ids),
+                                    json_response)
+
+    print(f"Regex and eval: {before:,.0f} stories/sec")
+    print(f"JSON parser:    {after:,.0f} stories/sec ({after / before:.0f}x)")
@@ -0,0 +1,10 @@
+"""Fixtures for testing the tagging pipeline scripts"""
+
+import pytest
+
+
+@pytest.fixture
+def fake_stories_list():
+    """Returns enough untagged stories for several batches"""
+    return [{'story_id': story_id, 'title': f'Story number {story_id}'}
+            for story_id in range(1, 201)]
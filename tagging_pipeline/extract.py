@@ -1,9 +1,9 @@
 """Extracts media and reddit article titles from the RDS"""
 
 from os import environ
-from os.path import exists
-import json
+import time
 from datetime import datetime
+from typing import Iterator
 
 import requests
 
@@ -17,39 +17,56 @@ topic easier, for example, if Queen Elizabeth or Prince Harry are mentioned in t
 three output topics should be 'Monarchy', or an output topic may be 'Crime' if the story is about theft. 
 Good topics include but are not limited to: Monarchy, Relationships, Football, War, Shopping, Crime, Law, 
 Politics, Education, Scandal, Finance, Climate, Government, Accident.
-The output for each story MUST be in a Python dictionary format where the key corresponds to the INT 
-provided with the story and its paired value being a list of the topics (do not return the 
-title under any circumstances). Here's an example output for two stories: 
-"[{3: ['Weather', 'History', 'Technology']}, {4: ['Health', 'Science', 'Celebrity']}]", 
-output a list of dictionaries for these stories: """
+The output MUST be a single JSON object where each key is the INT provided with a story, as a string, 
+and its value is the list of the topics for that story (do not return the title under any circumstances). 
+Here's an example output for two stories: 
+{"3": ["Weather", "History", "Technology"], "4": ["Health", "Science", "Celebrity"]} 
+output the JSON object for these stories: """
 MAX_LIST_SIZE = 50
 CURRENT_TIMESTAMP = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-JSON_FILE = f'response.json'
+OPENAI_API_URL = 'https://api.openai.com/v1/chat/completions'
+OPENAI_TIMEOUT = 120
+MAX_OPENAI_RETRIES = 3
 
 
-def get_media_stories(conn) -> list | None:
-    """Queries RDS to return story title and id that do not have keywords linked to them"""
-    with conn.cursor() as cur:
-        cur.execute(
-            """SELECT stories.story_id, stories.title FROM stories LEFT JOIN story_keyword_link 
-            ON stories.story_id = story_keyword_link.story_id WHERE story_keyword_link.story_id 
-            IS NULL ORDER BY RANDOM();"""
-        )
-        stories = cur.fetchall()
-        return stories if stories else None
+def get_untagged_story_pages(conn, query: str, id: str, page_size: int = MAX_LIST_SIZE) -> Iterator[list]:
+    """Yields pages of untagged stories in id order, starting each page after the
+    last id of the previous one so no query sorts or returns the whole table"""
+    last_id = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(query, (last_id, page_size))
+            stories = cur.fetchall()
+        if not stories:
+            return
+        yield stories
+        last_id = stories[-1][id]
+        if len(stories) < page_size:
+            return
 
 
-def get_reddit_stories(conn) -> list | None:
-    """Queries RDS to return reddit story title and id that do not have keywords linked to them"""
-    with conn.cursor() as cur:
-        cur.execute(
-            """SELECT reddit_article.re_article_id, reddit_article.re_title FROM reddit_article 
-            LEFT JOIN reddit_keyword_link 
-            ON reddit_article.re_article_id = reddit_keyword_link.re_article_id WHERE 
-            reddit_keyword_link.re_article_id IS NULL ORDER BY RANDOM();"""
-        )
-        re_stories = cur.fetchall()
-        return re_stories if re_stories else None
+def get_media_stories(conn, page_size: int = MAX_LIST_SIZE) -> Iterator[list]:
+    """Yields pages of story title and id that do not have keywords linked to them"""
+    return get_untagged_story_pages(
+        conn,
+        """SELECT stories.story_id, stories.title FROM stories
+        WHERE stories.story_id > %s AND NOT EXISTS (
+            SELECT 1 FROM story_keyword_link
+            WHERE story_keyword_link.story_id = stories.story_id)
+        ORDER BY stories.story_id LIMIT %s;""",
+        'story_id', page_size)
+
+
+def get_reddit_stories(conn, page_size: int = MAX_LIST_SIZE) -> Iterator[list]:
+    """Yields pages of reddit story title and id that do not have keywords linked to them"""
+    return get_untagged_story_pages(
+        conn,
+        """SELECT reddit_article.re_article_id, reddit_article.re_title FROM reddit_article
+        WHERE reddit_article.re_article_id > %s AND NOT EXISTS (
+            SELECT 1 FROM reddit_keyword_link
+            WHERE reddit_keyword_link.re_article_id = reddit_article.re_article_id)
+        ORDER BY reddit_article.re_article_id LIMIT %s;""",
+        're_article_id', page_size)
 
 
 def separate_stories(stories_list: list) -> None:
@@ -63,9 +80,10 @@ def separate_stories(stories_list: list) -> None:
     yield twenty_stories if twenty_stories else None
 
 
-def make_openai_request(batch_stories_list: list[dict]) -> None:
-    """Makes POST request to openai to retrieve three general topics per story"""
-    openapi_url = 'https://api.openai.com/v1/chat/completions'
+def make_openai_request(batch_stories_list: list[dict], session: requests.Session | None = None,
+                        api_url: str | None = None) -> dict:
+    """Makes POST request to openai to retrieve three general topics per story,
+    retrying when the request is rate limited"""
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {environ['OPENAI_API_KEY']}"
@@ -73,23 +91,16 @@ def make_openai_request(batch_stories_list: list[dict]) -> None:
     payload = {
         "model": "gpt-3.5-turbo",
         "messages": [{"role": "user", "content": PROMPT + f"{batch_stories_list}"}],
-        "temperature": 0.1
+        "temperature": 0.1,
+        "response_format": {"type": "json_object"}
     }
-    response = requests.post(openapi_url, json=payload, headers=headers)
+    api_url = api_url or environ.get("OPENAI_API_URL", OPENAI_API_URL)
+    post = session.post if session is not None else requests.post
+    for attempt in range(MAX_OPENAI_RETRIES + 1):
+        response = post(api_url, json=payload, headers=headers, timeout=OPENAI_TIMEOUT)
+        if response.status_code != 429 or attempt == MAX_OPENAI_RETRIES:
+            break
+        time.sleep(float(response.headers.get("Retry-After", 2 ** attempt)))
     if response.status_code == 200:
         return response.json()
-    else:
-        raise ConnectionError("Unable to make request", response.status_code)
-
-
-def read_response_json(table: str):
-    """Extracts openai response data from json file"""
-    with open(f"{table}-{JSON_FILE}", 'r') as f:
-        existing_response = json.load(f)
-    return existing_response
-
-
-def create_response_json(openai_response: dict, table: str) -> None:
-    """Stores openai response in a json file"""
-    with open(f"{table}-{JSON_FILE}", 'w') as f:
-        json.dump(openai_response, f, indent=4)
+    raise ConnectionError("Unable to make request", response.status_code)
@@ -0,0 +1,51 @@
+"""Keeps the keyword_id of every keyword in memory so tagging batches rarely query the keywords table"""
+
+
+def normalise_keyword(keyword: str) -> str:
+    """Returns the keyword with surrounding and repeated whitespace removed"""
+    return " ".join(str(keyword).split())
+
+
+def get_keyword_key(keyword: str) -> str:
+    """Returns the key a keyword is stored under, ignoring case and whitespace"""
+    return normalise_keyword(keyword).casefold()
+
+
+class KeywordCache:
+    """Maps normalised keywords to their keyword_id, counting cache hits and misses"""
+
+    def __init__(self):
+        self._keyword_ids = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._keyword_ids)
+
+    def warm(self, conn) -> None:
+        """Loads every keyword already in the keywords table, keeping the oldest
+        row when keywords only differ by case or whitespace"""
+        with conn.cursor() as cur:
+            cur.execute("""SELECT keyword_id, keyword FROM keywords ORDER BY keyword_id;""")
+            for row in cur.fetchall():
+                self._keyword_ids.setdefault(get_keyword_key(row['keyword']), row['keyword_id'])
+
+    def get(self, keyword: str) -> int | None:
+        """Returns the keyword_id of the keyword, or None if it is not cached"""
+        keyword_id = self._keyword_ids.get(get_keyword_key(keyword))
+        if keyword_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return keyword_id
+
+    def update(self, keyword_ids: dict[str, int]) -> None:
+        """Caches keyword ids that were committed to the keywords table"""
+        for keyword, keyword_id in keyword_ids.items():
+            self._keyword_ids.setdefault(get_keyword_key(keyword), keyword_id)
+
+    def get_stats(self) -> dict:
+        """Returns the number of cached keywords and how often lookups hit the cache"""
+        lookups = self.hits + self.misses
+        return {"keywords": len(self), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -7,33 +7,40 @@ from datetime import datetime
 
 import pandas as pd
 import psycopg2
+from psycopg2 import extras
 
-CURRENT_TIMESTAMP = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-CSV_FILE = '.csv'
-
-
-def create_keywords_df(table: str) -> pd.DataFrame:
-    """Returns most recent csv file in topics folder"""
-    topics_df = pd.read_csv(f"{table}{CSV_FILE}")
-    return topics_df
+from keyword_cache import KeywordCache, normalise_keyword, get_keyword_key
 
-
-def populate_keywords_table(conn: psycopg2.extensions.connection, keyword: str) -> dict | None:
-    """Inserts keywords into the keywords table of the RDS"""
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """INSERT INTO keywords (keyword) VALUES (%s) RETURNING keyword_id;""", [keyword])
-            keyword_id = cur.fetchone()
-        if keyword_id:
-            conn.commit()
-            return keyword_id
-        return None
-
-    except psycopg2.errors.UniqueViolation:
-        print('Duplicate data was not inserted:', keyword)
-        conn.rollback()
-        return None
+CURRENT_TIMESTAMP = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+TOPIC_COLUMNS = ['topic_one', 'topic_two', 'topic_three']
+LINK_TABLE_QUERIES = {
+    'story_id': """WITH links AS (
+                       INSERT INTO story_keyword_link (story_id, keyword_id) VALUES %s
+                       ON CONFLICT DO NOTHING RETURNING story_id, keyword_id
+                   ), hourly_counts AS (
+                       INSERT INTO keyword_hourly_counts (keyword_id, hour_start, story_count)
+                       SELECT links.keyword_id, date_trunc('hour', stories.pub_date), COUNT(*)
+                       FROM links JOIN stories ON stories.story_id = links.story_id
+                       WHERE stories.pub_date IS NOT NULL
+                       GROUP BY links.keyword_id, date_trunc('hour', stories.pub_date)
+                       ON CONFLICT (keyword_id, hour_start) DO UPDATE
+                       SET story_count = keyword_hourly_counts.story_count + EXCLUDED.story_count
+                   )
+                   SELECT COUNT(*) AS link_count FROM links;""",
+    're_article_id': """WITH links AS (
+                            INSERT INTO reddit_keyword_link (re_article_id, keyword_id) VALUES %s
+                            ON CONFLICT DO NOTHING RETURNING re_article_id, keyword_id
+                        ), hourly_counts AS (
+                            INSERT INTO keyword_hourly_counts (keyword_id, hour_start, reddit_count)
+                            SELECT links.keyword_id, date_trunc('hour', ra.re_created_timestamp), COUNT(*)
+                            FROM links JOIN reddit_article ra ON ra.re_article_id = links.re_article_id
+                            WHERE ra.re_created_timestamp IS NOT NULL
+                            GROUP BY links.keyword_id, date_trunc('hour', ra.re_created_timestamp)
+                            ON CONFLICT (keyword_id, hour_start) DO UPDATE
+                            SET reddit_count = keyword_hourly_counts.reddit_count + EXCLUDED.reddit_count
+                        )
+                        SELECT COUNT(*) AS link_count FROM links;"""
+}
 
 
 def get_media_common_keywords(conn) -> list:
@@ -61,78 +68,114 @@ def get_reddit_common_keywords(conn) -> list:
     return common_keywords
 
 
-def get_keyword_id(conn, keyword: str) -> int | None:
-    """Queries RDS to retrieve keyword_id for the associated keyword else inserts 
-    keyword into RDS"""
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """SELECT keyword_id FROM keywords WHERE keyword = (%s);""", [keyword])
-            keyword_id = cur.fetchone()
-        if not keyword_id:
-            keyword_id = populate_keywords_table(conn, keyword)
-        return keyword_id['keyword_id']
-
-    except psycopg2.DatabaseError:
-        print('Error retrieving keyword id from database', keyword)
-        return None
-
-
-def populate_media_keywords_link_table(conn, story_id: int, keyword_id: int) -> None:
-    """Inserts story id and keyword id into the story_keywords_link_table to 
-    link stories to keywords"""
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""INSERT INTO story_keyword_link (story_id,keyword_id)
-                         VALUES (%s,%s);""", [
-                        story_id, keyword_id])
-            conn.commit()
-    except psycopg2.errors.UniqueViolation:
-        print('Duplicate data was not inserted:', story_id, keyword_id)
-        conn.rollback()
+def get_batch_keywords(keywords_df: pd.DataFrame) -> list[str]:
+    """Returns the distinct topics found across every row of the dataframe,
+    ignoring differences in case and whitespace"""
+    topics = keywords_df[TOPIC_COLUMNS].to_numpy().ravel()
+    keywords = {}
+    for topic in topics:
+        if pd.notna(topic) and normalise_keyword(topic):
+            keywords.setdefault(get_keyword_key(topic), normalise_keyword(topic))
+    return list(keywords.values())
+
+
+def get_keyword_ids(conn, keywords: list[str], cache: KeywordCache | None = None) -> dict[str, int]:
+    """Returns the keyword_id of every keyword keyed by its normalised key, only
+    querying the database for keywords missing from the cache. Keywords are matched
+    without regard to case, using the oldest row when several only differ by case.
+    New keywords are inserted without committing the transaction"""
+    keyword_ids = {}
+    missing_keywords = []
+    for keyword in keywords:
+        keyword_id = cache.get(keyword) if cache is not None else None
+        if keyword_id is None:
+            missing_keywords.append(keyword)
+        else:
+            keyword_ids[get_keyword_key(keyword)] = keyword_id
+    if not missing_keywords:
+        return keyword_ids
 
-
-def populate_reddit_link_table(conn, story_id: int, keyword_id: int) -> None:
-    """Inserts story id and keyword id into the story_keywords_link_table to link 
-    stories to keywords"""
+    with conn.cursor() as cur:
+        cur.execute("""SELECT DISTINCT ON (lower(keyword)) keyword_id, keyword FROM keywords
+                       WHERE lower(keyword) = ANY(%s) ORDER BY lower(keyword), keyword_id;""",
+                    [[keyword.lower() for keyword in missing_keywords]])
+        found_keyword_ids = {get_keyword_key(row['keyword']): row['keyword_id']
+                             for row in cur.fetchall()}
+
+        new_keywords = [keyword for keyword in missing_keywords
+                        if get_keyword_key(keyword) not in found_keyword_ids]
+        if new_keywords:
+            inserted = extras.execute_values(
+                cur, """INSERT INTO keywords (keyword) VALUES %s
+                        ON CONFLICT (keyword) DO NOTHING RETURNING keyword_id, keyword;""",
+                [(keyword,) for keyword in new_keywords], page_size=len(new_keywords), fetch=True)
+            found_keyword_ids.update({get_keyword_key(row['keyword']): row['keyword_id']
+                                      for row in inserted})
+
+        # Keywords inserted by another load since the lookup are not returned by the insert
+        conflicting_keywords = [keyword for keyword in new_keywords
+                                if get_keyword_key(keyword) not in found_keyword_ids]
+        if conflicting_keywords:
+            cur.execute("""SELECT keyword_id, keyword FROM keywords WHERE keyword = ANY(%s);""",
+                        [conflicting_keywords])
+            found_keyword_ids.update({get_keyword_key(row['keyword']): row['keyword_id']
+                                      for row in cur.fetchall()})
+
+    keyword_ids.update(found_keyword_ids)
+    return keyword_ids
+
+
+def get_keyword_id(conn, keyword: str, cache: KeywordCache | None = None) -> int | None:
+    """Returns the keyword_id for the keyword, inserting the keyword if it is new"""
+    return get_keyword_ids(conn, [normalise_keyword(keyword)], cache).get(get_keyword_key(keyword))
+
+
+def create_link_rows(keywords_df: pd.DataFrame, id_column: str,
+                     keyword_ids: dict[str, int]) -> list[tuple[int, int]]:
+    """Returns the distinct (story id, keyword id) pairs for every topic in the dataframe"""
+    link_rows = {}
+    for story_id, *topics in keywords_df[[id_column] + TOPIC_COLUMNS].itertuples(index=False):
+        for topic in topics:
+            keyword_id = keyword_ids.get(get_keyword_key(topic)) if pd.notna(topic) else None
+            if keyword_id is not None:
+                link_rows[(int(story_id), keyword_id)] = None
+    return list(link_rows)
+
+
+def load_keywords_df_into_rds(conn, keywords_df: pd.DataFrame, id_column: str,
+                              cache: KeywordCache | None = None) -> int:
+    """Loads the topics of every story in the dataframe into the keywords table and
+    the link table for the id column in one transaction, adding each new link to the
+    hourly keyword counts. Returns the number of links inserted"""
+    keywords = get_batch_keywords(keywords_df)
+    if not keywords:
+        return 0
     try:
+        keyword_ids = get_keyword_ids(conn, keywords, cache)
+        link_rows = create_link_rows(keywords_df, id_column, keyword_ids)
         with conn.cursor() as cur:
-            cur.execute("""INSERT INTO reddit_keyword_link (re_article_id,keyword_id)
-                         VALUES (%s,%s);""", [
-                        story_id, keyword_id])
-            conn.commit()
-    except psycopg2.errors.UniqueViolation:
-        print('Duplicate data was not inserted:', story_id, keyword_id)
+            results = extras.execute_values(cur, LINK_TABLE_QUERIES[id_column],
+                                            link_rows, page_size=len(link_rows), fetch=True)
+        inserted_count = results[0]['link_count'] if results else 0
+        conn.commit()
+    except psycopg2.DatabaseError:
+        print('Error loading keywords into database, the batch was rolled back')
         conn.rollback()
+        raise
+    if cache is not None:
+        cache.update(keyword_ids)
+    return inserted_count
 
 
-def load_media_keywords_df_into_rds(conn, keywords_df: pd.DataFrame) -> None:
+def load_media_keywords_df_into_rds(conn, keywords_df: pd.DataFrame,
+                                    cache: KeywordCache | None = None) -> None:
     """Loads each row of the dataframe, containing story id and associated 
     topics into the RDS"""
-    for index, row in keywords_df.iterrows():
-        story_id = row['story_id']
-        keyword_one = get_keyword_id(conn, row['topic_one'])
-        keyword_two = get_keyword_id(conn, row['topic_two'])
-        keyword_three = get_keyword_id(conn, row['topic_three'])
-        if keyword_one:
-            populate_media_keywords_link_table(conn, story_id, keyword_one)
-        if keyword_two:
-            populate_media_keywords_link_table(conn, story_id, keyword_two)
-        if keyword_three:
-            populate_media_keywords_link_table(conn, story_id, keyword_three)
-
-
-def load_reddit_keywords_df_into_rds(conn, keywords_df: pd.DataFrame) -> None:
+    load_keywords_df_into_rds(conn, keywords_df, 'story_id', cache)
+
+
+def load_reddit_keywords_df_into_rds(conn, keywords_df: pd.DataFrame,
+                                     cache: KeywordCache | None = None) -> None:
     """Loads each row of the dataframe, containing story id and associated 
     topics into the RDS"""
-    for index, row in keywords_df.iterrows():
-        article_id = row['re_article_id']
-        keyword_one = get_keyword_id(conn, row['topic_one'])
-        keyword_two = get_keyword_id(conn, row['topic_two'])
-        keyword_three = get_keyword_id(conn, row['topic_three'])
-        if keyword_one:
-            populate_reddit_link_table(conn, article_id, keyword_one)
-        if keyword_two:
-            populate_reddit_link_table(conn, article_id, keyword_two)
-        if keyword_three:
-            populate_reddit_link_table(conn, article_id, keyword_three)
+    load_keywords_df_into_rds(conn, keywords_df, 're_article_id', cache)
@@ -5,15 +5,21 @@
 
 from os import environ
 import time
+from typing import Callable
 
-import pandas as pd
 from dotenv import load_dotenv
+import pandas as pd
 import psycopg2
-from psycopg2 import extras
+import psycopg2.extras
+
+from extract import MAX_LIST_SIZE, get_media_stories, get_reddit_stories
+from load import load_media_keywords_df_into_rds, load_reddit_keywords_df_into_rds
+from tagger import MAX_IN_FLIGHT_REQUESTS, tag_stories
+from keyword_cache import KeywordCache
+from topic_cache import (group_stories_by_title, get_cached_topics, create_cached_topic_df,
+                         add_duplicate_story_topics, save_title_topics)
 
-from extract import get_media_stories, separate_stories, make_openai_request, create_response_json, read_response_json, get_reddit_stories
-from transform import get_story_topics, create_topic_csv
-from load import create_keywords_df, load_media_keywords_df_into_rds, load_reddit_keywords_df_into_rds
+STORY_PAGE_SIZE = MAX_LIST_SIZE * MAX_IN_FLIGHT_REQUESTS
 
 
 def database_connection() -> psycopg2.extensions.connection | None:
@@ -29,45 +35,52 @@ def database_connection() -> psycopg2.extensions.connection | None:
         raise psycopg2.DatabaseError("Error connecting to database.") from exc
 
 
-def create_batch_json(start: float, stories_list: list, table: str, id: str) -> None:
-    """Creates JSON files for responses made to openai """
-    print("Starting pipeline...")
-    for batch_stories_list in separate_stories(stories_list):
-
-        print(
-            f"OpenAI request made for {len(batch_stories_list)} {table} stories in {time.time()-start:.2f} seconds")
-        openai_response = make_openai_request(batch_stories_list)
-        create_response_json(openai_response, table)
-        media_responses = read_response_json(table)
-        valid_stories = get_story_topics(media_responses)
-        create_topic_csv(valid_stories, table, id)
-        print(
-            f"Created {table} CSV file for {len(valid_stories)} stories in {time.time()-start:.2f} seconds")
-        keywords_df = create_keywords_df(table)
-        if table == 'public':
-            load_media_keywords_df_into_rds(connection, keywords_df)
-        elif table == 'reddit':
-            load_reddit_keywords_df_into_rds(connection, keywords_df)
-        print(
-            f"Keywords loaded for {table} stories in {time.time()-start:.2f} seconds")
+def tag_and_load_stories(conn, stories_list: list, id: str, title_key: str,
+                         load_keywords_df: Callable[[pd.DataFrame], None]) -> int:
+    """Loads topics for the stories, copying them from stories with the same title
+    where possible and only sending one story per new title to openai.
+    Returns the number of stories tagged by openai"""
+    story_groups = group_stories_by_title(stories_list, title_key)
+    cached_topics = get_cached_topics(conn, list(story_groups))
+    cached_topics_df = create_cached_topic_df(story_groups, cached_topics, id)
+    if not cached_topics_df.empty:
+        load_keywords_df(cached_topics_df)
+    print(f"Copied topics for {len(cached_topics_df)} stories with previously tagged titles")
+
+    new_stories = [{id: stories[0][id], 'title': stories[0][title_key]}
+                   for title_hash, stories in story_groups.items() if title_hash not in cached_topics]
+    title_hashes = {stories[0][id]: title_hash for title_hash, stories in story_groups.items()}
+
+    def load_new_topics(topics_df: pd.DataFrame) -> None:
+        load_keywords_df(add_duplicate_story_topics(topics_df, story_groups, id))
+        save_title_topics(conn, topics_df, title_hashes, id)
+
+    return tag_stories(new_stories, id, load_new_topics)
 
 
 def run_public_and_media_scripts(conn) -> None:
     """Run script to populate tables associated with public and media keywords"""
     start = time.time()
-    reddit_stories_list = get_reddit_stories(conn)
-    media_stories_list = get_media_stories(conn)
-    if reddit_stories_list:
-        create_batch_json(start, reddit_stories_list,
-                          'reddit', 're_article_id')
-    if media_stories_list:
-        create_batch_json(start, media_stories_list, 'public', 'story_id')
+    keyword_cache = KeywordCache()
+    keyword_cache.warm(conn)
+    print(f"Cached {len(keyword_cache)} keywords in {time.time()-start:.2f} seconds")
+    tagged_count = 0
+    for reddit_stories_list in get_reddit_stories(conn, STORY_PAGE_SIZE):
+        tagged_count += tag_and_load_stories(conn, reddit_stories_list, 're_article_id', 're_title',
+                                             lambda keywords_df: load_reddit_keywords_df_into_rds(
+                                                 conn, keywords_df, keyword_cache))
+    print(f"OpenAI tagged {tagged_count} reddit stories in {time.time()-start:.2f} seconds")
+    tagged_count = 0
+    for media_stories_list in get_media_stories(conn, STORY_PAGE_SIZE):
+        tagged_count += tag_and_load_stories(conn, media_stories_list, 'story_id', 'title',
+                                             lambda keywords_df: load_media_keywords_df_into_rds(
+                                                 conn, keywords_df, keyword_cache))
+    print(f"OpenAI tagged {tagged_count} public stories in {time.time()-start:.2f} seconds")
+    print(f"Keyword cache: {keyword_cache.get_stats()}")
 
 
 if __name__ == "__main__":
     load_dotenv()
-    response_df = pd.DataFrame(
-        columns=['story_id', 'topic_one', 'topic_two', 'topic_three'])
     connection = database_connection()
     run_public_and_media_scripts(connection)
     connection.close()
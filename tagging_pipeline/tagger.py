@@ -0,0 +1,129 @@
+"""Tags batches of stories with concurrent openai requests, passing the topics to the loader through a queue"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+from queue import Queue
+from threading import Lock
+import time
+from typing import Callable
+
+import pandas as pd
+import requests
+from requests.exceptions import RequestException
+
+from extract import PROMPT, separate_stories, make_openai_request
+from transform import parse_story_topics, create_topic_df
+
+MAX_IN_FLIGHT_REQUESTS = int(environ.get("OPENAI_MAX_IN_FLIGHT", 4))
+TOKENS_PER_MINUTE = int(environ.get("OPENAI_TOKENS_PER_MINUTE", 60000))
+CHARACTERS_PER_TOKEN = 4
+COMPLETION_TOKENS_PER_STORY = 20
+RATE_LIMIT_WINDOW_SECONDS = 60
+MAX_TAGGING_ROUNDS = 2
+
+
+def estimate_request_tokens(batch_stories_list: list[dict]) -> int:
+    """Returns a rough estimate of the prompt and completion tokens used to tag a batch"""
+    prompt_tokens = (len(PROMPT) + len(str(batch_stories_list))) // CHARACTERS_PER_TOKEN
+    return prompt_tokens + COMPLETION_TOKENS_PER_STORY * len(batch_stories_list)
+
+
+class TokenRateLimiter:
+    """Keeps the tokens sent over the last minute under a token-per-minute budget"""
+
+    def __init__(self, tokens_per_minute: int = TOKENS_PER_MINUTE,
+                 window_seconds: float = RATE_LIMIT_WINDOW_SECONDS):
+        self.tokens_per_minute = tokens_per_minute
+        self.window_seconds = window_seconds
+        self._sent = deque()
+        self._lock = Lock()
+
+    def _get_tokens_in_window(self, now: float) -> int:
+        while self._sent and now - self._sent[0][0] >= self.window_seconds:
+            self._sent.popleft()
+        return sum(tokens for _, tokens in self._sent)
+
+    def acquire(self, tokens: int) -> None:
+        """Blocks until the tokens can be sent without going over the budget"""
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._get_tokens_in_window(now) + tokens <= self.tokens_per_minute:
+                    self._sent.append((now, tokens))
+                    return
+                wait = self.window_seconds - (now - self._sent[0][0])
+            time.sleep(max(wait, 0.01))
+
+
+def tag_batch(batch_stories_list: list[dict], id: str, session: requests.Session,
+              rate_limiter: TokenRateLimiter) -> tuple[pd.DataFrame | None, list[dict]]:
+    """Returns a dataframe of the topics for a batch of stories, or None if the request
+    fails, and the stories that were missing or malformed in the response"""
+    rate_limiter.acquire(estimate_request_tokens(batch_stories_list))
+    try:
+        openai_response = make_openai_request(batch_stories_list, session)
+    except (ConnectionError, RequestException) as exc:
+        print(f"OpenAI request failed for {len(batch_stories_list)} stories: {exc}")
+        return None, []
+    valid_stories, dropped_ids = parse_story_topics(
+        openai_response, [story[id] for story in batch_stories_list])
+    dropped_ids = set(dropped_ids)
+    return (create_topic_df(valid_stories, id),
+            [story for story in batch_stories_list if story[id] in dropped_ids])
+
+
+def tag_stories(stories_list: list, id: str, load_keywords: Callable[[pd.DataFrame], None],
+                max_in_flight: int = MAX_IN_FLIGHT_REQUESTS,
+                rate_limiter: TokenRateLimiter | None = None,
+                max_rounds: int = MAX_TAGGING_ROUNDS) -> int:
+    """Tags the stories in batches with up to max_in_flight requests at once.
+
+    Topics are loaded on the calling thread as each batch is tagged, so the
+    database connection is never shared between threads. Stories missing from
+    a response are sent again in the next round, up to max_rounds.
+    Returns the number of stories that were tagged."""
+    rate_limiter = rate_limiter or TokenRateLimiter()
+    tagged_count = 0
+    with requests.Session() as session:
+        for _ in range(max_rounds):
+            batches = [batch for batch in separate_stories(stories_list) if batch]
+            if not batches:
+                break
+            round_tagged_count, stories_list = tag_batches(
+                batches, id, load_keywords, session, max_in_flight, rate_limiter)
+            tagged_count += round_tagged_count
+    if stories_list:
+        print(f"{len(stories_list)} stories were still untagged after {max_rounds} rounds")
+    return tagged_count
+
+
+def tag_batches(batches: list[list[dict]], id: str, load_keywords: Callable[[pd.DataFrame], None],
+                session: requests.Session, max_in_flight: int,
+                rate_limiter: TokenRateLimiter) -> tuple[int, list[dict]]:
+    """Tags the batches concurrently, loading each as it arrives through a queue.
+    Returns the number of stories tagged and the stories to retry"""
+    topic_queue = Queue()
+
+    def tag_and_queue_batch(batch_stories_list: list[dict]) -> None:
+        result = (None, [])
+        try:
+            result = tag_batch(batch_stories_list, id, session, rate_limiter)
+        finally:
+            topic_queue.put(result)
+
+    tagged_count = 0
+    retry_stories = []
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = [executor.submit(tag_and_queue_batch, batch_stories_list)
+                   for batch_stories_list in batches]
+        for _ in batches:
+            topics_df, dropped_stories = topic_queue.get()
+            retry_stories.extend(dropped_stories)
+            if topics_df is not None and not topics_df.empty:
+                load_keywords(topics_df)
+                tagged_count += len(topics_df)
+        for future in futures:
+            future.result()
+    return tagged_count, retry_stories
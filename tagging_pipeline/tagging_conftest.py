@@ -0,0 +1,70 @@
+"""Fake chat completions server for the tests of the tagging pipeline scripts, imported
+by the tests that use it"""
+
+# pylint: skip-file
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+from threading import Lock, Thread
+import time
+
+import pytest
+
+
+class FakeCompletionsHandler(BaseHTTPRequestHandler):
+    """Imitates the openai chat completions endpoint, tagging every story in a
+    request with the same three topics and recording how many requests overlap.
+    Stories in drop_once are left out of the first response they are requested in"""
+    lock = Lock()
+    drop_once = set()
+    in_flight = 0
+    max_in_flight = 0
+    request_count = 0
+    response_delay = 0.05
+
+    def do_POST(self):
+        with FakeCompletionsHandler.lock:
+            FakeCompletionsHandler.request_count += 1
+            FakeCompletionsHandler.in_flight += 1
+            FakeCompletionsHandler.max_in_flight = max(FakeCompletionsHandler.max_in_flight,
+                                                       FakeCompletionsHandler.in_flight)
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(FakeCompletionsHandler.response_delay)
+
+        story_ids = re.findall(r"_id': (\d+)", payload['messages'][0]['content'])
+        with FakeCompletionsHandler.lock:
+            dropped_ids = FakeCompletionsHandler.drop_once & set(story_ids)
+            FakeCompletionsHandler.drop_once -= dropped_ids
+        content = json.dumps({story_id: ['Politics', 'Crime', 'Law']
+                              for story_id in story_ids if story_id not in dropped_ids})
+        body = json.dumps({'choices': [{'message': {'content': content}}]}).encode()
+        with FakeCompletionsHandler.lock:
+            FakeCompletionsHandler.in_flight -= 1
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_completions_server(monkeypatch):
+    """Runs a local fake chat completions server, returns its url"""
+    FakeCompletionsHandler.in_flight = 0
+    FakeCompletionsHandler.max_in_flight = 0
+    FakeCompletionsHandler.request_count = 0
+    FakeCompletionsHandler.drop_once = set()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCompletionsHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{server.server_port}/v1/chat/completions'
+    monkeypatch.setenv('OPENAI_API_URL', url)
+    monkeypatch.setenv('OPENAI_API_KEY', 'fake-key')
+    yield url
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,56 @@
+"""Contains the unit tests for extract.py"""
+
+# pylint: skip-file
+
+from unittest.mock import MagicMock
+
+from extract import get_media_stories
+
+
+def make_fake_conn(story_ids: list[int]) -> MagicMock:
+    """Returns a connection whose queries return the next page of untagged stories after the given id"""
+    fake_conn = MagicMock()
+    fake_cur = fake_conn.cursor.return_value.__enter__.return_value
+    pages = []
+
+    def execute(query, params):
+        last_id, page_size = params
+        pages.append([{'story_id': story_id, 'title': f'Story {story_id}'}
+                      for story_id in story_ids if story_id > last_id][:page_size])
+
+    fake_cur.execute.side_effect = execute
+    fake_cur.fetchall.side_effect = lambda: pages[-1]
+    return fake_conn
+
+
+def test_stories_paged_after_last_id():
+    """Checks each page starts after the last id of the previous page"""
+    fake_conn = make_fake_conn([2, 3, 5, 8, 13])
+
+    pages = list(get_media_stories(fake_conn, page_size=2))
+
+    assert [[story['story_id'] for story in page] for page in pages] == [[2, 3], [5, 8], [13]]
+    fake_cur = fake_conn.cursor.return_value.__enter__.return_value
+    assert [call.args[1] for call in fake_cur.execute.call_args_list] == [(0, 2), (3, 2), (8, 2)]
+
+
+def test_full_last_page_checks_for_more():
+    """Checks a full final page is followed by one empty query and nothing else"""
+    fake_conn = make_fake_conn([1, 2, 3, 4])
+
+    assert len(list(get_media_stories(fake_conn, page_size=2))) == 2
+    assert fake_conn.cursor.return_value.__enter__.return_value.execute.call_count == 3
+
+
+def test_no_untagged_stories():
+    """Checks nothing is yielded when every story is tagged"""
+    assert list(get_media_stories(make_fake_conn([]))) == []
+
+
+def test_query_avoids_random_sort():
+    """Checks the query uses an anti-join with keyset pagination rather than a random sort"""
+    fake_conn = make_fake_conn([1])
+    list(get_media_stories(fake_conn))
+
+    query = fake_conn.cursor.return_value.__enter__.return_value.execute.call_args.args[0]
+    assert 'NOT EXISTS' in query and 'RANDOM()' not in query
@@ -0,0 +1,78 @@
+"""Contains the unit tests for keyword_cache.py"""
+
+# pylint: skip-file
+
+from unittest.mock import MagicMock
+
+from keyword_cache import KeywordCache, normalise_keyword, get_keyword_key
+
+
+def make_fake_conn(rows: list[dict]) -> MagicMock:
+    """Returns a connection whose keywords query returns the rows"""
+    fake_conn = MagicMock()
+    fake_conn.cursor.return_value.__enter__.return_value.fetchall.return_value = rows
+    return fake_conn
+
+
+def test_normalise_keyword_collapses_whitespace():
+    """Checks surrounding and repeated whitespace is removed but case is kept"""
+    assert normalise_keyword("  Climate   Change ") == "Climate Change"
+
+
+def test_keyword_key_ignores_case_and_whitespace():
+    """Checks keywords only differing by case or whitespace share a key"""
+    assert get_keyword_key(" POLITICS ") == get_keyword_key("politics") == "politics"
+    assert get_keyword_key("Climate  change") == get_keyword_key("climate Change")
+
+
+def test_warm_keeps_oldest_keyword_for_each_key():
+    """Checks every stored keyword is cached, keeping the oldest row of keywords differing by case"""
+    cache = KeywordCache()
+
+    cache.warm(make_fake_conn([{'keyword_id': 1, 'keyword': 'Politics'},
+                               {'keyword_id': 2, 'keyword': 'Crime'},
+                               {'keyword_id': 3, 'keyword': 'politics'}]))
+
+    assert len(cache) == 2
+    assert cache.get('POLITICS') == 1
+    assert cache.get('crime') == 2
+
+
+def test_get_counts_hits_and_misses():
+    """Checks each lookup is counted as a hit or a miss"""
+    cache = KeywordCache()
+    cache.update({'Politics': 1})
+
+    assert cache.get('politics') == 1
+    assert cache.get('Crime') is None
+    assert cache.get('Crime') is None
+
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_update_does_not_replace_cached_ids():
+    """Checks an id is only cached for keywords that are not already cached"""
+    cache = KeywordCache()
+    cache.update({'Politics': 1})
+
+    cache.update({'politics': 5, 'Crime': 2})
+
+    assert cache.get('Politics') == 1
+    assert cache.get('crime') == 2
+
+
+def test_stats_report_hit_rate():
+    """Checks the stats include the cached keywords and the share of lookups that hit"""
+    cache = KeywordCache()
+    cache.update({'Politics': 1, 'Crime': 2})
+    cache.get('Politics')
+    cache.get('Law')
+    cache.get('crime')
+    cache.get('Sport')
+
+    assert cache.get_stats() == {"keywords": 2, "hits": 2, "misses": 2, "hit_rate": 0.5}
+
+
+def test_stats_without_lookups():
+    """Checks the hit rate is zero before any lookup"""
+    assert KeywordCache().get_stats() == {"keywords": 0, "hits": 0, "misses": 0, "hit_rate": 0.0}
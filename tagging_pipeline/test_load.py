@@ -0,0 +1,213 @@
+"""Contains the unit tests for load.py
+
+The keywords and links are also loaded into a local PostgreSQL database when
+TEST_DATABASE_URL is set"""
+
+# pylint: skip-file
+
+from datetime import datetime
+from os import environ
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import psycopg2
+import psycopg2.extras
+import pytest
+
+from keyword_cache import KeywordCache
+from load import (get_batch_keywords, get_keyword_ids, get_keyword_id, create_link_rows,
+                  load_keywords_df_into_rds)
+
+
+@pytest.fixture
+def fake_keywords_df():
+    """Returns topics for three stories, with repeated keywords in different cases and a missing topic"""
+    return pd.DataFrame([{'story_id': 1, 'topic_one': 'Politics', 'topic_two': 'Crime', 'topic_three': 'Law'},
+                         {'story_id': 2, 'topic_one': ' politics ', 'topic_two': 'CRIME',
+                          'topic_three': np.nan},
+                         {'story_id': 3, 'topic_one': 'Football', 'topic_two': 'Sport',
+                          'topic_three': 'Football'}])
+
+
+def test_batch_keywords_deduplicated_ignoring_case(fake_keywords_df):
+    """Checks each keyword is returned once, as first written, ignoring case and whitespace"""
+    assert get_batch_keywords(fake_keywords_df) == ['Politics', 'Crime', 'Law', 'Football', 'Sport']
+
+
+def test_no_batch_keywords_for_missing_topics():
+    """Checks missing and blank topics are not returned as keywords"""
+    keywords_df = pd.DataFrame([{'story_id': 1, 'topic_one': np.nan, 'topic_two': ' ',
+                                 'topic_three': None}])
+
+    assert get_batch_keywords(keywords_df) == []
+
+
+@patch("load.extras.execute_values")
+def test_keyword_ids_split_between_inserted_and_existing(fake_execute_values):
+    """Checks existing keywords are found without regard to case and only new ones inserted"""
+    fake_conn = MagicMock()
+    fake_cur = fake_conn.cursor.return_value.__enter__.return_value
+    fake_cur.fetchall.return_value = [{'keyword_id': 2, 'keyword': 'politics'}]
+    fake_execute_values.return_value = [{'keyword_id': 7, 'keyword': 'Crime'}]
+
+    res = get_keyword_ids(fake_conn, ['Politics', 'Crime'])
+
+    assert res == {'politics': 2, 'crime': 7}
+    assert fake_cur.execute.call_args.args[1] == [['politics', 'crime']]
+    assert fake_execute_values.call_args.args[2] == [('Crime',)]
+    fake_conn.commit.assert_not_called()
+
+
+@patch("load.extras.execute_values")
+def test_no_insert_when_every_keyword_exists(fake_execute_values):
+    """Checks nothing is inserted when every keyword is already in the keywords table"""
+    fake_conn = MagicMock()
+    fake_cur = fake_conn.cursor.return_value.__enter__.return_value
+    fake_cur.fetchall.return_value = [{'keyword_id': 1, 'keyword': 'POLITICS'}]
+
+    assert get_keyword_ids(fake_conn, ['Politics']) == {'politics': 1}
+    fake_execute_values.assert_not_called()
+
+
+@patch("load.extras.execute_values")
+def test_keywords_inserted_concurrently_looked_up(fake_execute_values):
+    """Checks a keyword another load inserted after the lookup is found by a second query"""
+    fake_conn = MagicMock()
+    fake_cur = fake_conn.cursor.return_value.__enter__.return_value
+    fake_cur.fetchall.side_effect = [[], [{'keyword_id': 9, 'keyword': 'Law'}]]
+    fake_execute_values.return_value = []
+
+    assert get_keyword_ids(fake_conn, ['Law']) == {'law': 9}
+    assert fake_cur.execute.call_args.args[1] == [['Law']]
+
+
+@patch("load.extras.execute_values")
+def test_cached_keywords_not_queried(fake_execute_values):
+    """Checks keywords found in the cache are not sent to the database"""
+    fake_conn = MagicMock()
+    cache = KeywordCache()
+    cache.update({'Politics': 4})
+
+    assert get_keyword_ids(fake_conn, ['politics'], cache) == {'politics': 4}
+    fake_conn.cursor.assert_not_called()
+    fake_execute_values.assert_not_called()
+
+
+def test_link_rows_distinct_and_missing_topics_skipped(fake_keywords_df):
+    """Checks each story is linked to each of its keywords once, skipping missing topics"""
+    keyword_ids = {'politics': 1, 'crime': 2, 'law': 3, 'football': 4, 'sport': 5}
+
+    res = create_link_rows(fake_keywords_df, 'story_id', keyword_ids)
+
+    assert res == [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2), (3, 4), (3, 5)]
+
+
+def test_link_rows_skip_keywords_without_ids(fake_keywords_df):
+    """Checks topics whose keyword has no id are not linked"""
+    assert create_link_rows(fake_keywords_df, 'story_id', {'law': 3}) == [(1, 3)]
+
+
+@patch("load.get_keyword_ids")
+@patch("load.extras.execute_values")
+def test_load_returns_inserted_link_count(fake_execute_values, fake_get_keyword_ids, fake_keywords_df):
+    """Checks the links are inserted in one statement and the inserted count is returned"""
+    fake_conn = MagicMock()
+    fake_get_keyword_ids.return_value = {'politics': 1, 'crime': 2, 'law': 3, 'football': 4, 'sport': 5}
+    fake_execute_values.return_value = [{'link_count': 5}]
+
+    res = load_keywords_df_into_rds(fake_conn, fake_keywords_df, 'story_id')
+
+    assert res == 5
+    assert fake_execute_values.call_count == 1
+    assert len(fake_execute_values.call_args.args[2]) == 7
+    assert "story_keyword_link" in fake_execute_values.call_args.args[1]
+    fake_conn.commit.assert_called_once()
+
+
+@patch("load.get_keyword_ids")
+@patch("load.extras.execute_values")
+def test_load_rolled_back_and_raised_on_error(fake_execute_values, fake_get_keyword_ids,
+                                              fake_keywords_df):
+    """Checks a failed batch is rolled back, the error re-raised and nothing cached"""
+    fake_conn = MagicMock()
+    cache = KeywordCache()
+    fake_get_keyword_ids.return_value = {'politics': 1}
+    fake_execute_values.side_effect = psycopg2.DatabaseError()
+
+    with pytest.raises(psycopg2.DatabaseError):
+        load_keywords_df_into_rds(fake_conn, fake_keywords_df, 'story_id', cache)
+
+    fake_conn.rollback.assert_called_once()
+    fake_conn.commit.assert_not_called()
+    assert len(cache) == 0
+
+
+@patch("load.extras.execute_values")
+def test_no_statements_for_no_keywords(fake_execute_values):
+    """Checks nothing is sent to the database when no story has topics"""
+    keywords_df = pd.DataFrame(columns=['story_id', 'topic_one', 'topic_two', 'topic_three'])
+
+    assert load_keywords_df_into_rds(MagicMock(), keywords_df, 'story_id') == 0
+    fake_execute_values.assert_not_called()
+
+
+@pytest.fixture
+def local_database():
+    """Connects to a local PostgreSQL database with empty keyword and story tables"""
+    if "TEST_DATABASE_URL" not in environ:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    conn = psycopg2.connect(environ["TEST_DATABASE_URL"],
+                            cursor_factory=psycopg2.extras.RealDictCursor)
+    with conn.cursor() as cur:
+        cur.execute("""CREATE TEMPORARY TABLE keywords(
+            keyword_id INT GENERATED ALWAYS AS IDENTITY, keyword TEXT UNIQUE,
+            PRIMARY KEY (keyword_id));""")
+        cur.execute("""CREATE TEMPORARY TABLE stories(
+            story_id INT PRIMARY KEY, pub_date TIMESTAMP);""")
+        cur.execute("""CREATE TEMPORARY TABLE story_keyword_link(
+            link_id INT GENERATED ALWAYS AS IDENTITY, keyword_id INT, story_id INT,
+            PRIMARY KEY (link_id), UNIQUE (keyword_id, story_id));""")
+        cur.execute("""CREATE TEMPORARY TABLE keyword_hourly_counts(
+            keyword_id INT, hour_start TIMESTAMP, story_count INT DEFAULT 0,
+            reddit_count INT DEFAULT 0, PRIMARY KEY (keyword_id, hour_start));""")
+        cur.execute("""INSERT INTO stories (story_id, pub_date) VALUES (1, %s), (2, %s), (3, %s);""",
+                    [datetime(2023, 12, 1, 9, 15), datetime(2023, 12, 1, 9, 45),
+                     datetime(2023, 12, 1, 10, 5)])
+        cur.execute("""INSERT INTO keywords (keyword) VALUES ('Crime');""")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_load_against_local_database(local_database, fake_keywords_df):
+    """Checks keywords and links are inserted once by a real PostgreSQL database"""
+    cache = KeywordCache()
+
+    assert load_keywords_df_into_rds(local_database, fake_keywords_df, 'story_id', cache) == 7
+    assert load_keywords_df_into_rds(local_database, fake_keywords_df, 'story_id', cache) == 0
+
+    with local_database.cursor() as cur:
+        cur.execute("SELECT keyword FROM keywords ORDER BY keyword_id;")
+        assert [row['keyword'] for row in cur.fetchall()] == ['Crime', 'Politics', 'Law',
+                                                               'Football', 'Sport']
+        cur.execute("""SELECT k.keyword, SUM(c.story_count) AS story_count
+                       FROM keyword_hourly_counts c JOIN keywords k USING (keyword_id)
+                       GROUP BY k.keyword;""")
+        assert {row['keyword']: row['story_count'] for row in cur.fetchall()}['Politics'] == 2
+    assert len(cache) == 5
+
+
+def test_keywords_matched_without_case_against_local_database(local_database):
+    """Checks keywords only differing by case from a stored keyword reuse its row without a cache"""
+    with local_database.cursor() as cur:
+        cur.execute("SELECT keyword_id FROM keywords WHERE keyword = 'Crime';")
+        crime_id = cur.fetchone()['keyword_id']
+        cur.execute("INSERT INTO keywords (keyword) VALUES ('CRIME');")
+
+    assert get_keyword_id(local_database, 'crime') == crime_id
+    assert get_keyword_id(local_database, ' Crime ') == crime_id
+
+    with local_database.cursor() as cur:
+        cur.execute("SELECT COUNT(*) AS keyword_count FROM keywords;")
+        assert cur.fetchone()['keyword_count'] == 2
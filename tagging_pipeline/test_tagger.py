@@ -0,0 +1,82 @@
+"""Contains the unit tests for tagger.py"""
+
+# pylint: skip-file
+
+from unittest.mock import patch
+
+from tagger import TokenRateLimiter, estimate_request_tokens, tag_stories
+from tagging_conftest import FakeCompletionsHandler, fake_completions_server
+
+
+def test_all_stories_tagged_and_loaded(fake_completions_server, fake_stories_list):
+    """Checks every batch is tagged and handed to the loader without intermediate files"""
+    loaded = []
+
+    tagged_count = tag_stories(fake_stories_list, 'story_id', loaded.append, max_in_flight=4)
+
+    assert tagged_count == 200
+    assert len(loaded) == 4
+    assert sorted(story_id for df in loaded for story_id in df['story_id']) == list(range(1, 201))
+    assert list(loaded[0].columns) == ['story_id', 'topic_one', 'topic_two', 'topic_three']
+
+
+def test_dropped_stories_retried_next_round(fake_completions_server, fake_stories_list):
+    """Checks stories missing from a response are sent again in the next round"""
+    FakeCompletionsHandler.drop_once = {'5', '160'}
+    loaded = []
+
+    tagged_count = tag_stories(fake_stories_list, 'story_id', loaded.append)
+
+    assert tagged_count == 200
+    assert FakeCompletionsHandler.request_count == 5
+    assert sorted(loaded[-1]['story_id']) == [5, 160]
+
+
+def test_stories_not_retried_past_max_rounds(fake_completions_server, fake_stories_list):
+    """Checks stories still missing after the last round are left untagged"""
+    FakeCompletionsHandler.drop_once = {'5'}
+
+    assert tag_stories(fake_stories_list[:10], 'story_id', lambda df: None, max_rounds=1) == 9
+    assert FakeCompletionsHandler.request_count == 1
+
+
+def test_requests_overlap_up_to_limit(fake_completions_server, fake_stories_list):
+    """Checks requests are sent concurrently but never more than max_in_flight at once"""
+    tag_stories(fake_stories_list * 2, 'story_id', lambda df: None, max_in_flight=2)
+
+    assert FakeCompletionsHandler.request_count == 8
+    assert FakeCompletionsHandler.max_in_flight == 2
+
+
+def test_no_requests_for_no_stories(fake_completions_server):
+    """Checks nothing is requested without stories"""
+    assert tag_stories([], 'story_id', lambda df: None) == 0
+    assert FakeCompletionsHandler.request_count == 0
+
+
+def test_failed_batch_not_loaded(fake_stories_list, monkeypatch):
+    """Checks a batch whose request fails is skipped"""
+    monkeypatch.setenv('OPENAI_API_KEY', 'fake-key')
+    monkeypatch.setenv('OPENAI_API_URL', 'http://127.0.0.1:1/v1/chat/completions')
+    loaded = []
+
+    assert tag_stories(fake_stories_list[:10], 'story_id', loaded.append) == 0
+    assert loaded == []
+
+
+def test_token_estimate_grows_with_batch(fake_stories_list):
+    """Checks larger batches are estimated to use more tokens"""
+    assert estimate_request_tokens(fake_stories_list[:50]) > estimate_request_tokens(fake_stories_list[:5])
+
+
+@patch('tagger.time.sleep')
+def test_rate_limiter_waits_when_budget_spent(fake_sleep):
+    """Checks the limiter waits once the tokens in the window reach the budget"""
+    limiter = TokenRateLimiter(tokens_per_minute=100, window_seconds=0.05)
+
+    limiter.acquire(60)
+    fake_sleep.assert_not_called()
+    fake_sleep.side_effect = lambda seconds: limiter._sent.popleft()
+    limiter.acquire(60)
+
+    fake_sleep.assert_called_once()
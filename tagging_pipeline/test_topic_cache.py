@@ -0,0 +1,87 @@
+"""Contains the unit tests for topic_cache.py"""
+
+# pylint: skip-file
+
+import ast
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from topic_cache import (HEADLINE_TAGS, normalise_title, get_title_hash, group_stories_by_title,
+                         create_cached_topic_df, add_duplicate_story_topics, save_title_topics)
+
+RSS_TRANSFORM_PATH = Path(__file__).parent.parent / "rss_pipeline" / "transform_rss.py"
+
+
+def get_rss_headline_tags() -> list[str]:
+    """Returns the headline tags listed in remove_headline_tags of the RSS pipeline"""
+    for node in ast.walk(ast.parse(RSS_TRANSFORM_PATH.read_text())):
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "headline_tags":
+            return ast.literal_eval(node.value)
+    raise AssertionError("remove_headline_tags has no headline_tags list")
+
+
+def test_headline_tags_match_rss_pipeline():
+    """Checks the tags match the ones the RSS pipeline removes from its headlines"""
+    assert HEADLINE_TAGS == get_rss_headline_tags()
+
+
+def test_reissued_headlines_share_a_hash():
+    """Checks headline tags, punctuation, case and whitespace do not change the hash"""
+    assert normalise_title("LIVE: Sunak  questioned by police!") == "sunak questioned by police"
+    assert get_title_hash("UPDATE - Sunak questioned by police") == get_title_hash(
+        "sunak questioned by Police")
+    assert get_title_hash("Sunak questioned") != get_title_hash("Sunak questioned by police")
+
+
+def test_tag_word_kept_inside_title():
+    """Checks only a leading headline tag is removed"""
+    assert normalise_title("Liverpool win again") == "liverpool win again"
+    assert normalise_title("Fans watch the game live") == "fans watch the game live"
+
+
+def test_duplicate_stories_grouped():
+    """Checks stories with the same normalised title are grouped in order"""
+    stories = [{"story_id": 1, "title": "A headline"}, {"story_id": 2, "title": "Other"},
+               {"story_id": 3, "title": "BREAKING: a headline"}]
+
+    story_groups = group_stories_by_title(stories, "title")
+
+    assert [[story["story_id"] for story in group] for group in story_groups.values()] == [[1, 3], [2]]
+
+
+def test_cached_topics_copied_to_every_story():
+    """Checks each story with a cached title gets the cached topics"""
+    story_groups = {"hash_a": [{"story_id": 1}, {"story_id": 3}], "hash_b": [{"story_id": 2}]}
+
+    topics_df = create_cached_topic_df(
+        story_groups, {"hash_a": ["Politics", "Crime", "Law"]}, "story_id")
+
+    assert topics_df["story_id"].tolist() == [1, 3]
+    assert topics_df["topic_two"].tolist() == ["Crime", "Crime"]
+
+
+def test_new_topics_copied_to_duplicate_stories():
+    """Checks duplicate stories get the topics of the story sent to openai"""
+    story_groups = {"hash_a": [{"story_id": 1}, {"story_id": 3}], "hash_b": [{"story_id": 2}]}
+    topics_df = pd.DataFrame([{"story_id": 1, "topic_one": "Politics", "topic_two": "Crime",
+                               "topic_three": "Law"}])
+
+    res = add_duplicate_story_topics(topics_df, story_groups, "story_id")
+
+    assert res["story_id"].tolist() == [1, 3]
+    assert res["topic_three"].tolist() == ["Law", "Law"]
+
+
+@patch("topic_cache.extras.execute_values")
+def test_tagged_titles_saved(fake_execute_values):
+    """Checks the topics are stored under the title hash of each story"""
+    fake_connection = MagicMock()
+    topics_df = pd.DataFrame([{"story_id": 1, "topic_one": "Politics", "topic_two": "Crime",
+                               "topic_three": "Law"}])
+
+    save_title_topics(fake_connection, topics_df, {1: "hash_a"}, "story_id")
+
+    assert fake_execute_values.call_args.args[2] == [("hash_a", "Politics", "Crime", "Law")]
+    fake_connection.commit.assert_called_once()
@@ -0,0 +1,75 @@
+"""Contains the unit tests for transform.py"""
+
+# pylint: skip-file
+
+import json
+
+from transform import StoryTopics, parse_story_topics, create_topic_df
+
+
+def make_response(content: str) -> dict:
+    """Returns a chat completions response with the given message content"""
+    return {'choices': [{'message': {'content': content}}]}
+
+
+def test_json_object_parsed():
+    """Checks a JSON object keyed by story id is parsed into typed topics"""
+    response = make_response(json.dumps({'3': ['Weather', 'History', 'Technology'],
+                                         '4': ['Health', 'Science', 'Celebrity']}))
+
+    valid_stories, dropped_ids = parse_story_topics(response, [3, 4])
+
+    assert valid_stories == [StoryTopics(3, ['Weather', 'History', 'Technology']),
+                             StoryTopics(4, ['Health', 'Science', 'Celebrity'])]
+    assert dropped_ids == []
+
+
+def test_python_list_of_dicts_parsed():
+    """Checks the older list of Python dictionaries format is still read"""
+    response = make_response("[{3: ['Weather', 'History', 'Technology']}, {4: ['Health']}]")
+
+    valid_stories, _ = parse_story_topics(response)
+
+    assert [story.story_id for story in valid_stories] == [3, 4]
+
+
+def test_topics_with_colons_and_braces_kept():
+    """Checks topics containing colons or braces do not break parsing"""
+    response = make_response(json.dumps({'7': ['War: Ukraine', '{Politics}', 'Law']}))
+
+    valid_stories, _ = parse_story_topics(response, [7])
+
+    assert valid_stories == [StoryTopics(7, ['War: Ukraine', '{Politics}', 'Law'])]
+
+
+def test_malformed_and_missing_stories_reported():
+    """Checks malformed, missing and unrequested entries are not returned and are reported"""
+    response = make_response(json.dumps({'1': ['Crime', 'Law', 'Politics'], '2': 'Crime',
+                                         'three': ['Law'], '4': [], '99': ['Football']}))
+
+    valid_stories, dropped_ids = parse_story_topics(response, [1, 2, 3, 4, 5])
+
+    assert valid_stories == [StoryTopics(1, ['Crime', 'Law', 'Politics'])]
+    assert dropped_ids == [2, 3, 4, 5]
+
+
+def test_unparseable_response_drops_every_story():
+    """Checks a truncated response reports every requested story without raising"""
+    response = make_response('{"1": ["Crime", "Law"], "2": ["Foot')
+
+    assert parse_story_topics(response, [1, 2]) == ([], [1, 2])
+
+
+def test_code_fenced_response_parsed():
+    """Checks a response wrapped in a markdown code block is parsed"""
+    response = make_response('```json\n{"1": ["Crime", "Law", "Politics"]}\n```')
+
+    assert parse_story_topics(response, [1]) == ([StoryTopics(1, ['Crime', 'Law', 'Politics'])], [])
+
+
+def test_short_topic_lists_padded():
+    """Checks stories with fewer than three topics are padded with UNTAGGED"""
+    topics_df = create_topic_df([StoryTopics(1, ['Crime'])], 'story_id')
+
+    assert topics_df.iloc[0].to_dict() == {'story_id': 1, 'topic_one': 'Crime',
+                                           'topic_two': 'UNTAGGED', 'topic_three': 'UNTAGGED'}
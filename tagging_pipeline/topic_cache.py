@@ -0,0 +1,89 @@
+"""Remembers the topics given to each headline, keyed by a hash of the normalised title,
+so stories repeated across feeds and Reddit are only sent to openai once"""
+
+from hashlib import sha1
+import re
+
+import pandas as pd
+from psycopg2 import extras
+
+from transform import StoryTopics, create_topic_df
+
+# Copy of the tags removed by remove_headline_tags in rss_pipeline/transform_rss.py, which
+# is deployed separately. test_topic_cache.py checks the two lists match.
+HEADLINE_TAGS = ["BREAKING", "EXCLUSIVE", "UPDATE", "LIVE", "EXCLUSIVE INTERVIEW",
+                 "SPECIAL REPORT", "VIDEO", "FEATURE", "EXCLUSIVE VIDEO", "EDITORIAL",
+                 "ANALYSIS", "INVESTIGATION", "SPECIAL FEATURE"]
+FIRST_TAG_PATTERN = re.compile(r'(?i)^\s*(?:' + '|'.join(
+    re.escape(tag) for tag in sorted(HEADLINE_TAGS, key=len, reverse=True)) + r')\b[^\w\s]*')
+NON_WORD_PATTERN = re.compile(r'[\W_]+')
+TOPIC_COLUMNS = ['topic_one', 'topic_two', 'topic_three']
+
+
+def normalise_title(title: str) -> str:
+    """Returns the title without a leading headline tag, punctuation, case or extra whitespace"""
+    title = FIRST_TAG_PATTERN.sub('', str(title), count=1)
+    return ' '.join(NON_WORD_PATTERN.sub(' ', title.casefold()).split())
+
+
+def get_title_hash(title: str) -> str:
+    """Returns the hash identifying a title and its near-identical reissues"""
+    return sha1(normalise_title(title).encode()).hexdigest()
+
+
+def group_stories_by_title(stories_list: list, title_key: str) -> dict[str, list[dict]]:
+    """Returns the stories grouped by title hash, in the order each title first appears"""
+    story_groups = {}
+    for story in stories_list:
+        story_groups.setdefault(get_title_hash(story[title_key]), []).append(dict(story))
+    return story_groups
+
+
+def get_cached_topics(conn, title_hashes: list[str]) -> dict[str, list[str]]:
+    """Returns the stored topics for each of the title hashes that has been tagged before"""
+    if not title_hashes:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute("""SELECT title_hash, topic_one, topic_two, topic_three FROM title_topics
+                       WHERE title_hash = ANY(%s);""", [list(title_hashes)])
+        return {row['title_hash']: [row[column] for column in TOPIC_COLUMNS]
+                for row in cur.fetchall()}
+
+
+def create_cached_topic_df(story_groups: dict[str, list[dict]], cached_topics: dict[str, list[str]],
+                           id: str) -> pd.DataFrame:
+    """Returns a topics dataframe for every story whose title already has topics"""
+    return create_topic_df([StoryTopics(story[id], list(cached_topics[title_hash]))
+                            for title_hash, stories in story_groups.items()
+                            if title_hash in cached_topics
+                            for story in stories], id)
+
+
+def add_duplicate_story_topics(topics_df: pd.DataFrame, story_groups: dict[str, list[dict]],
+                               id: str) -> pd.DataFrame:
+    """Copies the topics of each tagged story to the other stories with the same title"""
+    duplicate_ids = {stories[0][id]: [story[id] for story in stories[1:]]
+                     for stories in story_groups.values()}
+    duplicate_rows = [{**row, id: duplicate_id}
+                      for row in topics_df.to_dict('records')
+                      for duplicate_id in duplicate_ids.get(row[id], [])]
+    if not duplicate_rows:
+        return topics_df
+    return pd.concat([topics_df, pd.DataFrame(duplicate_rows, columns=topics_df.columns)],
+                     ignore_index=True)
+
+
+def save_title_topics(conn, topics_df: pd.DataFrame, title_hashes: dict, id: str) -> None:
+    """Stores the topics of each tagged story under the title hash of its story id,
+    so later copies of the title are not re-tagged"""
+    rows = {title_hashes[row[id]]: tuple(row[column] for column in TOPIC_COLUMNS)
+            for row in topics_df.to_dict('records') if row[id] in title_hashes}
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        extras.execute_values(cur, """INSERT INTO title_topics
+                                      (title_hash, topic_one, topic_two, topic_three) VALUES %s
+                                      ON CONFLICT (title_hash) DO NOTHING;""",
+                              [(title_hash, *topics) for title_hash, topics in rows.items()],
+                              page_size=len(rows))
+    conn.commit()
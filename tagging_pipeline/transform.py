@@ -1,64 +1,81 @@
 """Makes POST requests to the openai API to find three main topics relating to the article title"""
 
-import re
+import ast
 from datetime import datetime
 import json
+from typing import NamedTuple
 
 import pandas as pd
 
 CURRENT_TIMESTAMP = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-JSON_FILE = f'response.json'
 
 
-def read_response_json() -> list[dict]:
-    """Extracts openai response data from json file."""
+class StoryTopics(NamedTuple):
+    """The topics openai returned for one story"""
+    story_id: int
+    topics: list[str]
 
-    with open(JSON_FILE, 'r') as f:
-        response_list = json.load(f)
-    return response_list
 
+def load_response_content(content: str) -> dict | list:
+    """Reads the completion text as JSON, falling back to a Python literal"""
+    content = content.strip().removeprefix('```json').strip('`').strip()
+    try:
+        return json.loads(content)
+    except ValueError:
+        return ast.literal_eval(content)
 
-def get_story_topics(response_list: list[dict]) -> list[dict]:
-    """Extracts dictionaries containing each story id and associated topics from the openai response."""
-    valid_stories = []
 
-    all_stories_data = response_list['choices'][0]['message']['content']
-    stories_dict = re.findall('\{(.*?)\}', all_stories_data)
-    for story in stories_dict:
+def get_story_topic_pairs(stories_data: dict | list) -> list[tuple]:
+    """Returns (story id, topics) pairs from either a single object keyed by story id
+    or a list of objects keyed by story id"""
+    if isinstance(stories_data, dict):
+        return list(stories_data.items())
+    return [pair for story in stories_data if isinstance(story, dict) for pair in story.items()]
+
+
+def parse_story_topics(response_list: dict,
+                       requested_ids: list[int] | None = None) -> tuple[list[StoryTopics], list[int]]:
+    """Parses the openai response in one pass, returning the topics of each valid story
+    and the ids of requested stories that were missing or malformed, so they can be retried"""
+    content = response_list['choices'][0]['message']['content']
+    try:
+        stories_data = load_response_content(content)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        print(f"Could not parse openai response of {len(content)} characters")
+        stories_data = {}
+
+    valid_stories = {}
+    malformed_count = 0
+    for story_id, story_topics in get_story_topic_pairs(stories_data):
         try:
-            topic_split = story.split(':')
-            valid_stories.append(
-                {int(topic_split[0]): eval(topic_split[1])})
-        except:
+            story_id = int(story_id)
+        except (TypeError, ValueError):
+            malformed_count += 1
             continue
-    return valid_stories
-
+        if (not isinstance(story_topics, list) or not story_topics
+                or not all(isinstance(topic, str) for topic in story_topics)):
+            malformed_count += 1
+            continue
+        valid_stories[story_id] = StoryTopics(story_id, story_topics[:3])
 
-def create_topic_csv(valid_stories: list[dict], table: str, id: str) -> None:
-    """Stores media story topics in a csv file"""
-    response_df = pd.DataFrame(
-        columns=[id, 'topic_one', 'topic_two', 'topic_three'])
-    for story_dict in valid_stories:
-        for story_id, story_topics in story_dict.items():
-            if isinstance(story_topics, list):
-                while len(story_topics) < 3:
-                    story_topics.append("UNTAGGED")
-                new_row = {id: story_id,
-                           'topic_one': story_topics[0], 'topic_two': story_topics[1], 'topic_three': story_topics[2]}
-                response_df.loc[len(response_df)] = new_row
-    response_df.to_csv(f'{table}.csv', index=False)
+    if requested_ids is not None:
+        requested = set(requested_ids)
+        valid_stories = {story_id: story for story_id, story in valid_stories.items()
+                         if story_id in requested}
+        dropped_ids = [story_id for story_id in requested_ids if story_id not in valid_stories]
+    else:
+        dropped_ids = []
+    if malformed_count or dropped_ids:
+        print(f"{malformed_count} malformed entries in openai response, "
+              f"{len(dropped_ids)} stories left untagged")
+    return list(valid_stories.values()), dropped_ids
 
 
-def create_reddit_topic_csv(valid_stories: list[dict]) -> None:
-    """Stores reddit story topics in a csv file"""
-    response_df = pd.DataFrame(
-        columns=['re_article_id', 'topic_one', 'topic_two', 'topic_three'])
-    for story_dict in valid_stories:
-        for story_id, story_topics in story_dict.items():
-            if isinstance(story_topics, list):
-                while len(story_topics) < 3:
-                    story_topics.append("UNTAGGED")
-                new_row = {'re_article_id': story_id,
-                           'topic_one': story_topics[0], 'topic_two': story_topics[1], 'topic_three': story_topics[2]}
-                response_df.loc[len(response_df)] = new_row
-    response_df.to_csv(f'reddit.csv', index=False)
+def create_topic_df(valid_stories: list[StoryTopics], id: str) -> pd.DataFrame:
+    """Returns a dataframe with the id and three topics of each story"""
+    rows = []
+    for story in valid_stories:
+        story_topics = list(story.topics) + ["UNTAGGED"] * (3 - len(story.topics))
+        rows.append({id: story.story_id,
+                     'topic_one': story_topics[0], 'topic_two': story_topics[1], 'topic_three': story_topics[2]})
+    return pd.DataFrame(rows, columns=[id, 'topic_one', 'topic_two', 'topic_three'])
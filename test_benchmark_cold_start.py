@@ -0,0 +1,58 @@
+"""Contains the unit tests for benchmark_cold_start.py"""
+
+# pylint: skip-file
+
+from unittest.mock import patch
+
+from benchmark_cold_start import parse_import_times, get_package_costs, report_handler
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        300 |     pandas._libs
+import time:      1500 |       1800 |   pandas
+import time:       200 |        200 |     botocore.utils
+import time:       400 |        600 |   boto3
+import time:        50 |       2470 | lambda_function
+Traceback line that is not an import"""
+
+
+def test_import_times_parsed_with_depth():
+    """Checks each import line is parsed in order, ignoring the header and other lines"""
+    assert parse_import_times(IMPORTTIME_OUTPUT) == [("_io", 120, 120, 1),
+                                                     ("pandas._libs", 300, 300, 2),
+                                                     ("pandas", 1500, 1800, 1),
+                                                     ("botocore.utils", 200, 200, 2),
+                                                     ("boto3", 400, 600, 1),
+                                                     ("lambda_function", 50, 2470, 0)]
+
+
+def test_package_costs_summed_and_sorted():
+    """Checks the self time of submodules is added to their top-level package, most expensive first"""
+    res = get_package_costs(parse_import_times(IMPORTTIME_OUTPUT))
+
+    assert list(res.items())[:2] == [("pandas", 1800), ("boto3", 400)]
+
+
+@patch("benchmark_cold_start.measure_handler_imports")
+def test_handler_within_budget(fake_measure_handler_imports):
+    """Checks a handler importing in less than its budget passes"""
+    fake_measure_handler_imports.return_value = parse_import_times(IMPORTTIME_OUTPUT)
+
+    assert report_handler("rss_pipeline", "lambda_function", 3) is True
+
+
+@patch("benchmark_cold_start.measure_handler_imports")
+def test_handler_on_budget(fake_measure_handler_imports):
+    """Checks a handler importing in exactly its budget passes"""
+    fake_measure_handler_imports.return_value = [("main", 0, 600_000, 0)]
+
+    assert report_handler("send_email_pdf", "main", 600) is True
+
+
+@patch("benchmark_cold_start.measure_handler_imports")
+def test_handler_over_budget(fake_measure_handler_imports, capsys):
+    """Checks a handler importing in more than its budget fails and is reported"""
+    fake_measure_handler_imports.return_value = parse_import_times(IMPORTTIME_OUTPUT)
+
+    assert report_handler("rss_pipeline", "lambda_function", 2) is False
+    assert "OVER BUDGET" in capsys.readouterr().out